@@ -0,0 +1,300 @@
+"""
+Aggregates - Aggregati parziali fondibili per l'analisi a chunk
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+
+
+def _hash_values(data) -> np.ndarray:
+    """Calcola hash a 64 bit stabili tra chunk con dtype diversi"""
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    
+    normalized = {}
+    for col in data.columns:
+        series = data[col]
+        # Gli interi di un chunk con NaN diventano float: normalizza tutto a float64
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            normalized[col] = series.astype('float64')
+        else:
+            normalized[col] = series.astype(str)
+    
+    frame = pd.DataFrame(normalized, index=data.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+class KeyedSum:
+    """Somme per chiave (conteggi o somme raggruppate) fondibili tra chunk"""
+    
+    def __init__(self, values: Optional[Dict[Any, Any]] = None):
+        """
+        Inizializza l'aggregato
+        
+        Args:
+            values: Dizionario chiave -> somma (ordine di prima apparizione)
+        """
+        self.values = dict(values or {})
+    
+    @classmethod
+    def from_counts(cls, series: pd.Series) -> 'KeyedSum':
+        """Crea l'aggregato dal conteggio dei valori (NaN esclusi)"""
+        counts = series.value_counts(sort=False)
+        # Le colonne categoriche riportano anche le categorie non osservate
+        return cls(counts[counts > 0].to_dict())
+    
+    @classmethod
+    def from_sums(cls, keys: pd.Series, values: pd.Series) -> 'KeyedSum':
+        """Crea l'aggregato dalla somma di values raggruppata per keys"""
+        return cls(values.groupby(keys, sort=False, observed=True).sum().to_dict())
+    
+    def merge(self, other: 'KeyedSum') -> 'KeyedSum':
+        """Fonde un altro aggregato in questo"""
+        for key, value in other.values.items():
+            self.values[key] = self.values.get(key, 0) + value
+        return self
+    
+    def get(self, key, default=0):
+        """Ritorna la somma per una chiave"""
+        return self.values.get(key, default)
+    
+    def total(self):
+        """Somma complessiva"""
+        return sum(self.values.values())
+    
+    def top(self, limit: Optional[int] = None) -> Dict[Any, Any]:
+        """Chiavi ordinate per valore decrescente, come value_counts()"""
+        # A parità di valore ordina per chiave: risultato indipendente dai chunk
+        ranked = sorted(self.values.items(), key=lambda item: (-item[1], str(item[0])))
+        return dict(ranked[:limit] if limit is not None else ranked)
+    
+    def sorted_by_key(self) -> Dict[Any, Any]:
+        """Chiavi ordinate, come value_counts().sort_index()"""
+        return dict(sorted(self.values.items()))
+    
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+# Insiemi distinti: hash esatti fino a DISTINCT_EXACT_LIMIT, poi sketch HyperLogLog
+# con 2**HLL_PRECISION registri (16 KB, errore standard ~0,8%)
+DISTINCT_EXACT_LIMIT = 32768
+HLL_PRECISION = 14
+_HLL_REGISTERS = 1 << HLL_PRECISION
+_HLL_SUFFIX_BITS = 64 - HLL_PRECISION
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Numero di bit significativi di ogni uint64 (0 per lo zero)"""
+    values = values.copy()
+    lengths = np.zeros(values.size, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        wide = values >= np.uint64(1 << shift)
+        values[wide] >>= np.uint64(shift)
+        lengths += wide * shift
+    return lengths + (values > 0)
+
+
+def _hll_registers(hashes: np.ndarray) -> np.ndarray:
+    """Registri HyperLogLog di un array di hash a 64 bit"""
+    registers = np.zeros(_HLL_REGISTERS, dtype=np.uint8)
+    if hashes.size:
+        buckets = (hashes >> np.uint64(_HLL_SUFFIX_BITS)).astype(np.int64)
+        suffix = hashes & np.uint64((1 << _HLL_SUFFIX_BITS) - 1)
+        # Posizione del primo bit a 1 nei bit restanti
+        ranks = (_HLL_SUFFIX_BITS + 1 - _bit_length(suffix)).astype(np.uint8)
+        np.maximum.at(registers, buckets, ranks)
+    return registers
+
+
+def _hll_estimate(registers: np.ndarray) -> int:
+    """Cardinalità stimata dai registri (linear counting finché i registri vuoti bastano)"""
+    m = float(registers.size)
+    zeros = int((registers == 0).sum())
+    if zeros > 0:
+        # La stima grezza è distorta fino a qualche volta m: sotto 3m vale il linear counting
+        linear = m * np.log(m / zeros)
+        if linear <= 3 * m:
+            return int(round(linear))
+    alpha = 0.7213 / (1 + 1.079 / m)
+    return int(round(alpha * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum()))
+
+
+class DistinctSet:
+    """
+    Insieme di valori distinti con memoria limitata
+    
+    Fino a DISTINCT_EXACT_LIMIT valori l'insieme è l'array ordinato degli
+    hash a 64 bit e il conteggio è esatto; oltre diventa uno sketch
+    HyperLogLog (registers) di dimensione fissa e il conteggio è una stima.
+    Le due forme si fondono tra loro: un insieme esatto fuso in uno sketch
+    ne aggiorna i registri.
+    """
+    
+    def __init__(self, hashes: Optional[np.ndarray] = None, registers: Optional[np.ndarray] = None):
+        """
+        Inizializza l'insieme
+        
+        Args:
+            hashes: Array ordinato di hash univoci (insieme esatto)
+            registers: Registri HyperLogLog (insieme stimato, hashes ignorato)
+        """
+        self.hashes = hashes if hashes is not None else np.empty(0, dtype=np.uint64)
+        self.registers = registers
+        if registers is None and self.hashes.size > DISTINCT_EXACT_LIMIT:
+            self._to_sketch()
+    
+    @classmethod
+    def from_values(cls, data) -> 'DistinctSet':
+        """Crea l'insieme da una Series o da un DataFrame (righe con NaN escluse)"""
+        data = data.dropna()
+        return cls(np.unique(_hash_values(data)))
+    
+    @property
+    def exact(self) -> bool:
+        """Il conteggio è esatto (nessuno sketch)"""
+        return self.registers is None
+    
+    def _to_sketch(self):
+        """Sostituisce gli hash esatti con i registri HyperLogLog"""
+        self.registers = _hll_registers(self.hashes)
+        self.hashes = np.empty(0, dtype=np.uint64)
+    
+    def copy(self) -> 'DistinctSet':
+        """Copia indipendente (le fusioni non modificano l'originale)"""
+        if self.exact:
+            return DistinctSet(self.hashes)
+        return DistinctSet(registers=self.registers.copy())
+    
+    def merge(self, other: 'DistinctSet') -> 'DistinctSet':
+        """Unisce un altro insieme in questo"""
+        if self.exact and other.exact:
+            self.hashes = np.union1d(self.hashes, other.hashes)
+            if self.hashes.size > DISTINCT_EXACT_LIMIT:
+                self._to_sketch()
+            return self
+        if self.exact:
+            self._to_sketch()
+        other_registers = other.registers if not other.exact else _hll_registers(other.hashes)
+        self.registers = np.maximum(self.registers, other_registers)
+        return self
+    
+    def __len__(self) -> int:
+        if self.exact:
+            return int(self.hashes.size)
+        return _hll_estimate(self.registers)
+
+
+class KeyedDistinct:
+    """Valori distinti per chiave (es. utenti per paese) fondibili tra chunk"""
+    
+    def __init__(self, sets: Optional[Dict[Any, DistinctSet]] = None):
+        """
+        Inizializza l'aggregato
+        
+        Args:
+            sets: Dizionario chiave -> DistinctSet
+        """
+        self.sets = dict(sets or {})
+    
+    @classmethod
+    def from_pairs(cls, keys: pd.Series, values: pd.Series) -> 'KeyedDistinct':
+        """Crea l'aggregato dalle coppie (chiave, valore) (coppie con NaN escluse)"""
+        pairs = pd.DataFrame({'key': keys, 'value': values}).dropna()
+        hashes = pd.Series(_hash_values(pairs['value']), index=pairs.index)
+        return cls({
+            key: DistinctSet(np.unique(group.to_numpy()))
+            for key, group in hashes.groupby(pairs['key'], sort=False, observed=True)
+            if len(group)
+        })
+    
+    def merge(self, other: 'KeyedDistinct') -> 'KeyedDistinct':
+        """Unisce un altro aggregato in questo"""
+        for key, values in other.sets.items():
+            self.sets[key] = self.sets[key].merge(values) if key in self.sets else values
+        return self
+    
+    def counts(self) -> KeyedSum:
+        """Numero di valori distinti per chiave"""
+        return KeyedSum({key: len(values) for key, values in self.sets.items()})
+    
+    def __len__(self) -> int:
+        return len(self.sets)
+
+
+class NumericSummary:
+    """Conteggio, somma, minimo e massimo di una colonna numerica"""
+    
+    def __init__(self, count: int = 0, total: float = 0.0,
+                 minimum: Optional[float] = None, maximum: Optional[float] = None):
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+    
+    @classmethod
+    def from_series(cls, series: pd.Series) -> 'NumericSummary':
+        """Crea il sommario da una Series (NaN esclusi)"""
+        values = series.dropna()
+        if values.empty:
+            return cls()
+        return cls(int(values.size), float(values.sum()), float(values.min()), float(values.max()))
+    
+    def merge(self, other: 'NumericSummary') -> 'NumericSummary':
+        """Fonde un altro sommario in questo"""
+        self.count += other.count
+        self.total += other.total
+        if other.minimum is not None:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+        if other.maximum is not None:
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        return self
+    
+    def mean(self) -> float:
+        """Media dei valori (NaN se vuoto, come Series.mean())"""
+        return self.total / self.count if self.count > 0 else float('nan')
+
+
+def merge_states(state: Any, other: Any) -> Any:
+    """
+    Fonde ricorsivamente due stati parziali
+    
+    Args:
+        state: Stato accumulato
+        other: Stato parziale di un nuovo chunk
+    
+    Returns:
+        Stato fuso
+    """
+    if state is None:
+        return other
+    if other is None:
+        return state
+    if isinstance(state, dict):
+        merged = dict(state)
+        for key, value in other.items():
+            merged[key] = merge_states(merged.get(key), value)
+        return merged
+    if hasattr(state, 'merge'):
+        return state.merge(other)
+    if isinstance(state, str):
+        # Metadati (es. nome della colonna usata): uguali in tutti i chunk
+        return state
+    return state + other
+
+
+def outliers_above(counts: KeyedSum, sigmas: float = 3.0) -> int:
+    """Conta i valori oltre media + sigmas * std (ddof=1) da un conteggio valori"""
+    if len(counts) == 0:
+        return 0
+    
+    values = np.fromiter(counts.values.keys(), dtype=float, count=len(counts))
+    weights = np.fromiter(counts.values.values(), dtype=float, count=len(counts))
+    n = weights.sum()
+    mean = (values * weights).sum() / n
+    if n < 2:
+        return 0
+    
+    std = np.sqrt((weights * (values - mean) ** 2).sum() / (n - 1))
+    return int(weights[values > mean + sigmas * std].sum())
@@ -2,16 +2,66 @@
 Base Analyzer - Classe base per tutti gli analizzatori
 """
 
+import copy
 import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Union
 import logging
 
+from .aggregates import merge_states
+from . import cube  # noqa: F401 (registra l'accessor data.cube)
+from .estimates import count_interval, distinct_interval, mean_interval, rate_interval, scale_path, z_value
+
 logger = logging.getLogger(__name__)
 
+# Colonna di input: nome oppure tupla di alias alternativi (vale il primo presente)
+ColumnSpec = Union[str, Tuple[str, ...]]
+
+
+def resolve_columns(specs: List[ColumnSpec], available: List[str]) -> List[str]:
+    """
+    Risolve le colonne dichiarate sulle colonne disponibili
+    
+    Args:
+        specs: Colonne o tuple di alias
+        available: Colonne della fonte
+    
+    Returns:
+        Colonne presenti (per gli alias solo la prima presente)
+    """
+    present = set(available)
+    resolved = []
+    for spec in specs:
+        aliases = spec if isinstance(spec, tuple) else (spec,)
+        col = next((alias for alias in aliases if alias in present), None)
+        if col is not None and col not in resolved:
+            resolved.append(col)
+    return resolved
+
 
 class BaseAnalyzer:
     """Classe base per gli analizzatori"""
     
+    # Colonne lette da partial() (usate dal planner per la proiezione in lettura)
+    INPUT_COLUMNS: List[ColumnSpec] = []
+    # Colonne di cui almeno una deve esistere perché l'analisi abbia senso
+    # (None = una qualsiasi di INPUT_COLUMNS)
+    REQUIRED_COLUMNS: Optional[List[ColumnSpec]] = None
+    
+    # Risultati estensivi riportati alla popolazione con il campionamento
+    # (percorsi separati da '.', '*' = tutte le chiavi di un livello)
+    SCALED_RESULTS: List[str] = []
+    # Conteggi distinti: scalabili solo con il campione per utenti
+    DISTINCT_RESULTS: List[str] = []
+    # KPI con intervallo di confidenza: risultato -> count, distinct, rate o mean
+    KPI_RESULTS: Dict[str, str] = {}
+    # Colonna dei valori dei KPI di tipo mean (per la deviazione standard)
+    KPI_COLUMNS: Dict[str, ColumnSpec] = {}
+    
+    # Analizzatori i cui risultati servono a finalize(): abilitati automaticamente
+    DEPENDS_ON: List[str] = []
+    # Analizzatori i cui risultati finalize() riusa se abilitati (solo ordine di esecuzione)
+    OPTIONAL_DEPENDS_ON: List[str] = []
+    
     def __init__(self, name: str):
         """
         Inizializza l'analizzatore
@@ -21,6 +71,8 @@ class BaseAnalyzer:
         """
         self.name = name
         self.results = {}
+        # Risultati delle dipendenze, assegnati dall'executor prima di finalize()
+        self.upstream: Dict[str, Dict[str, Any]] = {}
     
     def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -32,7 +84,124 @@ class BaseAnalyzer:
         Returns:
             Dizionario con risultati analisi
         """
-        raise NotImplementedError("analyze() deve essere implementato")
+        self.results = self.finalize(self.partial(data))
+        return self.results
+    
+    def upstream_result(self, analyzer: str, key: str) -> Any:
+        """
+        Risultato di una dipendenza già finalizzata
+        
+        Args:
+            analyzer: Nome della dipendenza
+            key: Chiave del risultato
+        
+        Returns:
+            Valore, None se la dipendenza non è stata eseguita su questa fonte
+        """
+        return self.upstream.get(analyzer, {}).get(key)
+    
+    def input_columns(self, available: List[str]) -> List[str]:
+        """
+        Colonne della fonte lette dall'analizzatore
+        
+        Args:
+            available: Colonne della fonte
+        
+        Returns:
+            Colonne presenti, con gli alias risolti come in _first_column
+        """
+        return resolve_columns(self.INPUT_COLUMNS, available)
+    
+    def can_analyze(self, available: List[str]) -> bool:
+        """Indica se la fonte contiene gli input minimi dell'analizzatore"""
+        required = self.REQUIRED_COLUMNS if self.REQUIRED_COLUMNS is not None else self.INPUT_COLUMNS
+        return not required or bool(resolve_columns(required, available))
+    
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Calcola lo stato parziale (fondibile) di un chunk di dati
+        
+        Args:
+            data: DataFrame con un chunk dei dati
+        
+        Returns:
+            Stato parziale composto da aggregati fondibili
+        """
+        raise NotImplementedError("partial() deve essere implementato")
+    
+    def merge(self, state: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Fonde due stati parziali
+        
+        Args:
+            state: Stato accumulato
+            other: Stato del nuovo chunk
+        
+        Returns:
+            Stato fuso
+        """
+        return merge_states(state, other)
+    
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calcola i risultati finali da uno stato (anche fuso da più chunk)
+        
+        Args:
+            state: Stato parziale
+        
+        Returns:
+            Dizionario con risultati analisi
+        """
+        raise NotImplementedError("finalize() deve essere implementato")
+    
+    def scale_results(self, results: Dict[str, Any], sample: Dict[str, Any],
+                      data: Optional[pd.DataFrame] = None, level: float = 0.95) -> Dict[str, Any]:
+        """
+        Riporta alla popolazione i risultati calcolati su un campione
+        
+        I conteggi di SCALED_RESULTS (e DISTINCT_RESULTS con il campione per
+        utenti) sono moltiplicati per il fattore di scala; per i KPI_RESULTS
+        viene aggiunto l'intervallo di confidenza in 'confidence_intervals'.
+        
+        Args:
+            results: Risultati di analyze() sul campione
+            sample: Descrizione del campione (get_stats del campionatore)
+            data: Campione analizzato (deviazione standard dei KPI mean)
+            level: Livello di confidenza
+        
+        Returns:
+            Nuovo dizionario dei risultati con le stime e gli intervalli
+        """
+        scaled = copy.deepcopy(results)
+        paths = self.SCALED_RESULTS + (self.DISTINCT_RESULTS if sample['mode'] == 'users' else [])
+        for path in paths:
+            scale_path(scaled, path.split('.'), sample['scale'])
+        
+        z = z_value(level)
+        intervals = {}
+        for key, kind in self.KPI_RESULTS.items():
+            value = results.get(key)
+            if value is None or isinstance(value, (dict, list)) or pd.isna(value):
+                continue
+            if kind == 'count':
+                interval = count_interval(value, sample, z)
+            elif kind == 'distinct':
+                interval = distinct_interval(value, sample, z)
+            elif kind == 'rate':
+                interval = rate_interval(value, sample, z)
+            else:
+                spec = self.KPI_COLUMNS.get(key)
+                columns = resolve_columns([spec], list(data.columns)) if data is not None and spec else []
+                if not columns:
+                    continue
+                values = pd.to_numeric(data[columns[0]], errors='coerce').dropna()
+                std = float(values.std()) if len(values) > 1 else 0.0
+                interval = mean_interval(value, std, len(values), sample, z)
+            if interval is not None:
+                intervals[key] = dict(interval, level=level)
+        
+        scaled['confidence_intervals'] = intervals
+        return scaled
     
     def _validate_columns(self, data: pd.DataFrame, required_cols: List[str]) -> bool:
         """Valida la presenza di colonne richieste"""
@@ -42,6 +211,42 @@ class BaseAnalyzer:
             return False
         return True
     
+    def _first_column(self, data: pd.DataFrame, candidates: List[str]) -> Optional[str]:
+        """Ritorna la prima colonna presente tra i candidati"""
+        for col in candidates:
+            if col in data.columns:
+                return col
+        return None
+    
+    def _ga4_param(self, data: pd.DataFrame, key: str) -> Optional[pd.Series]:
+        """
+        Parametro evento GA4 estratto su richiesta da event_params
+        
+        Args:
+            data: DataFrame GA4
+            key: Chiave del parametro (es. engagement_time_msec)
+        
+        Returns:
+            Colonna tipizzata, None se assente nei dati
+        """
+        if 'event_params' not in data.columns:
+            return None
+        
+        # Registra l'accessor data.ga4 (estrazione lazy con cache per chiave)
+        import loaders.ga4_params  # noqa: F401
+        
+        values = data.ga4.params([key])[key]
+        return values if values.notna().any() else None
+    
+    def _ga4_line_items(self, data: pd.DataFrame, event_names: Optional[List[str]] = None) -> Any:
+        """Righe prodotto GA4 (LineItems) dalla colonna items, None se assente"""
+        if 'items' not in data.columns:
+            return None
+        
+        import loaders.ga4_params  # noqa: F401
+        
+        return data.ga4.line_items(event_names)
+    
     def _clean_numeric(self, value):
         """Pulisce valori numerici"""
         try:
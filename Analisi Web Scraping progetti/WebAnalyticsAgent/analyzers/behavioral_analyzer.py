@@ -3,95 +3,171 @@ Behavioral Analyzer - Analizza il comportamento degli utenti
 """
 
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+import logging
+
 from .base_analyzer import BaseAnalyzer
+from .aggregates import KeyedSum, DistinctSet, outliers_above
+from .transitions import (
+    ORDER_COLUMNS, PAGE_COLUMNS, PAGE_VIEW_EVENTS, SESSION_COLUMNS, SESSION_USER_COLUMNS, TransitionMatrix
+)
+
+logger = logging.getLogger(__name__)
 
 
 class BehavioralAnalyzer(BaseAnalyzer):
     """Analizzatore del comportamento utenti"""
     
+    INPUT_COLUMNS = [
+        ('user_segment', 'user_type'), 'session_id', 'session_type', 'session_duration',
+        'pageviews', 'bot', 'page', 'previous_page', 'is_first_page', 'is_last_page', 'event',
+        # Transizioni ricavate dagli eventi (export GA4)
+        tuple(PAGE_COLUMNS), tuple(SESSION_COLUMNS), 'user_pseudo_id', tuple(ORDER_COLUMNS), 'event_name'
+    ]
+    SCALED_RESULTS = [
+        'user_flow.*.*', 'event_patterns.total_events', 'event_patterns.event_types.*',
+        'session_types.*', 'user_segments.*', 'anomalies.*'
+    ]
+    
     def __init__(self):
         super().__init__('BehavioralAnalyzer')
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Analizza il comportamento"""
-        self.results = {
-            'user_flow': self._analyze_user_flow(data),
-            'event_patterns': self._analyze_event_patterns(data),
-            'session_types': self._session_types(data),
-            'user_segments': self._segment_users_by_behavior(data),
-            'anomalies': self._detect_anomalies(data)
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Stato parziale del comportamento"""
+        segment_col = self._first_column(data, ['user_segment', 'user_type'])
+        
+        state = {
+            'rows': len(data),
+            'flow': None,
+            'events': None,
+            'sessions': DistinctSet.from_values(data['session_id']) if 'session_id' in data.columns else None,
+            'session_types': data.cube.counts('session_type') if 'session_type' in data.columns else None,
+            'segments': data.cube.counts(segment_col) if segment_col else None,
+            'durations': data.cube.counts('session_duration') if 'session_duration' in data.columns else None,
+            'pageviews': data.cube.counts('pageviews') if 'pageviews' in data.columns else None,
+            'bots': int((data['bot'] == True).sum()) if 'bot' in data.columns else None
+        }
+        
+        page_col = self._first_column(data, PAGE_COLUMNS)
+        transitions = self._get_page_transitions(data, page_col) if page_col else None
+        if transitions is not None:
+            state['flow'] = {
+                'transitions': transitions,
+                'entry': self._flagged_pages(data, 'is_first_page'),
+                'exit': self._flagged_pages(data, 'is_last_page')
+            }
+        
+        if 'event' in data.columns:
+            state['events'] = data.cube.counts('event')
+        
+        return state
+    
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultati dell'analisi comportamentale"""
+        return {
+            'user_flow': self._analyze_user_flow(state),
+            'event_patterns': self._analyze_event_patterns(state),
+            'session_types': self._session_types(state),
+            'user_segments': self._segment_users_by_behavior(state),
+            'anomalies': self._detect_anomalies(state)
         }
-        return self.results
     
-    def _analyze_user_flow(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_user_flow(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analizza il flusso utenti"""
         flow = {}
         
-        if 'page' in data.columns and 'session_id' in data.columns:
-            flow['page_transitions'] = self._get_page_transitions(data)
-            flow['entry_pages'] = self._get_entry_pages(data)
-            flow['exit_pages'] = self._get_exit_pages(data)
+        if state['flow'] is not None:
+            transitions = state['flow']['transitions']
+            # Senza flag di ingresso/uscita: primo e ultimo evento delle sessioni
+            entry = state['flow']['entry'] if state['flow']['entry'] is not None else transitions.entries()
+            exit_pages = state['flow']['exit'] if state['flow']['exit'] is not None else transitions.exits()
+            flow['page_transitions'] = transitions.top(10)
+            flow['entry_pages'] = entry.top(10) if entry is not None else {}
+            flow['exit_pages'] = exit_pages.top(10) if exit_pages is not None else {}
+            flow['page_degrees'] = self._page_degrees(transitions)
+            if transitions.unordered_sessions:
+                # Sessioni ricucite tra esecuzioni incrementali con parti sovrapposte nel tempo
+                flow['unordered_sessions'] = transitions.unordered_sessions
+                logger.warning(f"⚠️  {transitions.unordered_sessions} sessioni con eventi sovrapposti tra "
+                               f"esecuzioni incrementali: transizioni al bordo non contate")
         
         return flow
     
-    def _get_page_transitions(self, data: pd.DataFrame) -> Dict[str, int]:
-        """Transizioni tra pagine"""
-        transitions = {}
+    def _get_page_transitions(self, data: pd.DataFrame, page_col: str) -> Optional[TransitionMatrix]:
+        """
+        Transizioni tra pagine
+        
+        Dalla colonna previous_page se presente, altrimenti dagli eventi
+        ordinati nel tempo dentro ogni sessione (solo le pagine viste se
+        c'è event_name).
+        
+        Returns:
+            Matrice delle transizioni, None senza pagina precedente né sessione
+        """
+        if 'previous_page' in data.columns:
+            return TransitionMatrix.from_pairs(data['previous_page'], data[page_col])
         
-        if 'previous_page' in data.columns and 'page' in data.columns:
-            for _, row in data.iterrows():
-                transition = f"{row['previous_page']} → {row['page']}"
-                transitions[transition] = transitions.get(transition, 0) + 1
+        session_col = self._first_column(data, SESSION_COLUMNS)
+        if session_col is None:
+            return None
         
-        return dict(sorted(transitions.items(), key=lambda x: x[1], reverse=True)[:10])
+        session_cols = [session_col]
+        user_col = SESSION_USER_COLUMNS.get(session_col)
+        if user_col in data.columns:
+            session_cols.insert(0, user_col)
+        
+        events = data
+        if 'event_name' in data.columns:
+            events = data[data['event_name'].isin(PAGE_VIEW_EVENTS)]
+        
+        return TransitionMatrix.from_events(events, page_col, session_cols, self._first_column(data, ORDER_COLUMNS))
     
-    def _get_entry_pages(self, data: pd.DataFrame) -> Dict[str, int]:
-        """Pagine di ingresso"""
-        if 'is_first_page' in data.columns and 'page' in data.columns:
-            entry = data[data['is_first_page'] == True]['page'].value_counts().head(10).to_dict()
-            return entry
-        return {}
+    def _page_degrees(self, transitions: TransitionMatrix, limit: int = 10) -> Dict[str, Dict[str, int]]:
+        """Pagine con più destinazioni distinte: pagine successive e precedenti distinte"""
+        out_degree = transitions.out_degree()
+        in_degree = transitions.in_degree()
+        return {
+            str(page): {'out': int(count), 'in': int(in_degree.get(page))}
+            for page, count in out_degree.top(limit).items()
+        }
     
-    def _get_exit_pages(self, data: pd.DataFrame) -> Dict[str, int]:
-        """Pagine di uscita"""
-        if 'is_last_page' in data.columns and 'page' in data.columns:
-            exit_pages = data[data['is_last_page'] == True]['page'].value_counts().head(10).to_dict()
-            return exit_pages
-        return {}
+    def _flagged_pages(self, data: pd.DataFrame, flag: str) -> Optional[KeyedSum]:
+        """Pagine con un flag attivo (ingresso/uscita)"""
+        if flag in data.columns and 'page' in data.columns:
+            return KeyedSum.from_counts(data.loc[data[flag] == True, 'page'])
+        return None
     
-    def _analyze_event_patterns(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_event_patterns(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analizza pattern di eventi"""
         patterns = {}
         
-        if 'event' in data.columns:
-            patterns['total_events'] = len(data)
-            patterns['event_types'] = data['event'].value_counts().head(15).to_dict()
-            patterns['events_per_session'] = float(len(data) / data['session_id'].nunique()) if 'session_id' in data.columns else 0
+        if state['events'] is not None:
+            patterns['total_events'] = state['rows']
+            patterns['event_types'] = state['events'].top(15)
+            sessions = len(state['sessions']) if state['sessions'] is not None else 0
+            patterns['events_per_session'] = float(state['rows'] / sessions) if sessions > 0 else 0
         
         return patterns
     
-    def _session_types(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _session_types(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Tipologie di sessione"""
         session_types = {}
         
-        if 'session_type' in data.columns:
-            session_types = data['session_type'].value_counts().to_dict()
+        if state['session_types'] is not None:
+            session_types = state['session_types'].top()
         
         return session_types
     
-    def _segment_users_by_behavior(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _segment_users_by_behavior(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Segmenta utenti per comportamento"""
         segments = {}
         
-        if 'user_segment' in data.columns:
-            segments = data['user_segment'].value_counts().to_dict()
-        elif 'user_type' in data.columns:
-            segments = data['user_type'].value_counts().to_dict()
+        if state['segments'] is not None:
+            segments = state['segments'].top()
         
         return segments
     
-    def _detect_anomalies(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _detect_anomalies(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Rileva anomalie"""
         anomalies = {
             'unusual_session_durations': 0,
@@ -99,17 +175,14 @@ class BehavioralAnalyzer(BaseAnalyzer):
             'bot_activity': 0
         }
         
-        if 'session_duration' in data.columns:
-            mean = data['session_duration'].mean()
-            std = data['session_duration'].std()
-            anomalies['unusual_session_durations'] = len(data[data['session_duration'] > mean + 3*std])
+        # Conteggio dei valori: media e deviazione standard esatte anche a chunk
+        if state['durations'] is not None:
+            anomalies['unusual_session_durations'] = outliers_above(state['durations'])
         
-        if 'pageviews' in data.columns:
-            mean = data['pageviews'].mean()
-            std = data['pageviews'].std()
-            anomalies['unusual_pageviews'] = len(data[data['pageviews'] > mean + 3*std])
+        if state['pageviews'] is not None:
+            anomalies['unusual_pageviews'] = outliers_above(state['pageviews'])
         
-        if 'bot' in data.columns:
-            anomalies['bot_activity'] = int((data['bot'] == True).sum())
+        if state['bots'] is not None:
+            anomalies['bot_activity'] = state['bots']
         
         return anomalies
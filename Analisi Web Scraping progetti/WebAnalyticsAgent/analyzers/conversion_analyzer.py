@@ -2,96 +2,396 @@
 Conversion Analyzer - Analizza conversioni e obiettivi
 """
 
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_analyzer import BaseAnalyzer
+from .aggregates import KeyedSum, _hash_values
+from .performance import OTHER_LABEL
+from .cube import SESSION_INPUTS
+
+# Dimensioni del dettaglio delle conversioni: colonne candidate (vale la prima presente)
+BREAKDOWN_COLUMNS = {
+    'source': ['source', 'traffic_source', 'utm_source', 'ts_source'],
+    'medium': ['medium', 'utm_medium', 'ts_medium'],
+    'campaign': ['campaign', 'utm_campaign', 'ts_campaign'],
+    'device': ['device_type', 'device', 'category']
+}
+
+# Sessione degli eventi GA4 (ga_session_id è univoco solo per utente)
+GA4_SESSION_COLUMNS = ['user_pseudo_id', 'ga_session_id']
+
+# Misure del dettaglio delle conversioni (vedi cube._measures)
+BREAKDOWN_MEASURES = ('rows', 'sessions', 'conversions', 'converted_sessions', 'conversion_value')
+
+
+class LandingAttribution:
+    """
+    Misure per landing page fondibili tra chunk
+    
+    Ogni chunk tiene il primo ingresso di ogni sua sessione e le misure delle
+    righe sommate per sessione (hash a 64 bit della chiave). Le righe sono
+    attribuite alla landing page solo nello stato fuso, dove vale il primo
+    ingresso della sessione nel flusso come nel caricamento completo: merge()
+    riceve gli stati nell'ordine di lettura, quindi quello accumulato parte
+    sempre dall'inizio della fonte. Restano in sospeso solo le righe delle
+    sessioni il cui ingresso non è (ancora) arrivato.
+    """
+    
+    def __init__(self):
+        """Inizializza un aggregato vuoto"""
+        self.pages: Dict[str, KeyedSum] = {}
+        # Hash della sessione -> landing page (NaN = ingresso senza pagina)
+        self.entries = pd.Series(dtype=object, index=pd.Index([], dtype=np.uint64))
+        # Misure sommate per sessione delle righe non ancora attribuite
+        self.pending = pd.DataFrame(index=pd.Index([], dtype=np.uint64))
+        # Righe di sessioni con l'ingresso senza pagina
+        self.lost_rows = 0
+    
+    @classmethod
+    def from_rows(cls, measures: pd.DataFrame, sessions: np.ndarray, entries: pd.Series) -> 'LandingAttribution':
+        """
+        Crea l'aggregato da un chunk
+        
+        Args:
+            measures: Misure per riga (cubo)
+            sessions: Hash della sessione di ogni riga
+            entries: Landing page per hash di sessione (ingressi del chunk, in ordine)
+        """
+        landing = cls()
+        measures = measures[[measure for measure in BREAKDOWN_MEASURES if measure in measures.columns]]
+        landing.pages = {measure: KeyedSum() for measure in measures.columns}
+        landing.entries = entries[~entries.index.duplicated()]
+        landing.pending = measures.groupby(sessions, sort=False).sum()
+        return landing
+    
+    def _attribute(self):
+        """Somma alle landing page le righe in sospeso delle sessioni con ingresso noto"""
+        if self.pending.empty or self.entries.empty:
+            return
+        at = self.entries.index.get_indexer(self.pending.index)
+        known = at >= 0
+        if not known.any():
+            return
+        
+        page_codes, pages = pd.factorize(self.entries.to_numpy())
+        codes = np.where(known, page_codes[at], -1)
+        landing = pd.Categorical.from_codes(codes, pd.Index(pages, dtype=object))
+        grouped = self.pending.groupby(landing, sort=True, observed=True).sum()
+        grouped = grouped[grouped['rows'] > 0]
+        for measure in self.pages:
+            self.pages[measure].merge(KeyedSum(grouped[measure].to_dict()))
+        
+        self.lost_rows += int(self.pending['rows'][known & (codes < 0)].sum())
+        self.pending = self.pending[~known]
+    
+    def merge(self, other: 'LandingAttribution') -> 'LandingAttribution':
+        """Fonde l'aggregato del chunk successivo nel flusso"""
+        # Questo stato parte dall'inizio della fonte: i suoi ingressi sono definitivi
+        self._attribute()
+        for measure, values in other.pages.items():
+            self.pages[measure] = self.pages[measure].merge(values) if measure in self.pages else values
+        self.lost_rows += other.lost_rows
+        
+        fresh = other.entries[~other.entries.index.isin(self.entries.index)]
+        self.entries = pd.concat([self.entries, fresh]) if len(self.entries) else fresh
+        self.pending = pd.concat([self.pending, other.pending]) if len(self.pending) else other.pending
+        self._attribute()
+        return self
+    
+    @property
+    def unattributed_rows(self) -> int:
+        """Righe di sessioni senza ingresso (o con l'ingresso senza pagina)"""
+        self._attribute()
+        return int(self.pending['rows'].sum()) + self.lost_rows if 'rows' in self.pending.columns else self.lost_rows
+    
+    def measures(self) -> Dict[str, Optional[KeyedSum]]:
+        """Misure per landing page (None per le misure non disponibili)"""
+        self._attribute()
+        return {measure: self.pages.get(measure) for measure in BREAKDOWN_MEASURES}
 
 
 class ConversionAnalyzer(BaseAnalyzer):
     """Analizzatore delle conversioni"""
     
+    INPUT_COLUMNS = [
+        ('converted', 'goal_completed'), ('conversion_value', 'revenue', 'purchase_revenue'),
+        'page', 'funnel_step', 'cart_status',
+        # Righe prodotto GA4 degli acquisti
+        'items', 'event_name',
+        # Dettaglio per sorgente, mezzo, campagna, dispositivo e landing page
+        *[tuple(candidates) for candidates in BREAKDOWN_COLUMNS.values()],
+        'landing_page', 'session_id', 'is_first_page', 'page_location', *GA4_SESSION_COLUMNS,
+        *SESSION_INPUTS
+    ]
+    REQUIRED_COLUMNS = [
+        ('converted', 'goal_completed'), ('conversion_value', 'revenue', 'purchase_revenue'),
+        'funnel_step', 'cart_status', 'items'
+    ]
+    SCALED_RESULTS = [
+        'total_conversions', 'converted_sessions', 'conversion_value', 'top_conversion_pages.*',
+        'conversion_funnel.*',
+        'abandoned_carts.abandoned_carts',
+        'product_performance.top_products_by_revenue.*.revenue',
+        'product_performance.top_products_by_revenue.*.quantity',
+        'product_performance.top_products_by_quantity.*',
+        'product_performance.basket_size.baskets',
+        'conversion_breakdown.*.*.rows', 'conversion_breakdown.*.*.sessions',
+        'conversion_breakdown.*.*.conversions',
+        'conversion_breakdown.*.*.conversion_value', 'unattributed_landing_rows'
+    ]
+    KPI_RESULTS = {'total_conversions': 'count', 'conversion_rate': 'rate'}
+    
     def __init__(self):
         super().__init__('ConversionAnalyzer')
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Analizza le conversioni"""
-        self.results = {
-            'total_conversions': self._count_conversions(data),
-            'conversion_rate': self._calculate_conversion_rate(data),
-            'conversion_value': self._calculate_conversion_value(data),
-            'avg_conversion_value': self._calculate_avg_conversion_value(data),
-            'top_conversion_pages': self._top_conversion_pages(data),
-            'conversion_by_source': self._conversion_by_source(data),
-            'conversion_funnel': self._conversion_funnel(data),
-            'abandoned_carts': self._abandoned_carts(data)
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Stato parziale delle conversioni
+        
+        Conteggi e valori vengono dalle misure conversions e conversion_value
+        del cubo (una maschera di conversione per chunk, vedi
+        cube.conversion_mask) e dai suoi raggruppamenti per dimensione. I
+        conversion rate sono per sessione: sessioni convertite su sessioni
+        (negli eventi GA4 sessionizzati non su eventi), come nelle
+        performance per dimensione.
+        """
+        conversions = data.cube.total('conversions')
+        conversion_value = data.cube.total('conversion_value')
+        converted_sessions = data.cube.converted_sessions()
+        
+        state = {
+            'rows': len(data),
+            'sessions': data.cube.session_total(),
+            'conversions': int(conversions) if conversions is not None else 0,
+            'converted_sessions': converted_sessions or 0,
+            'conversion_value': float(conversion_value) if conversion_value is not None else 0.0,
+            'conversion_pages': None,
+            'source_sessions': None,
+            'source_conversions': None,
+            'breakdown': self._breakdown_partial(data),
+            'landing': self._landing_partial(data),
+            'funnel': None,
+            'abandoned': None,
+            'products': self._products_partial(data)
         }
-        return self.results
-    
-    def _count_conversions(self, data: pd.DataFrame) -> int:
-        """Conta le conversioni"""
-        if 'converted' in data.columns:
-            return (data['converted'] == 1).sum()
-        elif 'goal_completed' in data.columns:
-            return (data['goal_completed'] == 1).sum()
-        return 0
-    
-    def _calculate_conversion_rate(self, data: pd.DataFrame) -> float:
-        """Calcola conversion rate"""
-        conversions = self._count_conversions(data)
-        total = len(data)
-        return (conversions / total * 100) if total > 0 else 0
+        
+        # Senza la maschera di conversione non ci sono conversioni per pagina o sorgente
+        if 'page' in data.columns:
+            state['conversion_pages'] = data.cube.sums('page', 'conversions', positive=True) or KeyedSum()
+        
+        if 'source' in data.columns:
+            state['source_sessions'] = data.cube.sessions('source')
+            state['source_conversions'] = data.cube.converted_sessions('source') or KeyedSum()
+        
+        if 'funnel_step' in data.columns:
+            state['funnel'] = data.cube.counts('funnel_step')
+        
+        if 'cart_status' in data.columns:
+            state['abandoned'] = int((data['cart_status'] == 'abandoned').sum())
+        
+        return state
     
-    def _calculate_conversion_value(self, data: pd.DataFrame) -> float:
-        """Calcola valore totale conversioni"""
-        if 'conversion_value' in data.columns:
-            return float(data[data['converted'] == 1]['conversion_value'].sum())
-        elif 'revenue' in data.columns:
-            return float(data['revenue'].sum())
-        return 0.0
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultati dell'analisi delle conversioni"""
+        results = {
+            'total_conversions': state['conversions'],
+            'converted_sessions': state['converted_sessions'],
+            'conversion_rate': self._calculate_conversion_rate(state),
+            'conversion_value': state['conversion_value'],
+            'avg_conversion_value': self._calculate_avg_conversion_value(state),
+            'top_conversion_pages': self._top_conversion_pages(state),
+            'conversion_by_source': self._conversion_by_source(state),
+            'conversion_breakdown': self._conversion_breakdown(state),
+            'conversion_funnel': self._conversion_funnel(state),
+            'abandoned_carts': self._abandoned_carts(state),
+            'product_performance': self._product_performance(state)
+        }
+        
+        if state['landing'] is not None:
+            # Righe di sessioni senza ingresso nella fonte (landing page derivata)
+            results['unattributed_landing_rows'] = state['landing'].unattributed_rows
+        
+        return results
+    
+    def _calculate_conversion_rate(self, state: Dict[str, Any]) -> float:
+        """Calcola conversion rate (sessioni convertite su sessioni)"""
+        conversions = state['converted_sessions']
+        total = state['sessions']
+        return (conversions / total * 100) if total > 0 else 0
     
-    def _calculate_avg_conversion_value(self, data: pd.DataFrame) -> float:
+    def _calculate_avg_conversion_value(self, state: Dict[str, Any]) -> float:
         """Calcola valore medio conversione"""
-        total_value = self._calculate_conversion_value(data)
-        conversions = self._count_conversions(data)
+        total_value = state['conversion_value']
+        conversions = state['conversions']
         return total_value / conversions if conversions > 0 else 0
     
-    def _top_conversion_pages(self, data: pd.DataFrame, limit: int = 10) -> Dict[str, int]:
+    def _top_conversion_pages(self, state: Dict[str, Any], limit: int = 10) -> Dict[str, int]:
         """Pagine con più conversioni"""
-        if 'page' in data.columns:
-            converted = data[data['converted'] == 1]
-            return converted['page'].value_counts().head(limit).to_dict()
+        if state['conversion_pages'] is not None:
+            return state['conversion_pages'].top(limit)
         return {}
     
-    def _conversion_by_source(self, data: pd.DataFrame) -> Dict[str, float]:
-        """Conversioni per sorgente"""
+    def _conversion_by_source(self, state: Dict[str, Any]) -> Dict[str, float]:
+        """Conversion rate per sorgente (sessioni convertite su sessioni)"""
         conversion_by_source = {}
         
-        if 'source' in data.columns:
-            sources = data['source'].unique()
-            for source in sources:
-                source_data = data[data['source'] == source]
-                conversions = (source_data['converted'] == 1).sum()
-                rate = (conversions / len(source_data) * 100) if len(source_data) > 0 else 0
+        if state['source_sessions'] is not None:
+            for source, sessions in state['source_sessions'].values.items():
+                conversions = state['source_conversions'].get(source)
+                rate = (conversions / sessions * 100) if sessions > 0 else 0
                 conversion_by_source[str(source)] = rate
         
         return conversion_by_source
     
-    def _conversion_funnel(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _breakdown_partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Righe, conversioni e valore per sorgente, mezzo, campagna, dispositivo e landing page (se colonna)"""
+        columns = {name: self._first_column(data, candidates) for name, candidates in BREAKDOWN_COLUMNS.items()}
+        if 'landing_page' in data.columns:
+            columns['landing_page'] = 'landing_page'
+        
+        # Solo le misure del dettaglio (lo stato resta piccolo)
+        return {
+            name: {measure: data.cube.dimension(col).get(measure) for measure in BREAKDOWN_MEASURES}
+            for name, col in columns.items() if col is not None
+        }
+    
+    def _landing_partial(self, data: pd.DataFrame) -> Optional[LandingAttribution]:
+        """
+        Misure per landing page delle sessioni del chunk
+        
+        Senza la colonna landing_page (aggiunta dai loader di access log ed
+        eventi GA4) la pagina di ingresso è quella della riga is_first_page o
+        dell'evento GA4 session_start. Le righe di una sessione iniziata in un
+        altro chunk restano in sospeso nello stato (LandingAttribution) finché
+        l'ingresso non arriva; solo quelle di sessioni senza ingresso nella
+        fonte restano non attribuite.
+        
+        Returns:
+            LandingAttribution, None se la landing page non è ricavabile
+        """
+        if 'landing_page' in data.columns:
+            return None
+        
+        if {'session_id', 'page', 'is_first_page'} <= set(data.columns):
+            session_cols, page_col = ['session_id'], 'page'
+            entries = data['is_first_page'] == True
+        elif set(GA4_SESSION_COLUMNS + ['page_location', 'event_name']) <= set(data.columns):
+            session_cols, page_col = GA4_SESSION_COLUMNS, 'page_location'
+            entries = data['event_name'] == 'session_start'
+        else:
+            return None
+        
+        # Righe di ingresso (con la sessione) e hash della sessione di ogni riga
+        entries &= data[session_cols].notna().all(axis=1)
+        sessions = _hash_values(data[session_cols])
+        first = pd.Series(data.loc[entries, page_col].to_numpy(dtype=object),
+                          index=pd.Index(sessions[entries.to_numpy()], dtype=np.uint64))
+        return LandingAttribution.from_rows(data.cube.measures(), sessions, first)
+    
+    def _conversion_breakdown(self, state: Dict[str, Any], limit: int = 10) -> Dict[str, Dict]:
+        """
+        Conversioni per dimensione: righe, sessioni, conversioni, conversion rate e valore
+        
+        Per ogni dimensione i valori con più sessioni (limit), gli altri sommati
+        in 'other'. Il conversion rate è per sessione (sessioni convertite su
+        sessioni); senza le misure di sessione valgono righe e conversioni.
+        """
+        dimensions = dict(state['breakdown'])
+        if state['landing'] is not None:
+            dimensions['landing_page'] = state['landing'].measures()
+        
+        breakdown = {}
+        
+        for name, aggregates in dimensions.items():
+            rows, conversions, values = aggregates['rows'], aggregates['conversions'], aggregates['conversion_value']
+            sessions = aggregates.get('sessions') if aggregates.get('sessions') is not None else rows
+            converted_sessions = aggregates.get('converted_sessions')
+            if converted_sessions is None:
+                converted_sessions = conversions
+            top = sessions.top(limit)
+            groups = [(str(key), [key]) for key in top]
+            other = [key for key in rows.values if key not in top]
+            if other:
+                groups.append((OTHER_LABEL, other))
+            
+            entries = {}
+            for label, keys in groups:
+                count = sum(sessions.get(key) for key in keys)
+                converted = sum(converted_sessions.get(key) for key in keys) if converted_sessions is not None else 0
+                entries[label] = {
+                    'rows': int(sum(rows.get(key) for key in keys)),
+                    'sessions': int(count),
+                    'conversions': int(sum(conversions.get(key) for key in keys)) if conversions is not None else 0,
+                    'conversion_rate': float(converted / count * 100) if count > 0 else 0,
+                    'conversion_value': float(sum(values.get(key) for key in keys)) if values is not None else 0.0
+                }
+            breakdown[name] = entries
+        
+        return breakdown
+    
+    def _conversion_funnel(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Analizza il funnel di conversione"""
         funnel = {}
         
-        if 'funnel_step' in data.columns:
-            funnel = data['funnel_step'].value_counts().sort_index().to_dict()
+        if state['funnel'] is not None:
+            funnel = state['funnel'].sorted_by_key()
         
         return funnel
     
-    def _abandoned_carts(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _abandoned_carts(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analizza carrelli abbandonati"""
         abandoned = {}
         
-        if 'cart_status' in data.columns:
-            abandoned_count = (data['cart_status'] == 'abandoned').sum()
+        if state['abandoned'] is not None:
+            abandoned_count = state['abandoned']
             abandoned['abandoned_carts'] = abandoned_count
-            abandoned['abandonment_rate'] = (abandoned_count / len(data) * 100) if len(data) > 0 else 0
+            abandoned['abandonment_rate'] = (abandoned_count / state['rows'] * 100) if state['rows'] > 0 else 0
         
         return abandoned
+    
+    def _products_partial(self, data: pd.DataFrame) -> Any:
+        """Stato parziale per prodotto dalle righe items degli acquisti GA4"""
+        line_items = self._ga4_line_items(data, ['purchase'])
+        if line_items is None:
+            return None
+        
+        items = line_items.table
+        counts = line_items.items_per_event()
+        names = items.drop_duplicates('item_id').set_index('item_id')['item_name']
+        
+        return {
+            'revenue': KeyedSum.from_sums(items['item_id'], items['item_revenue']),
+            'quantity': KeyedSum.from_sums(items['item_id'], items['quantity']),
+            'names': {item_id: str(name) for item_id, name in names.items()},
+            'baskets': int((counts > 0).sum()),
+            'basket_items': int(counts.sum()),
+            'basket_quantity': int(items['quantity'].sum())
+        }
+    
+    def _product_performance(self, state: Dict[str, Any], limit: int = 10) -> Dict[str, Any]:
+        """Ricavi per prodotto, top prodotti e dimensione del carrello"""
+        products = state['products']
+        if products is None:
+            return {}
+        
+        baskets = products['baskets']
+        return {
+            'distinct_products': len(products['revenue']),
+            'top_products_by_revenue': {
+                str(item_id): {
+                    'name': products['names'].get(item_id),
+                    'revenue': float(revenue),
+                    'quantity': int(products['quantity'].get(item_id))
+                }
+                for item_id, revenue in products['revenue'].top(limit).items()
+            },
+            'top_products_by_quantity': {
+                str(item_id): int(quantity) for item_id, quantity in products['quantity'].top(limit).items()
+            },
+            'basket_size': {
+                'baskets': baskets,
+                'avg_items': products['basket_items'] / baskets if baskets > 0 else 0.0,
+                'avg_quantity': products['basket_quantity'] / baskets if baskets > 0 else 0.0
+            }
+        }
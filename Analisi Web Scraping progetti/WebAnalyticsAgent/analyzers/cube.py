@@ -0,0 +1,292 @@
+"""
+Cube - Aggregati per dimensione condivisi tra gli analizzatori
+"""
+
+import threading
+import pandas as pd
+from typing import Callable, Dict, Any, Optional, Tuple, Union
+
+from .aggregates import DistinctSet, KeyedDistinct, KeyedSum
+from .derived import DERIVED_COLUMNS, frame_memo
+
+# Conversione: prima colonna flag presente (== 1), altrimenti eventi GA4 di conversione
+CONVERSION_COLUMNS = ['converted', 'goal_completed']
+CONVERSION_EVENTS = ['purchase']
+
+# Colonne lette dalla maschera di conversione, come alias (vale la prima presente)
+CONVERSION_INPUT = tuple(CONVERSION_COLUMNS + ['event_name'])
+
+# Colonne delle misure per sessione (sessions, converted_sessions), lette se presenti
+SESSION_INPUTS = ['sessions', 'session_converted']
+
+# Colonna dell'utente, come alias (vale la prima presente). Negli export GA4
+# user_pseudo_id c'è sempre, user_id solo per gli utenti autenticati (come nel campionamento)
+USER_COLUMNS = ['user_pseudo_id', 'user_id']
+
+
+def conversion_mask(data: pd.DataFrame) -> Optional[pd.Series]:
+    """
+    Righe convertite
+    
+    Args:
+        data: Chunk di dati
+    
+    Returns:
+        Maschera booleana, None se i dati non indicano le conversioni
+    """
+    for col in CONVERSION_COLUMNS:
+        if col in data.columns:
+            return data[col] == 1
+    if 'event_name' in data.columns:
+        return data['event_name'].isin(CONVERSION_EVENTS)
+    return None
+
+
+def conversion_values(data: pd.DataFrame, converted: Optional[pd.Series]) -> Optional[pd.Series]:
+    """
+    Valore delle conversioni per riga
+    
+    conversion_value (o purchase_revenue negli export GA4) conta solo sulle
+    righe convertite; in sua assenza vale tutta la colonna revenue.
+    
+    Args:
+        data: Chunk di dati
+        converted: Maschera di conversion_mask
+    
+    Returns:
+        Valori (0 sulle righe senza valore), None se non disponibili
+    """
+    if 'conversion_value' in data.columns:
+        if converted is None:
+            return None
+        return data['conversion_value'].where(converted, 0).fillna(0)
+    if 'revenue' in data.columns:
+        return data['revenue'].fillna(0)
+    if 'purchase_revenue' in data.columns and converted is not None:
+        return data['purchase_revenue'].astype('float64').where(converted, 0).fillna(0)
+    return None
+
+
+def _measures(data: pd.DataFrame) -> Dict[str, pd.Series]:
+    """
+    Misure per riga disponibili nei dati (sommate per ogni dimensione)
+    
+    rows, sessions, duration_sum/duration_count (session_duration),
+    bounces/bounce_rows (bounced), conversions e conversion_value (vedi
+    conversion_mask), converted_sessions (session_converted degli eventi
+    GA4 sessionizzati, sulla prima riga della sessione), revenue
+    """
+    measures = {'rows': pd.Series(1, index=data.index, dtype='int64')}
+    if 'sessions' in data.columns:
+        measures['sessions'] = data['sessions'].fillna(0)
+    if 'session_converted' in data.columns:
+        measures['converted_sessions'] = (data['session_converted'] == 1).astype(int)
+    if 'session_duration' in data.columns:
+        measures['duration_sum'] = data['session_duration'].fillna(0)
+        measures['duration_count'] = data['session_duration'].notna().astype(int)
+    if 'bounced' in data.columns:
+        measures['bounces'] = (data['bounced'] == 1).astype(int)
+        measures['bounce_rows'] = data['bounced'].notna().astype(int)
+    
+    converted = conversion_mask(data)
+    if converted is not None:
+        measures['conversions'] = converted.astype(int)
+    values = conversion_values(data, converted)
+    if values is not None:
+        measures['conversion_value'] = values
+    
+    if 'revenue' in data.columns:
+        measures['revenue'] = data['revenue'].fillna(0)
+    return measures
+
+
+class AggregationCube:
+    """
+    Cubo di un chunk: per ogni dimensione richiesta, conteggio delle righe e
+    somme delle misure in un solo raggruppamento, calcolato una volta per
+    chunk e condiviso da tutti gli analizzatori che leggono la dimensione
+    
+    Le dimensioni hour, date, day_of_week e page sono le colonne derivate
+    di data.derived (page normalizzata), mai scritte nel DataFrame. Gli
+    aggregati restituiti sono copie: gli stati fusi tra chunk non
+    modificano il cubo né gli stati degli altri analizzatori. Con gli
+    analizzatori in thread paralleli ogni aggregato è comunque calcolato una
+    sola volta: chi lo chiede per secondo attende il primo.
+    """
+    
+    def __init__(self, data: pd.DataFrame):
+        """
+        Inizializza il cubo
+        
+        Args:
+            data: Chunk di dati
+        """
+        self.data = data
+        self._measures: Dict[Any, pd.DataFrame] = {}
+        self._dimensions: Dict[Any, Dict[str, Dict[Any, Any]]] = {}
+        self._users: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[int, Any], threading.Lock] = {}
+    
+    def _cached(self, store: Dict[Any, Any], key: Any, compute: Callable[[], Any]) -> Any:
+        """Valore di store[key], calcolato una sola volta anche da thread concorrenti"""
+        if key not in store:
+            with self._lock:
+                lock = self._key_locks.setdefault((id(store), key), threading.Lock())
+            with lock:
+                if key not in store:
+                    store[key] = compute()
+        return store[key]
+    
+    def _column(self, col: str) -> pd.Series:
+        """Colonna dei dati o colonna derivata (DERIVED_COLUMNS)"""
+        if col in DERIVED_COLUMNS:
+            return self.data.derived[col]
+        return self.data[col]
+    
+    def measures(self) -> pd.DataFrame:
+        """Misure per riga disponibili nel chunk (una colonna per misura)"""
+        return self._cached(self._measures, None,
+                            lambda: pd.DataFrame(_measures(self.data), index=self.data.index))
+    
+    def dimension(self, col: Union[str, Tuple[str, ...]]) -> Dict[str, KeyedSum]:
+        """
+        Aggregati di una dimensione (NaN esclusi, come value_counts)
+        
+        Args:
+            col: Colonna della dimensione, o tupla di colonne per una
+                combinazione (chiavi tupla, righe con un NaN escluse)
+        
+        Returns:
+            Dizionario misura -> KeyedSum per valore (solo misure disponibili)
+        """
+        keys = (lambda: [self._column(c) for c in col]) if isinstance(col, tuple) else (lambda: self._column(col))
+        aggregates = self._cached(self._dimensions, col, lambda: self._group(keys()))
+        return {name: KeyedSum(values) for name, values in aggregates.items()}
+    
+    def _group(self, keys: Any) -> Dict[str, Dict[Any, Any]]:
+        """Raggruppa tutte le misure per keys (Series o lista di Series)"""
+        # Ordine delle chiavi come value_counts(sort=False): categorie o prima apparizione
+        categorical = isinstance(keys, pd.Series) and isinstance(keys.dtype, pd.CategoricalDtype)
+        grouped = self.measures().groupby(keys, sort=categorical, observed=True).sum()
+        # Le colonne categoriche possono riportare gruppi vuoti
+        grouped = grouped[grouped['rows'] > 0]
+        return {name: grouped[name].to_dict() for name in grouped.columns}
+    
+    def counts(self, col: Union[str, Tuple[str, ...]]) -> KeyedSum:
+        """Righe per valore della dimensione (come KeyedSum.from_counts)"""
+        return self.dimension(col)['rows']
+    
+    def sums(self, col: Union[str, Tuple[str, ...]], measure: str, positive: bool = False) -> Optional[KeyedSum]:
+        """
+        Somma di una misura per valore della dimensione
+        
+        Args:
+            col: Colonna della dimensione
+            measure: Nome della misura (vedi _measures)
+            positive: Mantiene solo i valori con somma positiva
+        
+        Returns:
+            KeyedSum, None se la misura non è disponibile
+        """
+        sums = self.dimension(col).get(measure)
+        if sums is None or not positive:
+            return sums
+        return KeyedSum({key: value for key, value in sums.values.items() if value > 0})
+    
+    def sessions(self, col: Union[str, Tuple[str, ...]]) -> KeyedSum:
+        """
+        Sessioni per valore della dimensione
+        
+        Somma della colonna sessions se presente (eventi GA4 sessionizzati:
+        1 sulla prima riga della sessione), altrimenti le righe. I valori
+        presenti solo sulle righe successive alla prima sono esclusi.
+        """
+        aggregates = self.dimension(col)
+        if 'sessions' not in aggregates:
+            return aggregates['rows']
+        return KeyedSum({key: value for key, value in aggregates['sessions'].values.items() if value > 0})
+    
+    def session_total(self) -> int:
+        """Sessioni del chunk (colonna sessions se presente, altrimenti le righe)"""
+        sessions = self.total('sessions')
+        return int(sessions) if sessions is not None else len(self.data)
+    
+    def converted_sessions(self, col: Optional[Union[str, Tuple[str, ...]]] = None) -> Any:
+        """
+        Sessioni convertite, complessive o per valore della dimensione
+        
+        Misura converted_sessions se presente, altrimenti conversions (una
+        riga convertita per sessione, come nei CSV di sessione).
+        
+        Args:
+            col: Colonna della dimensione (None = totale del chunk)
+        
+        Returns:
+            Totale (col None) o KeyedSum per valore; None senza conversioni
+        """
+        measure = 'converted_sessions' if 'converted_sessions' in self.measures().columns else 'conversions'
+        if col is None:
+            total = self.total(measure)
+            return int(total) if total is not None else None
+        return self.dimension(col).get(measure)
+    
+    def total(self, measure: str) -> Optional[float]:
+        """Totale di una misura sul chunk, None se non disponibile"""
+        measures = self.measures()
+        return measures[measure].sum() if measure in measures.columns else None
+    
+    def performance(self, col: Union[str, Tuple[str, ...]]) -> Dict[str, Any]:
+        """
+        Stato delle performance (sessioni, durata, bounce, conversioni) per valore
+        
+        Le sessioni sono la somma della colonna sessions se presente
+        (eventi GA4 sessionizzati), altrimenti le righe; le conversioni sono
+        le sessioni convertite (vedi converted_sessions), così il conversion
+        rate è per sessione.
+        """
+        aggregates = self.dimension(col)
+        return {
+            'sessions': self.sessions(col),
+            'duration_sum': aggregates.get('duration_sum'),
+            'duration_count': aggregates.get('duration_count'),
+            'bounces': aggregates.get('bounces'),
+            'bounce_rows': aggregates.get('bounce_rows'),
+            'conversions': self.converted_sessions(col)
+        }
+    
+    def users(self, col: Optional[str] = None, user_col: str = 'user_id') -> Any:
+        """
+        Utenti distinti, complessivi o per valore di una dimensione
+        
+        Args:
+            col: Colonna della dimensione (None = utenti di tutto il chunk)
+            user_col: Colonna dell'utente
+        
+        Returns:
+            DistinctSet (col None) o KeyedDistinct per valore
+        """
+        if col is None:
+            compute = lambda: DistinctSet.from_values(self.data[user_col])
+        else:
+            compute = lambda: KeyedDistinct.from_pairs(self._column(col), self.data[user_col])
+        
+        users = self._cached(self._users, (col, user_col), compute)
+        if col is None:
+            return users.copy()
+        return KeyedDistinct({value: values.copy() for value, values in users.sets.items()})
+
+
+# Creazione del cubo di un DataFrame letto da più thread
+_ACCESSOR_LOCK = threading.Lock()
+
+
+@pd.api.extensions.register_dataframe_accessor('cube')
+def cube_accessor(data: pd.DataFrame) -> AggregationCube:
+    """
+    Accessor data.cube: un cubo per DataFrame, condiviso tra gli analizzatori
+    
+    pandas crea un nuovo oggetto accessor a ogni accesso: il cubo è
+    memorizzato sul DataFrame stesso.
+    """
+    return frame_memo(data, '_aggregation_cube', AggregationCube, _ACCESSOR_LOCK)
@@ -0,0 +1,192 @@
+"""
+Derived - Colonne derivate (ora, giorno, giorno della settimana, pagina) condivise tra gli analizzatori
+"""
+
+import threading
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Any, Optional
+
+# Colonne derivate -> colonne della fonte da cui si ricavano (alias: vale la prima presente).
+# Una colonna con lo stesso nome già presente nella fonte viene usata così com'è.
+DERIVED_INPUTS = {
+    'hour': ('hour', 'timestamp', 'event_time'),
+    'date': ('date', 'timestamp', 'event_time'),
+    'day_of_week': ('day_of_week', 'timestamp', 'event_time'),
+    'page': ('page', 'page_path', 'page_location')
+}
+DERIVED_COLUMNS = tuple(DERIVED_INPUTS)
+
+# Schema e host di un URL completo, query string e frammento, barre finali
+URL_PREFIX = r'^[A-Za-z][A-Za-z0-9+.-]*://[^/?#]*'
+URL_SUFFIX = r'[?#].*$'
+TRAILING_SLASHES = r'(?<=.)/+$'
+
+
+def normalize_pages(pages: pd.Series) -> pd.Series:
+    """
+    Pagine normalizzate: percorso senza schema, host, query string, frammento e barra finale
+    
+    Per gli export GA4 'https://www.sito.it/it/?fbclid=...' e 'https://sito.it/it'
+    diventano entrambe '/it'. La normalizzazione è applicata ai soli valori
+    distinti.
+    
+    Args:
+        pages: Pagine o URL della fonte
+    
+    Returns:
+        Series categorica (categorie nell'ordine di prima apparizione, NaN esclusi)
+    """
+    codes, uniques = pd.factorize(pages)
+    normalized = (
+        pd.Series(np.asarray(uniques, dtype=object), dtype='string')
+        .str.replace(URL_PREFIX, '', regex=True)
+        .str.replace(URL_SUFFIX, '', regex=True)
+        .str.replace(TRAILING_SLASHES, '', regex=True)
+        .replace('', '/')
+    )
+    # Valori distinti che coincidono dopo la normalizzazione diventano una sola categoria
+    merged, categories = pd.factorize(normalized)
+    codes = np.where(codes >= 0, merged[codes] if len(merged) else codes, -1)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, pd.Index(categories.astype(str), dtype=object)),
+        index=pages.index, name='page'
+    )
+
+
+class DerivedColumns:
+    """
+    Colonne derivate di un chunk, calcolate una volta e condivise
+    
+    Il tempo viene convertito una sola volta per hour, date e day_of_week;
+    il DataFrame non viene mai modificato. Le colonne restituite sono viste
+    in copy-on-write: modificarle non cambia né i dati né la copia in
+    memoria usata dagli altri analizzatori.
+    """
+    
+    def __init__(self, data: pd.DataFrame):
+        """
+        Inizializza il provider
+        
+        Args:
+            data: Chunk di dati
+        """
+        self.data = data
+        self._columns: Dict[str, Optional[pd.Series]] = {}
+        self._lock = threading.RLock()
+    
+    def source_column(self, name: str) -> Optional[str]:
+        """Colonna della fonte da cui si ricava name (None se assente)"""
+        return next((col for col in DERIVED_INPUTS[name] if col in self.data.columns), None)
+    
+    def __contains__(self, name: str) -> bool:
+        """La colonna derivata è ricavabile dal chunk"""
+        return name in DERIVED_INPUTS and self.source_column(name) is not None
+    
+    def __getitem__(self, name: str) -> pd.Series:
+        """
+        Colonna derivata (vista in sola lettura)
+        
+        Args:
+            name: Nome tra DERIVED_COLUMNS
+        
+        Returns:
+            Series allineata all'indice del chunk
+        
+        Raises:
+            KeyError: Colonna sconosciuta o non ricavabile dal chunk
+        """
+        column = self.get(name)
+        if column is None:
+            raise KeyError(f"Colonna derivata non disponibile: {name}")
+        return column
+    
+    def get(self, name: str) -> Optional[pd.Series]:
+        """Colonna derivata (vista in sola lettura), None se non ricavabile"""
+        if name not in DERIVED_INPUTS:
+            raise KeyError(f"Colonna derivata sconosciuta: {name}")
+        column = self._cached(name, lambda: self._compute(name))
+        return column.copy(deep=False) if column is not None else None
+    
+    def _cached(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Valore calcolato una sola volta anche da thread concorrenti"""
+        if name not in self._columns:
+            with self._lock:
+                if name not in self._columns:
+                    self._columns[name] = compute()
+        return self._columns[name]
+    
+    def _compute(self, name: str) -> Optional[pd.Series]:
+        """Calcola una colonna derivata"""
+        col = self.source_column(name)
+        if col is None:
+            return None
+        if name == 'page':
+            return normalize_pages(self.data[col])
+        if name == 'date' and col == name:
+            # Giorni della fonte (date, Timestamp o testo) nello stesso formato ISO
+            return self._dates(self._times(col))
+        if col == name:
+            # Già presente nella fonte (es. dati pre-aggregati per ora)
+            return self.data[col]
+        
+        times = self._cached('_time', lambda: self._times(col))
+        if name == 'hour':
+            return times.dt.hour.rename('hour')
+        if name == 'day_of_week':
+            # 0 = lunedì
+            return times.dt.dayofweek.rename('day_of_week')
+        return self._dates(times)
+    
+    def _times(self, col: str) -> pd.Series:
+        """Colonna del tempo convertita in datetime (una volta per chunk)"""
+        times = self.data[col]
+        if pd.api.types.is_datetime64_any_dtype(times):
+            return times
+        return pd.to_datetime(times)
+    
+    def _dates(self, times: pd.Series) -> pd.Series:
+        """
+        Giorno di ogni riga, categorico con categorie AAAA-MM-GG
+        
+        Stringhe ISO, non oggetti date: le chiavi del trend giornaliero vanno
+        così nei report JSON e restano ordinate come i giorni. La
+        formattazione è applicata ai soli giorni distinti.
+        """
+        codes, days = pd.factorize(times.dt.normalize())
+        categories = pd.Index([day.strftime('%Y-%m-%d') for day in days], dtype=object)
+        return pd.Series(pd.Categorical.from_codes(codes, categories), index=times.index, name='date')
+
+
+def frame_memo(data: pd.DataFrame, attribute: str, factory: Callable[[pd.DataFrame], Any],
+               lock: threading.Lock) -> Any:
+    """
+    Oggetto memorizzato sul DataFrame (pandas crea un accessor nuovo a ogni accesso)
+    
+    Args:
+        data: DataFrame
+        attribute: Attributo in cui memorizzarlo (fuori dalle colonne)
+        factory: Crea l'oggetto dal DataFrame
+        lock: Lock della creazione con più thread
+    
+    Returns:
+        Oggetto memorizzato, creato al primo accesso
+    """
+    memo = data.__dict__.get(attribute)
+    if memo is None:
+        with lock:
+            memo = data.__dict__.get(attribute)
+            if memo is None:
+                memo = factory(data)
+                object.__setattr__(data, attribute, memo)
+    return memo
+
+
+# Creazione del provider di un DataFrame letto da più thread
+_ACCESSOR_LOCK = threading.Lock()
+
+
+@pd.api.extensions.register_dataframe_accessor('derived')
+def derived_accessor(data: pd.DataFrame) -> DerivedColumns:
+    """Accessor data.derived: un provider per DataFrame, condiviso tra gli analizzatori"""
+    return frame_memo(data, '_derived_columns', DerivedColumns, _ACCESSOR_LOCK)
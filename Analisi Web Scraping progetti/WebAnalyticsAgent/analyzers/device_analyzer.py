@@ -3,97 +3,108 @@ Device Analyzer - Analizza dati dispositivi
 """
 
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_analyzer import BaseAnalyzer
+from .performance import DimensionPerformance
+from .cube import CONVERSION_INPUT, SESSION_INPUTS
+from .aggregates import KeyedSum
 
 
 class DeviceAnalyzer(BaseAnalyzer):
     """Analizzatore dispositivi"""
     
+    INPUT_COLUMNS = [
+        ('device_type', 'device'), ('os', 'operating_system'), 'browser', 'screen_resolution',
+        'session_duration', 'bounced', CONVERSION_INPUT, *SESSION_INPUTS
+    ]
+    REQUIRED_COLUMNS = [('device_type', 'device'), ('os', 'operating_system'), 'browser', 'screen_resolution']
+    SCALED_RESULTS = [
+        'device_types.*.sessions', 'operating_systems.*.sessions', 'browsers.*.sessions',
+        'screen_resolutions.*', 'device_performance.*.sessions'
+    ]
+    
+    # Dispositivi riportati nelle performance (gli altri nel gruppo 'other')
+    PERFORMANCE_LIMIT = 10
+    
     def __init__(self):
         super().__init__('DeviceAnalyzer')
+        self.performance = DimensionPerformance(('device_type', 'device'), limit=self.PERFORMANCE_LIMIT)
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Analizza dispositivi"""
-        self.results = {
-            'device_types': self._analyze_device_types(data),
-            'operating_systems': self._analyze_os(data),
-            'browsers': self._analyze_browsers(data),
-            'screen_resolutions': self._analyze_resolutions(data),
-            'device_performance': self._device_performance(data)
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Stato parziale dei dispositivi
+        
+        Ogni valore conta le sessioni (colonna sessions degli eventi GA4
+        sessionizzati, altrimenti una per riga), come le performance.
+        """
+        device_col = self._first_column(data, ['device_type', 'device'])
+        os_col = self._first_column(data, ['os', 'operating_system'])
+        
+        return {
+            'sessions': data.cube.session_total(),
+            'devices': data.cube.sessions(device_col) if device_col else None,
+            'os': data.cube.sessions(os_col) if os_col else None,
+            'browsers': data.cube.sessions('browser') if 'browser' in data.columns else None,
+            'resolutions': data.cube.sessions('screen_resolution') if 'screen_resolution' in data.columns else None,
+            'performance': self.performance.partial(data)
         }
-        return self.results
     
-    def _analyze_device_types(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultati dell'analisi dei dispositivi"""
+        return {
+            'device_types': self._analyze_device_types(state),
+            'operating_systems': self._analyze_os(state),
+            'browsers': self._analyze_browsers(state),
+            'screen_resolutions': self._analyze_resolutions(state),
+            'device_performance': self._device_performance(state)
+        }
+    
+    def _share(self, counts: KeyedSum, sessions: int, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Sessioni e percentuale per valore"""
+        shares = {}
+        for value, count in counts.top(limit).items():
+            shares[str(value)] = {
+                'sessions': int(count),
+                'percentage': float(count / sessions * 100)
+            }
+        return shares
+    
+    def _analyze_device_types(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analizza tipi di dispositivo"""
         devices = {}
         
-        if 'device_type' in data.columns or 'device' in data.columns:
-            col = 'device_type' if 'device_type' in data.columns else 'device'
-            device_stats = data[col].value_counts()
-            for device, count in device_stats.items():
-                devices[str(device)] = {
-                    'sessions': int(count),
-                    'percentage': float(count / len(data) * 100)
-                }
+        if state['devices'] is not None:
+            devices = self._share(state['devices'], state['sessions'])
         
         return devices
     
-    def _analyze_os(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_os(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analizza sistemi operativi"""
         os_data = {}
         
-        if 'os' in data.columns or 'operating_system' in data.columns:
-            col = 'os' if 'os' in data.columns else 'operating_system'
-            os_stats = data[col].value_counts()
-            for os, count in os_stats.items():
-                os_data[str(os)] = {
-                    'sessions': int(count),
-                    'percentage': float(count / len(data) * 100)
-                }
+        if state['os'] is not None:
+            os_data = self._share(state['os'], state['sessions'])
         
         return os_data
     
-    def _analyze_browsers(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_browsers(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analizza browser"""
         browsers = {}
         
-        if 'browser' in data.columns:
-            browser_stats = data['browser'].value_counts().head(10)
-            for browser, count in browser_stats.items():
-                browsers[str(browser)] = {
-                    'sessions': int(count),
-                    'percentage': float(count / len(data) * 100)
-                }
+        if state['browsers'] is not None:
+            browsers = self._share(state['browsers'], state['sessions'], 10)
         
         return browsers
     
-    def _analyze_resolutions(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _analyze_resolutions(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Analizza risoluzioni schermo"""
         resolutions = {}
         
-        if 'screen_resolution' in data.columns:
-            resolutions = data['screen_resolution'].value_counts().head(10).to_dict()
+        if state['resolutions'] is not None:
+            resolutions = state['resolutions'].top(10)
         
         return resolutions
     
-    def _device_performance(self, data: pd.DataFrame) -> Dict[str, Dict]:
+    def _device_performance(self, state: Dict[str, Any]) -> Dict[str, Dict]:
         """Performance per dispositivo"""
-        performance = {}
-        
-        if 'device_type' in data.columns or 'device' in data.columns:
-            col = 'device_type' if 'device_type' in data.columns else 'device'
-            
-            for device in data[col].unique():
-                device_data = data[data[col] == device]
-                
-                perf = {
-                    'sessions': len(device_data),
-                    'avg_session_duration': float(device_data['session_duration'].mean()) if 'session_duration' in device_data.columns else 0,
-                    'bounce_rate': float((device_data['bounced'] == 1).sum() / len(device_data) * 100) if 'bounced' in device_data.columns else 0,
-                    'conversion_rate': float((device_data['converted'] == 1).sum() / len(device_data) * 100) if 'converted' in device_data.columns else 0
-                }
-                
-                performance[str(device)] = perf
-        
-        return performance
+        return self.performance.finalize(state['performance'])
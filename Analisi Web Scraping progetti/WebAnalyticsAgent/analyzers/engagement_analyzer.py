@@ -3,99 +3,162 @@ Engagement Analyzer - Analizza l'engagement degli utenti
 """
 
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, List
 from .base_analyzer import BaseAnalyzer
+from .aggregates import NumericSummary
 
 
 class EngagementAnalyzer(BaseAnalyzer):
     """Analizzatore dell'engagement"""
     
+    SUMMARY_COLUMNS = ['time_on_page', 'session_duration', 'scroll_depth', 'watch_time']
+    SUM_COLUMNS = [
+        'pageviews', 'sessions', 'clicks', 'impressions', 'video_plays',
+        'video_completed', 'form_starts', 'form_completions'
+    ]
+    
+    SOCIAL_COLUMNS = ['shares', 'likes', 'comments']
+    INPUT_COLUMNS = [
+        'time_on_page', 'session_duration', 'watch_time', *SUM_COLUMNS,
+        # Export GA4: percent_scrolled da event_params se manca scroll_depth
+        ('scroll_depth', 'event_params')
+    ]
+    SCALED_RESULTS = [
+        'social_interactions.*', 'video_engagement.total_plays',
+        'form_interactions.form_starts', 'form_interactions.form_completions'
+    ]
+    KPI_RESULTS = {'avg_time_on_site': 'mean', 'avg_time_on_page': 'mean'}
+    KPI_COLUMNS = {'avg_time_on_site': 'session_duration', 'avg_time_on_page': 'time_on_page'}
+    # Tempo sul sito e pagine per sessione coincidono con quelli del traffico
+    OPTIONAL_DEPENDS_ON = ['traffic']
+    
     def __init__(self):
         super().__init__('EngagementAnalyzer')
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Analizza l'engagement"""
-        self.results = {
-            'avg_time_on_page': self._avg_time_on_page(data),
-            'avg_time_on_site': self._avg_time_on_site(data),
-            'pages_per_session': self._pages_per_session(data),
-            'scroll_depth': self._scroll_depth(data),
-            'click_through_rate': self._click_through_rate(data),
-            'video_engagement': self._video_engagement(data),
-            'social_interactions': self._social_interactions(data),
-            'form_interactions': self._form_interactions(data)
+    def input_columns(self, available: List[str]) -> List[str]:
+        """Colonne lette, incluse quelle social riconosciute per nome"""
+        return super().input_columns(available) + [
+            col for col in available if self._is_social(col)
+        ]
+    
+    def can_analyze(self, available: List[str]) -> bool:
+        """Basta una metrica di engagement o una colonna social"""
+        return super().can_analyze(available) or any(self._is_social(col) for col in available)
+    
+    def _is_social(self, col: str) -> bool:
+        """Colonna di interazioni social"""
+        return 'social' in col.lower() or col in self.SOCIAL_COLUMNS
+    
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Stato parziale dell'engagement"""
+        social_cols = [col for col in data.columns if self._is_social(col)]
+        summaries = {
+            col: NumericSummary.from_series(data[col])
+            for col in self.SUMMARY_COLUMNS if col in data.columns
+        }
+        
+        if 'scroll_depth' not in summaries:
+            # Export GA4: profondità di scroll dal parametro degli eventi scroll
+            percent_scrolled = self._ga4_param(data, 'percent_scrolled')
+            if percent_scrolled is not None:
+                summaries['scroll_depth'] = NumericSummary.from_series(percent_scrolled)
+        
+        return {
+            'summaries': summaries,
+            'sums': {
+                col: float(data[col].sum())
+                for col in self.SUM_COLUMNS if col in data.columns
+            },
+            'social': {col: int(data[col].sum()) for col in social_cols}
+        }
+    
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultati dell'analisi dell'engagement"""
+        return {
+            'avg_time_on_page': self._avg_time_on_page(state),
+            'avg_time_on_site': self._avg_time_on_site(state),
+            'pages_per_session': self._pages_per_session(state),
+            'scroll_depth': self._scroll_depth(state),
+            'click_through_rate': self._click_through_rate(state),
+            'video_engagement': self._video_engagement(state),
+            'social_interactions': self._social_interactions(state),
+            'form_interactions': self._form_interactions(state)
         }
-        return self.results
     
-    def _avg_time_on_page(self, data: pd.DataFrame) -> float:
+    def _avg_time_on_page(self, state: Dict[str, Any]) -> float:
         """Tempo medio sulla pagina"""
-        if 'time_on_page' in data.columns:
-            return float(data['time_on_page'].mean())
+        if 'time_on_page' in state['summaries']:
+            return float(state['summaries']['time_on_page'].mean())
         return 0.0
     
-    def _avg_time_on_site(self, data: pd.DataFrame) -> float:
-        """Tempo medio sul sito"""
-        if 'session_duration' in data.columns:
-            return float(data['session_duration'].mean())
+    def _avg_time_on_site(self, state: Dict[str, Any]) -> float:
+        """Tempo medio sul sito (durata media delle sessioni del traffico, se eseguito)"""
+        upstream = self.upstream_result('traffic', 'avg_session_duration')
+        if upstream is not None:
+            return upstream
+        if 'session_duration' in state['summaries']:
+            return float(state['summaries']['session_duration'].mean())
         return 0.0
     
-    def _pages_per_session(self, data: pd.DataFrame) -> float:
-        """Pagine per sessione"""
-        if 'pageviews' in data.columns and 'sessions' in data.columns:
-            total_pages = data['pageviews'].sum()
-            total_sessions = data['sessions'].sum()
+    def _pages_per_session(self, state: Dict[str, Any]) -> float:
+        """Pagine per sessione (dal traffico, se eseguito)"""
+        upstream = self.upstream_result('traffic', 'pages_per_session')
+        if upstream is not None:
+            return upstream
+        sums = state['sums']
+        if 'pageviews' in sums and 'sessions' in sums:
+            total_pages = sums['pageviews']
+            total_sessions = sums['sessions']
             return total_pages / total_sessions if total_sessions > 0 else 0
         return 0.0
     
-    def _scroll_depth(self, data: pd.DataFrame) -> Dict[str, float]:
+    def _scroll_depth(self, state: Dict[str, Any]) -> Dict[str, float]:
         """Profondità di scroll"""
         scroll_data = {}
         
-        if 'scroll_depth' in data.columns:
-            scroll_data['avg_scroll_depth'] = float(data['scroll_depth'].mean())
-            scroll_data['max_scroll_depth'] = float(data['scroll_depth'].max())
+        if 'scroll_depth' in state['summaries']:
+            summary = state['summaries']['scroll_depth']
+            scroll_data['avg_scroll_depth'] = float(summary.mean())
+            scroll_data['max_scroll_depth'] = float(summary.maximum) if summary.maximum is not None else float('nan')
         
         return scroll_data
     
-    def _click_through_rate(self, data: pd.DataFrame) -> Dict[str, float]:
+    def _click_through_rate(self, state: Dict[str, Any]) -> Dict[str, float]:
         """Click through rate"""
         ctr_data = {}
+        sums = state['sums']
         
-        if 'clicks' in data.columns and 'impressions' in data.columns:
-            total_clicks = data['clicks'].sum()
-            total_impressions = data['impressions'].sum()
+        if 'clicks' in sums and 'impressions' in sums:
+            total_clicks = sums['clicks']
+            total_impressions = sums['impressions']
             ctr_data['ctr'] = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
         
         return ctr_data
     
-    def _video_engagement(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _video_engagement(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Engagement video"""
         video_data = {}
+        sums = state['sums']
         
-        if 'video_plays' in data.columns:
-            video_data['total_plays'] = int(data['video_plays'].sum())
-            video_data['avg_watch_time'] = float(data['watch_time'].mean()) if 'watch_time' in data.columns else 0
-            video_data['completion_rate'] = float(data['video_completed'].sum() / data['video_plays'].sum() * 100) if 'video_completed' in data.columns else 0
+        if 'video_plays' in sums:
+            video_data['total_plays'] = int(sums['video_plays'])
+            video_data['avg_watch_time'] = float(state['summaries']['watch_time'].mean()) if 'watch_time' in state['summaries'] else 0
+            video_data['completion_rate'] = float(sums['video_completed'] / sums['video_plays'] * 100) if 'video_completed' in sums and sums['video_plays'] > 0 else 0
         
         return video_data
     
-    def _social_interactions(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _social_interactions(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Interazioni social"""
-        social_data = {}
-        
-        social_cols = [col for col in data.columns if 'social' in col.lower() or col in ['shares', 'likes', 'comments']]
-        for col in social_cols:
-            social_data[col] = int(data[col].sum()) if col in data.columns else 0
-        
-        return social_data
+        return dict(state['social'])
     
-    def _form_interactions(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _form_interactions(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Interazioni con form"""
         form_data = {}
+        sums = state['sums']
         
-        if 'form_starts' in data.columns:
-            form_data['form_starts'] = int(data['form_starts'].sum())
-            form_data['form_completions'] = int(data['form_completions'].sum()) if 'form_completions' in data.columns else 0
+        if 'form_starts' in sums:
+            form_data['form_starts'] = int(sums['form_starts'])
+            form_data['form_completions'] = int(sums['form_completions']) if 'form_completions' in sums else 0
             if form_data['form_starts'] > 0:
                 form_data['form_completion_rate'] = form_data['form_completions'] / form_data['form_starts'] * 100
         
@@ -0,0 +1,133 @@
+"""
+Estimates - Stime sulla popolazione dai risultati calcolati su un campione
+"""
+
+import math
+import numbers
+from statistics import NormalDist
+from typing import Dict, Any, List, Optional
+
+
+def z_value(level: float) -> float:
+    """Quantile della normale per un intervallo bilaterale al livello indicato (es. 0.95)"""
+    return NormalDist().inv_cdf(0.5 + level / 2)
+
+
+def _interval(estimate: float, error: float, z: float, upper: Optional[float] = None) -> Dict[str, float]:
+    """Intervallo stima ± z * errore standard, limitato a [0, upper]"""
+    high = estimate + z * error
+    return {
+        'estimate': float(estimate),
+        'low': float(max(0.0, estimate - z * error)),
+        'high': float(min(upper, high) if upper is not None else high)
+    }
+
+
+def count_interval(count: float, sample: Dict[str, Any], z: float) -> Dict[str, float]:
+    """
+    Intervallo del totale di un conteggio di righe
+    
+    Con il campione uniforme il totale è N * p con p binomiale (correzione per
+    popolazione finita); con il campione per utenti è una stima di
+    Horvitz-Thompson con le righe raggruppate per utente (effetto del disegno
+    pari alle righe per utente pesate per le righe, esatto per il totale).
+    
+    Args:
+        count: Conteggio nel campione
+        sample: Descrizione del campione (ReservoirSampler/UserSampler.get_stats)
+        z: Quantile della normale
+    
+    Returns:
+        Dizionario con estimate, low e high
+    """
+    fraction = sample['fraction']
+    if sample['mode'] == 'reservoir':
+        rows, population = sample['sample_rows'], sample['population_rows']
+        p = count / rows if rows else 0.0
+        error = population * math.sqrt(p * (1 - p) / rows * (1 - fraction)) if rows else 0.0
+        return _interval(population * p, error, z)
+    
+    error = math.sqrt(max(count, 0) * sample['cluster_size'] * (1 - fraction)) / fraction
+    return _interval(count / fraction, error, z)
+
+
+def distinct_interval(count: float, sample: Dict[str, Any], z: float) -> Optional[Dict[str, float]]:
+    """
+    Intervallo di un conteggio distinto (utenti, sessioni)
+    
+    Stimabile solo con il campione per utenti, dove ogni utente è tenuto con
+    probabilità pari alla quota; il campione uniforme di righe non lo consente.
+    
+    Returns:
+        Dizionario con estimate, low e high; None per il campione uniforme
+    """
+    if sample['mode'] != 'users':
+        return None
+    fraction = sample['fraction']
+    return _interval(count / fraction, math.sqrt(max(count, 0) * (1 - fraction)) / fraction, z)
+
+
+def rate_interval(rate: float, sample: Dict[str, Any], z: float) -> Dict[str, float]:
+    """
+    Intervallo di una percentuale (bounce rate, conversion rate)
+    
+    L'errore usa le unità indipendenti del campione (righe o utenti) e la
+    correzione per popolazione finita.
+    
+    Args:
+        rate: Percentuale calcolata sul campione
+        sample: Descrizione del campione
+        z: Quantile della normale
+    
+    Returns:
+        Dizionario con estimate, low e high (in percentuale)
+    """
+    p = rate / 100
+    units = sample['units']
+    error = math.sqrt(max(p * (1 - p), 0.0) / units * (1 - sample['fraction'])) * 100 if units else 0.0
+    return _interval(rate, error, z, upper=100.0)
+
+
+def mean_interval(mean: float, std: float, count: int, sample: Dict[str, Any], z: float) -> Dict[str, float]:
+    """
+    Intervallo di una media (durata media, tempo sul sito)
+    
+    Args:
+        mean: Media calcolata sul campione
+        std: Deviazione standard dei valori nel campione
+        count: Valori non nulli nel campione
+        sample: Descrizione del campione
+        z: Quantile della normale
+    
+    Returns:
+        Dizionario con estimate, low e high
+    """
+    rows_per_unit = sample['sample_rows'] / sample['units'] if sample['units'] else 1.0
+    effective = count / rows_per_unit
+    error = std / math.sqrt(effective) * math.sqrt(1 - sample['fraction']) if effective > 0 else 0.0
+    return _interval(mean, error, z)
+
+
+def scale_path(node: Any, path: List[str], factor: float):
+    """
+    Moltiplica per factor i valori numerici di un percorso nei risultati
+    
+    Args:
+        node: Dizionario dei risultati (modificato sul posto)
+        path: Chiavi del percorso; '*' indica tutte le chiavi di un livello
+        factor: Fattore di scala
+    """
+    if not isinstance(node, dict) or not path:
+        return
+    
+    head, rest = path[0], path[1:]
+    for key in (list(node) if head == '*' else [head] if head in node else []):
+        value = node[key]
+        if rest:
+            scale_path(value, rest, factor)
+        elif isinstance(value, bool) or not isinstance(value, numbers.Real):
+            continue
+        elif isinstance(value, numbers.Integral):
+            node[key] = int(round(value * factor))
+        else:
+            node[key] = float(value * factor)
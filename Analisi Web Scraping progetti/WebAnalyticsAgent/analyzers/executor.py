@@ -0,0 +1,188 @@
+"""
+Executor - Esecuzione parallela degli analizzatori di una fonte
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+from .registry import dependencies, dependency_levels
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ('thread', 'process')
+
+# Analizzatori e dati del processo padre, ereditati dai processi figli (fork)
+_SHARED: Tuple[Dict[str, Any], Any] = ({}, None)
+
+
+def _timed(analyzer: Any, method: str, arg: Any) -> Tuple[Any, float, float]:
+    """Chiama analyzer.method(arg) e ne misura tempo reale e CPU del thread"""
+    wall, cpu = time.perf_counter(), time.thread_time()
+    result = getattr(analyzer, method)(arg)
+    return result, time.perf_counter() - wall, time.thread_time() - cpu
+
+
+def _shared_task(name: str, method: str, arg: Any = None) -> Tuple[Any, float, float]:
+    """Task di un processo figlio: analizzatore e dati condivisi vengono da _SHARED"""
+    analyzers, data = _SHARED
+    return _timed(analyzers[name], method, data if arg is None else arg)
+
+
+class AnalyzerExecutor:
+    """
+    Esegue gli analizzatori indipendenti di una fonte in parallelo
+    
+    Con i thread tutti gli analizzatori leggono lo stesso DataFrame (e lo
+    stesso cubo di aggregazione): pandas in copy-on-write non modifica i
+    dati condivisi e gran parte dei raggruppamenti rilascia il GIL. Con i
+    processi i figli sono creati con fork dopo il caricamento del chunk e
+    ne condividono le pagine di memoria senza copiarle né serializzarle;
+    tornano al padre solo stati e risultati. Dove fork non è disponibile
+    i processi ripiegano sui thread.
+    """
+    
+    def __init__(self, jobs: int = 1, mode: str = 'thread'):
+        """
+        Inizializza l'executor
+        
+        Args:
+            jobs: Analizzatori eseguiti contemporaneamente (1 = in sequenza)
+            mode: 'thread' o 'process'
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Executor non valido: {mode!r} (atteso {' o '.join(EXECUTOR_MODES)})")
+        if mode == 'process' and 'fork' not in multiprocessing.get_all_start_methods():
+            logger.warning("⚠️  fork non disponibile: analizzatori eseguiti con i thread")
+            mode = 'thread'
+        
+        self.jobs = max(1, int(jobs or 1))
+        self.mode = mode
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._threads: Optional[ThreadPoolExecutor] = None
+    
+    def run(self, analyzers: Dict[str, Any], method: str, data: Any) -> Dict[str, Any]:
+        """
+        Chiama lo stesso metodo di ogni analizzatore sugli stessi dati
+        
+        Args:
+            analyzers: Analizzatori attivi
+            method: Nome del metodo (es. 'partial')
+            data: Dati condivisi in sola lettura
+        
+        Returns:
+            Dizionario nome analizzatore -> risultato, nell'ordine di analyzers
+        """
+        return self._execute(analyzers, method, {name: None for name in analyzers}, data)
+    
+    def analyze(self, analyzers: Dict[str, Any], data: Any,
+                upstream: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analisi completa di dati in memoria: partial() di tutti, poi finalize() per dipendenze"""
+        return self.finalize(analyzers, self.run(analyzers, 'partial', data), upstream)
+    
+    def finalize(self, analyzers: Dict[str, Any], states: Dict[str, Any],
+                 upstream: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Risultati finali dagli stati fusi, nell'ordine delle dipendenze
+        
+        Gli analizzatori di uno stesso livello (vedi dependency_levels) sono
+        finalizzati in parallelo; prima di finalize() ciascuno riceve in
+        upstream i risultati delle proprie dipendenze.
+        
+        Args:
+            analyzers: Analizzatori attivi, in ordine topologico
+            states: Stato fuso di ogni analizzatore
+            upstream: Risultati già disponibili di dipendenze non in analyzers
+                (es. letti dalla cache dei risultati)
+        
+        Returns:
+            Dizionario nome analizzatore -> risultati, nell'ordine di analyzers
+        """
+        results: Dict[str, Any] = dict(upstream or {})
+        for level in dependency_levels(analyzers):
+            for name in level:
+                analyzers[name].upstream = {
+                    dep: results[dep] for dep in dependencies(analyzers[name]) if dep in results
+                }
+            results.update(self.run_each({name: analyzers[name] for name in level}, 'finalize', states))
+        
+        # Con i processi finalize() ha assegnato results solo nel figlio
+        for name in analyzers:
+            analyzers[name].results = results[name]
+        return {name: results[name] for name in analyzers}
+    
+    def run_each(self, analyzers: Dict[str, Any], method: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Chiama un metodo di ogni analizzatore sul proprio input (es. finalize degli stati)
+        
+        Args:
+            analyzers: Analizzatori attivi
+            method: Nome del metodo
+            inputs: Dizionario nome analizzatore -> argomento
+        
+        Returns:
+            Dizionario nome analizzatore -> risultato, nell'ordine di analyzers
+        """
+        return self._execute(analyzers, method, inputs, None)
+    
+    def call(self, name: str, func: Any, *args) -> Any:
+        """Esegue in sequenza func(*args) contando il tempo nell'analizzatore name (es. merge)"""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        result = func(*args)
+        self._record(name, time.perf_counter() - wall, time.thread_time() - cpu)
+        return result
+    
+    def _execute(self, analyzers: Dict[str, Any], method: str,
+                 inputs: Dict[str, Any], shared: Any) -> Dict[str, Any]:
+        """Esegue i task (argomento inputs[name], o shared se None) e registra i tempi"""
+        global _SHARED
+        
+        workers = min(self.jobs, len(analyzers))
+        if workers < 2:
+            outcomes = {
+                name: _timed(analyzer, method, shared if inputs[name] is None else inputs[name])
+                for name, analyzer in analyzers.items()
+            }
+        elif self.mode == 'thread':
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.jobs)
+            futures = {
+                name: self._threads.submit(_timed, analyzer, method,
+                                           shared if inputs[name] is None else inputs[name])
+                for name, analyzer in analyzers.items()
+            }
+            outcomes = {name: future.result() for name, future in futures.items()}
+        else:
+            # Un pool per chiamata: i figli ereditano i dati correnti al momento del fork
+            _SHARED = (analyzers, shared)
+            try:
+                with ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context('fork')) as pool:
+                    futures = {name: pool.submit(_shared_task, name, method, inputs[name]) for name in analyzers}
+                    outcomes = {name: future.result() for name, future in futures.items()}
+            finally:
+                _SHARED = ({}, None)
+        
+        results = {}
+        for name, (result, wall, cpu) in outcomes.items():
+            self._record(name, wall, cpu)
+            results[name] = result
+        return results
+    
+    def _record(self, name: str, wall: float, cpu: float):
+        """Somma i tempi di un analizzatore (chunk e fasi successive si accumulano)"""
+        timing = self.timings.setdefault(name, {'wall_time': 0.0, 'cpu_time': 0.0})
+        timing['wall_time'] += wall
+        timing['cpu_time'] += cpu
+    
+    def get_timings(self) -> Dict[str, Dict[str, float]]:
+        """Tempo reale e CPU (secondi) per analizzatore"""
+        return {name: dict(timing) for name, timing in self.timings.items()}
+    
+    def close(self):
+        """Chiude il pool di thread"""
+        if self._threads is not None:
+            self._threads.shutdown(wait=True)
+            self._threads = None
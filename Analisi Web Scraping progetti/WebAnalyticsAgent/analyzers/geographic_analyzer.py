@@ -5,73 +5,83 @@ Geographic Analyzer - Analizza dati geografici
 import pandas as pd
 from typing import Dict, Any
 from .base_analyzer import BaseAnalyzer
+from .performance import DimensionPerformance
+from .cube import CONVERSION_INPUT, SESSION_INPUTS
 
 
 class GeographicAnalyzer(BaseAnalyzer):
     """Analizzatore dati geografici"""
     
+    INPUT_COLUMNS = [
+        'country', ('region', 'state'), 'city', 'session_duration', 'bounced', CONVERSION_INPUT, *SESSION_INPUTS
+    ]
+    REQUIRED_COLUMNS = ['country', ('region', 'state'), 'city']
+    SCALED_RESULTS = ['countries.*.sessions', 'regions.*', 'cities.*', 'geographic_performance.*.sessions']
+    
+    # Paesi riportati nelle performance (gli altri nel gruppo 'other')
+    PERFORMANCE_LIMIT = 20
+    
     def __init__(self):
         super().__init__('GeographicAnalyzer')
+        self.performance = DimensionPerformance('country', limit=self.PERFORMANCE_LIMIT)
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Analizza dati geografici"""
-        self.results = {
-            'countries': self._analyze_countries(data),
-            'regions': self._analyze_regions(data),
-            'cities': self._analyze_cities(data),
-            'geographic_performance': self._geographic_performance(data)
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Stato parziale dei dati geografici
+        
+        Paesi, regioni e città contano le sessioni (colonna sessions degli
+        eventi GA4 sessionizzati, altrimenti una per riga), come le performance.
+        """
+        region_col = self._first_column(data, ['region', 'state'])
+        
+        return {
+            'sessions': data.cube.session_total(),
+            'countries': data.cube.sessions('country') if 'country' in data.columns else None,
+            'regions': data.cube.sessions(region_col) if region_col else None,
+            'cities': data.cube.sessions('city') if 'city' in data.columns else None,
+            'performance': self.performance.partial(data)
         }
-        return self.results
     
-    def _analyze_countries(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultati dell'analisi geografica"""
+        return {
+            'countries': self._analyze_countries(state),
+            'regions': self._analyze_regions(state),
+            'cities': self._analyze_cities(state),
+            'geographic_performance': self._geographic_performance(state)
+        }
+    
+    def _analyze_countries(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analizza dati per paese"""
         countries = {}
         
-        if 'country' in data.columns:
-            country_stats = data['country'].value_counts().head(10)
-            for country, count in country_stats.items():
+        if state['countries'] is not None:
+            for country, count in state['countries'].top(10).items():
                 countries[str(country)] = {
                     'sessions': int(count),
-                    'percentage': float(count / len(data) * 100)
+                    'percentage': float(count / state['sessions'] * 100)
                 }
         
         return countries
     
-    def _analyze_regions(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _analyze_regions(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Analizza dati per regione"""
         regions = {}
         
-        if 'region' in data.columns:
-            regions = data['region'].value_counts().head(10).to_dict()
-        elif 'state' in data.columns:
-            regions = data['state'].value_counts().head(10).to_dict()
+        if state['regions'] is not None:
+            regions = state['regions'].top(10)
         
         return regions
     
-    def _analyze_cities(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _analyze_cities(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Analizza dati per città"""
         cities = {}
         
-        if 'city' in data.columns:
-            cities = data['city'].value_counts().head(10).to_dict()
+        if state['cities'] is not None:
+            cities = state['cities'].top(10)
         
         return cities
     
-    def _geographic_performance(self, data: pd.DataFrame) -> Dict[str, Dict]:
+    def _geographic_performance(self, state: Dict[str, Any]) -> Dict[str, Dict]:
         """Performance per area geografica"""
-        performance = {}
-        
-        if 'country' in data.columns:
-            for country in data['country'].unique():
-                country_data = data[data['country'] == country]
-                
-                perf = {
-                    'sessions': len(country_data),
-                    'avg_session_duration': float(country_data['session_duration'].mean()) if 'session_duration' in country_data.columns else 0,
-                    'bounce_rate': float((country_data['bounced'] == 1).sum() / len(country_data) * 100) if 'bounced' in country_data.columns else 0,
-                    'conversion_rate': float((country_data['converted'] == 1).sum() / len(country_data) * 100) if 'converted' in country_data.columns else 0
-                }
-                
-                performance[str(country)] = perf
-        
-        return performance
+        return self.performance.finalize(state['performance'])
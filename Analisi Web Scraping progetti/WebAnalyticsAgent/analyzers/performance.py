@@ -0,0 +1,120 @@
+"""
+Performance - Metriche di performance per dimensione o combinazione di dimensioni
+"""
+
+import pandas as pd
+from typing import Dict, Any, List, Optional, Union
+
+from .base_analyzer import ColumnSpec, resolve_columns
+
+# Etichetta dei valori esclusi dal limite
+OTHER_LABEL = 'other'
+
+# Separatore dei valori di una combinazione di dimensioni (es. 'mobile / Android')
+COMBINATION_SEPARATOR = ' / '
+
+
+class DimensionPerformance:
+    """
+    Sessioni, durata media, bounce rate e conversion rate per valore di una
+    dimensione o di una combinazione di dimensioni
+    
+    Lo stato parziale viene dal cubo condiviso (un solo raggruppamento con
+    tutte le misure) ed è fondibile tra chunk; il limite e il gruppo 'other'
+    sono applicati solo al risultato finale, così sono esatti anche a chunk.
+    """
+    
+    def __init__(self, dimensions: Union[ColumnSpec, List[ColumnSpec]], limit: Optional[int] = None,
+                 other_label: str = OTHER_LABEL):
+        """
+        Inizializza il motore
+        
+        Args:
+            dimensions: Colonna (o tupla di alias) o lista di colonne da combinare
+            limit: Valori riportati (i più frequenti), None = tutti
+            other_label: Etichetta del gruppo dei valori oltre il limite
+        """
+        self.dimensions = list(dimensions) if isinstance(dimensions, list) else [dimensions]
+        self.limit = limit
+        self.other_label = other_label
+    
+    def partial(self, data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """
+        Stato parziale di un chunk
+        
+        Args:
+            data: Chunk di dati
+        
+        Returns:
+            Stato con sessioni e somme per valore, None se manca una dimensione
+        """
+        columns = [resolve_columns([spec], list(data.columns)) for spec in self.dimensions]
+        if not all(columns):
+            return None
+        key = columns[0][0] if len(columns) == 1 else tuple(col for col, in columns)
+        return data.cube.performance(key)
+    
+    def finalize(self, state: Optional[Dict[str, Any]]) -> Dict[str, Dict]:
+        """
+        Metriche per valore, nell'ordine dello stato
+        
+        Args:
+            state: Stato fuso di partial()
+        
+        Returns:
+            Dizionario etichetta -> sessions, avg_session_duration, bounce_rate,
+            conversion_rate; oltre il limite i valori restanti sono sommati in other
+        """
+        if state is None:
+            return {}
+        
+        sessions = state['sessions']
+        kept = set(sessions.top(self.limit)) if self.limit is not None else None
+        
+        performance = {}
+        other = {'sessions': 0, 'duration_sum': 0, 'duration_count': 0, 'bounces': 0, 'bounce_rows': 0,
+                 'conversions': 0}
+        for key, count in sessions.values.items():
+            if count <= 0:
+                # Valori presenti solo sulle righe successive alla prima di una sessione
+                continue
+            totals = {
+                'sessions': count,
+                'duration_sum': state['duration_sum'].get(key) if state['duration_sum'] is not None else 0,
+                'duration_count': state['duration_count'].get(key) if state['duration_count'] is not None else 0,
+                'bounces': state['bounces'].get(key) if state['bounces'] is not None else 0,
+                'bounce_rows': state['bounce_rows'].get(key) if state.get('bounce_rows') is not None else count,
+                'conversions': state['conversions'].get(key) if state['conversions'] is not None else 0
+            }
+            if kept is None or key in kept:
+                performance[self._label(key)] = self._metrics(totals, state)
+            else:
+                for name, value in totals.items():
+                    other[name] += value
+        
+        if other['sessions'] > 0:
+            performance[self.other_label] = self._metrics(other, state)
+        
+        return performance
+    
+    def _label(self, key: Any) -> str:
+        """Etichetta di un valore (combinazioni unite da COMBINATION_SEPARATOR)"""
+        if isinstance(key, tuple):
+            return COMBINATION_SEPARATOR.join(str(value) for value in key)
+        return str(key)
+    
+    def _metrics(self, totals: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+        """Metriche da sessioni e somme (0 se la misura manca nei dati)"""
+        sessions = totals['sessions']
+        duration_count = totals['duration_count']
+        bounce_rows = totals['bounce_rows']
+        return {
+            'sessions': int(sessions),
+            'avg_session_duration': (
+                float(totals['duration_sum'] / duration_count) if duration_count > 0 else float('nan')
+            ) if state['duration_sum'] is not None else 0,
+            'bounce_rate': (
+                float(totals['bounces'] / bounce_rows * 100) if bounce_rows > 0 else 0.0
+            ) if state['bounces'] is not None else 0,
+            'conversion_rate': float(totals['conversions'] / sessions * 100) if state['conversions'] is not None else 0
+        }
@@ -0,0 +1,54 @@
+"""
+Planner - Piano di analisi: analizzatori eseguibili e colonne da leggere
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisPlanner:
+    """Combina le colonne dichiarate dagli analizzatori in una proiezione per il loader"""
+    
+    def plan(self, analyzers: Dict[str, Any], columns: Optional[List[str]],
+             extra_columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Calcola il piano di una fonte prima di leggerne i dati
+        
+        Args:
+            analyzers: Analizzatori attivi (nome -> analizzatore)
+            columns: Colonne della fonte (None = non note: nessuna proiezione)
+            extra_columns: Colonne richieste dal loader (filtri, chiave di deduplicazione)
+        
+        Returns:
+            Piano con analyzers (nome -> colonne lette), skipped (analizzatori
+            senza input nella fonte) e columns (proiezione, None = tutte)
+        """
+        if columns is None:
+            return {
+                'source_columns': None,
+                'columns': None,
+                'analyzers': {name: None for name in analyzers},
+                'skipped': []
+            }
+        
+        active, skipped = {}, []
+        for name, analyzer in analyzers.items():
+            if analyzer.can_analyze(columns):
+                active[name] = analyzer.input_columns(columns)
+            else:
+                skipped.append(name)
+        
+        needed = set(extra_columns or [])
+        for inputs in active.values():
+            needed.update(inputs)
+        # Ordine della fonte: i DataFrame proiettati restano confrontabili
+        projection = [col for col in columns if col in needed]
+        
+        return {
+            'source_columns': len(columns),
+            'columns': projection if len(projection) < len(columns) else None,
+            'analyzers': active,
+            'skipped': skipped
+        }
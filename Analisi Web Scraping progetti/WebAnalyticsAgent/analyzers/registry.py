@@ -0,0 +1,211 @@
+"""
+Registry - Registro degli analizzatori con import lazy e dipendenze
+"""
+
+import importlib
+from typing import Dict, Any, List, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Analizzatori inclusi: nome -> 'modulo:Classe' (moduli relativi al pacchetto analyzers)
+BUILTIN_ANALYZERS = {
+    'traffic': '.traffic_analyzer:TrafficAnalyzer',
+    'users': '.user_analyzer:UserAnalyzer',
+    'conversions': '.conversion_analyzer:ConversionAnalyzer',
+    'engagement': '.engagement_analyzer:EngagementAnalyzer',
+    'geographic': '.geographic_analyzer:GeographicAnalyzer',
+    'device': '.device_analyzer:DeviceAnalyzer',
+    'behavioral': '.behavioral_analyzer:BehavioralAnalyzer'
+}
+
+# Gruppo degli entry point dei pacchetti che forniscono analizzatori
+ENTRY_POINT_GROUP = 'web_analytics_agent.analyzers'
+
+
+def _entry_points() -> Dict[str, Any]:
+    """Entry point installati del gruppo ENTRY_POINT_GROUP (non ancora importati)"""
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return {}
+    
+    found = entry_points()
+    if hasattr(found, 'select'):
+        group = found.select(group=ENTRY_POINT_GROUP)
+    else:
+        # Python 3.9: dizionario gruppo -> entry point
+        group = found.get(ENTRY_POINT_GROUP, [])
+    return {entry.name: entry for entry in group}
+
+
+def _import_target(target: str) -> type:
+    """Importa 'modulo:Classe' (modulo relativo al pacchetto se inizia con '.')"""
+    module_name, _, class_name = target.partition(':')
+    if not class_name:
+        raise ValueError(f"Analizzatore non valido: {target!r} (atteso modulo:Classe)")
+    module = importlib.import_module(module_name, package=__package__)
+    return getattr(module, class_name)
+
+
+def dependencies(analyzer: Any) -> List[str]:
+    """Analizzatori da finalizzare prima di analyzer (obbligatori e facoltativi)"""
+    return list(getattr(analyzer, 'DEPENDS_ON', [])) + list(getattr(analyzer, 'OPTIONAL_DEPENDS_ON', []))
+
+
+def dependency_levels(analyzers: Dict[str, Any]) -> List[List[str]]:
+    """
+    Raggruppa gli analizzatori in livelli eseguibili in parallelo
+    
+    Ogni analizzatore sta nel primo livello successivo a quelli delle sue
+    dipendenze presenti in analyzers (le assenti sono ignorate).
+    
+    Args:
+        analyzers: Analizzatori attivi, in ordine topologico
+    
+    Returns:
+        Liste di nomi, nell'ordine di analyzers all'interno di ogni livello
+    """
+    depth: Dict[str, int] = {}
+    for name, analyzer in analyzers.items():
+        upstream = [depth[dep] for dep in dependencies(analyzer) if dep in analyzers]
+        depth[name] = max(upstream) + 1 if upstream else 0
+    
+    levels: List[List[str]] = [[] for _ in range(max(depth.values()) + 1)] if depth else []
+    for name, level in depth.items():
+        levels[level].append(name)
+    return levels
+
+
+class AnalyzerRegistry:
+    """
+    Registro degli analizzatori disponibili
+    
+    Contiene gli analizzatori inclusi, quelli installati come entry point
+    (gruppo ENTRY_POINT_GROUP) e quelli dichiarati in configurazione
+    (analyzer_plugins: nome -> 'modulo:Classe'). I moduli vengono importati
+    solo per gli analizzatori abilitati e per le loro dipendenze.
+    """
+    
+    def __init__(self, plugins: Optional[Dict[str, str]] = None, entry_points: bool = True):
+        """
+        Inizializza il registro
+        
+        Args:
+            plugins: Analizzatori aggiuntivi, nome -> 'modulo:Classe'
+            entry_points: Cerca gli analizzatori installati come entry point
+        """
+        self._targets: Dict[str, Any] = dict(BUILTIN_ANALYZERS)
+        if entry_points:
+            self._targets.update(_entry_points())
+        self._targets.update(plugins or {})
+        self._classes: Dict[str, type] = {}
+    
+    def register(self, name: str, target: Union[str, type]):
+        """
+        Registra un analizzatore
+        
+        Args:
+            name: Nome del modulo di analisi (quello di analysis_modules)
+            target: Classe dell'analizzatore o 'modulo:Classe'
+        """
+        self._targets[name] = target
+        self._classes.pop(name, None)
+    
+    def names(self) -> List[str]:
+        """Nomi degli analizzatori registrati (inclusi prima, poi plugin)"""
+        return list(self._targets)
+    
+    def load(self, name: str) -> type:
+        """
+        Classe di un analizzatore, importata al primo uso
+        
+        Args:
+            name: Nome registrato
+        
+        Returns:
+            Classe dell'analizzatore
+        """
+        if name not in self._classes:
+            if name not in self._targets:
+                raise KeyError(f"Analizzatore non registrato: {name}")
+            target = self._targets[name]
+            if isinstance(target, str):
+                target = _import_target(target)
+            elif not isinstance(target, type):
+                # Entry point
+                target = target.load()
+            for method in ('partial', 'merge', 'finalize'):
+                if not callable(getattr(target, method, None)):
+                    raise TypeError(f"Analizzatore {name}: manca il metodo {method}()")
+            self._classes[name] = target
+        return self._classes[name]
+    
+    def resolve(self, enabled: List[str]) -> List[str]:
+        """
+        Analizzatori da eseguire, in ordine topologico
+        
+        Le dipendenze obbligatorie (DEPENDS_ON) non abilitate vengono aggiunte;
+        quelle facoltative (OPTIONAL_DEPENDS_ON) contano solo se abilitate. A
+        parità di dipendenze vale l'ordine di registrazione.
+        
+        Args:
+            enabled: Nomi abilitati (analysis_modules); i non registrati sono ignorati
+        
+        Returns:
+            Nomi ordinati: ogni analizzatore dopo le sue dipendenze
+        
+        Raises:
+            ValueError: Dipendenze circolari o dipendenza obbligatoria non registrata
+        """
+        selected = []
+        for name in enabled:
+            if name not in self._targets:
+                logger.warning(f"⚠️  Modulo di analisi sconosciuto: {name}")
+            elif name not in selected:
+                selected.append(name)
+        
+        # Chiusura sulle dipendenze obbligatorie
+        pending = list(selected)
+        while pending:
+            name = pending.pop()
+            for dep in getattr(self.load(name), 'DEPENDS_ON', []):
+                if dep not in self._targets:
+                    raise ValueError(f"Analizzatore {name}: dipendenza non registrata {dep}")
+                if dep not in selected:
+                    logger.info(f"🔗 {dep} abilitato come dipendenza di {name}")
+                    selected.append(dep)
+                    pending.append(dep)
+        
+        ordered: List[str] = []
+        visiting: List[str] = []
+        
+        def visit(name: str):
+            if name in ordered:
+                return
+            if name in visiting:
+                cycle = ' → '.join(visiting[visiting.index(name):] + [name])
+                raise ValueError(f"Dipendenze circolari tra analizzatori: {cycle}")
+            visiting.append(name)
+            for dep in dependencies(self.load(name)):
+                if dep in selected:
+                    visit(dep)
+            visiting.pop()
+            ordered.append(name)
+        
+        for name in self.names():
+            if name in selected:
+                visit(name)
+        return ordered
+    
+    def create(self, enabled: List[str]) -> Dict[str, Any]:
+        """
+        Istanze degli analizzatori abilitati e delle loro dipendenze
+        
+        Args:
+            enabled: Nomi abilitati (analysis_modules)
+        
+        Returns:
+            Dizionario nome -> analizzatore, in ordine topologico
+        """
+        return {name: self.load(name)() for name in self.resolve(enabled)}
@@ -0,0 +1,251 @@
+"""
+Result Cache - Cache su disco dei risultati degli analizzatori
+"""
+
+import os
+import json
+import pickle
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+import logging
+
+from .registry import dependencies
+
+logger = logging.getLogger(__name__)
+
+# Da incrementare quando cambia il formato delle voci in cache
+RESULT_CACHE_VERSION = '1'
+
+# Pacchetti il cui codice determina i risultati (cartelle accanto a questo pacchetto)
+CODE_PACKAGES = ['analyzers', 'loaders']
+CODE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Impronta del codice dei pacchetti e per classe di analizzatore (calcolate una volta per processo)
+_PACKAGES_FINGERPRINT: Optional[str] = None
+_CODE_FINGERPRINTS: Dict[type, str] = {}
+_FINGERPRINT_LOCK = threading.Lock()
+
+
+def _code_files() -> List[str]:
+    """
+    File sorgente dei pacchetti di CODE_PACKAGES, sottocartelle comprese
+    
+    Tutti i file, non solo quelli importati dall'analizzatore: costanti,
+    import differiti e loader che preparano i dati cambiano i risultati
+    senza comparire tra gli attributi del modulo.
+    
+    Returns:
+        Percorsi ordinati
+    """
+    files = []
+    for package in CODE_PACKAGES:
+        for folder, dirs, names in os.walk(os.path.join(CODE_ROOT, package)):
+            dirs[:] = [name for name in dirs if name != '__pycache__']
+            files.extend(os.path.join(folder, name) for name in names if name.endswith('.py'))
+    return sorted(files)
+
+
+def code_fingerprint(analyzer_class: type) -> str:
+    """
+    Impronta del codice di un analizzatore
+    
+    Hash dei sorgenti dei pacchetti analyzers e loaders (percorso relativo e
+    contenuto di ogni file), più l'eventuale attributo VERSION della classe:
+    modificare uno di questi invalida i risultati.
+    
+    Args:
+        analyzer_class: Classe dell'analizzatore
+    
+    Returns:
+        Digest esadecimale SHA-256
+    """
+    global _PACKAGES_FINGERPRINT
+    with _FINGERPRINT_LOCK:
+        if _PACKAGES_FINGERPRINT is None:
+            digest = hashlib.sha256()
+            for path in _code_files():
+                digest.update(os.path.relpath(path, CODE_ROOT).replace(os.sep, '/').encode('utf-8'))
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            _PACKAGES_FINGERPRINT = digest.hexdigest()
+        if analyzer_class not in _CODE_FINGERPRINTS:
+            digest = hashlib.sha256(str(getattr(analyzer_class, 'VERSION', '')).encode('utf-8'))
+            digest.update(_PACKAGES_FINGERPRINT.encode('utf-8'))
+            _CODE_FINGERPRINTS[analyzer_class] = digest.hexdigest()
+        return _CODE_FINGERPRINTS[analyzer_class]
+
+
+class ResultCache:
+    """
+    Risultati finali degli analizzatori salvati su disco, uno per file
+    
+    La chiave di ogni analizzatore combina l'hash del contenuto della fonte,
+    l'impronta del codice dell'analizzatore, le impostazioni che cambiano i
+    dati analizzati (tipo, filtri, deduplicazione...) e le chiavi delle sue
+    dipendenze. La cartella è limitata in dimensione: oltre il limite si
+    eliminano le voci usate meno di recente (l'ultimo uso è la data di
+    modifica del file, aggiornata a ogni lettura).
+    """
+    
+    def __init__(self, cache_dir: str = './cache/results', max_mb: Optional[float] = 256):
+        """
+        Inizializza la cache
+        
+        Args:
+            cache_dir: Cartella dei risultati
+            max_mb: Dimensione massima della cartella in MB (None = illimitata)
+        """
+        self.cache_dir = cache_dir
+        self.max_mb = max_mb
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+    
+    def keys(self, analyzers: Dict[str, Any], source_hash: str, settings: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Chiavi dei risultati degli analizzatori di una fonte
+        
+        Args:
+            analyzers: Analizzatori attivi, in ordine topologico
+            source_hash: Hash del contenuto della fonte
+            settings: Impostazioni dell'analisi che influiscono sui risultati
+        
+        Returns:
+            Dizionario nome analizzatore -> chiave esadecimale
+        """
+        described = json.dumps(settings, sort_keys=True, default=str)
+        keys: Dict[str, str] = {}
+        for name, analyzer in analyzers.items():
+            # Dipendenze presenti con la loro chiave, assenti come '-'
+            upstream = [f"{dep}={keys.get(dep, '-')}" for dep in dependencies(analyzer)]
+            parts = [
+                source_hash, name, code_fingerprint(type(analyzer)), described,
+                ','.join(upstream), RESULT_CACHE_VERSION
+            ]
+            keys[name] = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+        return keys
+    
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+    
+    def contains(self, keys: Dict[str, str]) -> bool:
+        """Tutte le chiavi sono in cache (senza contarle come letture)"""
+        return all(os.path.exists(self._entry_path(key)) for key in keys.values())
+    
+    def lookup(self, keys: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Legge i risultati in cache
+        
+        Args:
+            keys: Chiavi da keys()
+        
+        Returns:
+            Dizionario nome analizzatore -> risultati, solo per quelli in cache
+        """
+        found = {}
+        for name, key in keys.items():
+            path = self._entry_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    found[name] = pickle.load(f)
+                # Ultimo uso, per l'eliminazione delle voci meno recenti
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+                logger.warning(f"⚠️  Risultato in cache non leggibile {path}: {e}")
+        
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+    
+    def store(self, keys: Dict[str, str], results: Dict[str, Any]):
+        """
+        Salva i risultati (scrittura atomica) ed elimina le voci oltre il limite
+        
+        Args:
+            keys: Chiavi da keys()
+            results: Dizionario nome analizzatore -> risultati da salvare
+        """
+        for name, result in results.items():
+            target = self._entry_path(keys[name])
+            tmp_target = f"{target}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(tmp_target, 'wb') as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_target, target)
+            except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+                logger.warning(f"⚠️  Impossibile salvare in cache i risultati di {name}: {e}")
+                if os.path.exists(tmp_target):
+                    os.remove(tmp_target)
+                continue
+            with self._lock:
+                self.stored += 1
+        
+        self._evict()
+    
+    def _entries(self) -> List[os.DirEntry]:
+        """Voci della cache"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.pkl')]
+    
+    def _evict(self):
+        """Elimina le voci usate meno di recente finché la cartella non rientra nel limite"""
+        if self.max_mb is None:
+            return
+        
+        limit = self.max_mb * 1024 * 1024
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        
+        for _, entry_size, path in sorted(entries):
+            if size <= limit:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Già eliminata da un altro processo
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️  Impossibile eliminare dalla cache {path}: {e}")
+                continue
+            size -= entry_size
+            with self._lock:
+                self.evicted += 1
+    
+    def add_usage(self, usage: Dict[str, List[str]]):
+        """Somma letture e mancati di una fonte analizzata in un altro processo (record['result_cache'])"""
+        with self._lock:
+            self.hits += len(usage.get('hits', []))
+            self.misses += len(usage.get('misses', []))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiche della cache"""
+        size = 0
+        for entry in self._entries():
+            try:
+                size += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+        return {
+            'enabled': True,
+            'cache_dir': self.cache_dir,
+            'max_mb': self.max_mb,
+            'size_mb': round(size / (1024 * 1024), 2),
+            'hits': self.hits,
+            'misses': self.misses,
+            'stored': self.stored,
+            'evicted': self.evicted
+        }
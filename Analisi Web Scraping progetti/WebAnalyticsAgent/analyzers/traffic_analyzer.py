@@ -3,91 +3,142 @@ Traffic Analyzer - Analizza il traffico web
 """
 
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .base_analyzer import BaseAnalyzer
+from .aggregates import KeyedSum, NumericSummary
+from .derived import DERIVED_INPUTS
+from .cube import USER_COLUMNS
 
 
 class TrafficAnalyzer(BaseAnalyzer):
     """Analizzatore del traffico web"""
     
+    INPUT_COLUMNS = [
+        DERIVED_INPUTS['page'], ('source', 'traffic_source'),
+        'pageviews', 'sessions', tuple(USER_COLUMNS), 'bounced', 'session_duration',
+        DERIVED_INPUTS['hour'], DERIVED_INPUTS['date'], DERIVED_INPUTS['day_of_week']
+    ]
+    SCALED_RESULTS = [
+        'total_sessions', 'total_pageviews', 'top_pages.*', 'traffic_sources.*',
+        'hourly_distribution.*', 'daily_trend.*', 'weekday_distribution.*'
+    ]
+    DISTINCT_RESULTS = ['unique_visitors']
+    KPI_RESULTS = {
+        'total_sessions': 'count', 'unique_visitors': 'distinct',
+        'bounce_rate': 'rate', 'avg_session_duration': 'mean'
+    }
+    KPI_COLUMNS = {'avg_session_duration': 'session_duration'}
+    
     def __init__(self):
         super().__init__('TrafficAnalyzer')
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Analizza il traffico web"""
-        self.results = {
-            'total_sessions': len(data) if len(data) > 0 else 0,
-            'total_pageviews': self._count_pageviews(data),
-            'unique_visitors': self._count_unique_visitors(data),
-            'bounce_rate': self._calculate_bounce_rate(data),
-            'avg_session_duration': self._calculate_avg_duration(data),
-            'pages_per_session': self._calculate_pages_per_session(data),
-            'top_pages': self._get_top_pages(data),
-            'traffic_sources': self._get_traffic_sources(data),
-            'hourly_distribution': self._hourly_distribution(data),
-            'daily_trend': self._daily_trend(data)
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Stato parziale del traffico web"""
+        source_col = self._first_column(data, ['source', 'traffic_source'])
+        user_col = self._first_column(data, USER_COLUMNS)
+        
+        return {
+            'rows': len(data),
+            'pageviews': float(data['pageviews'].sum()) if 'pageviews' in data.columns else None,
+            'sessions': float(data['sessions'].sum()) if 'sessions' in data.columns else None,
+            'visitors': data.cube.users(user_col=user_col) if user_col else None,
+            'bounces': int(data.cube.total('bounces')) if 'bounced' in data.columns else None,
+            'bounce_rows': int(data.cube.total('bounce_rows')) if 'bounced' in data.columns else None,
+            'duration': NumericSummary.from_series(data['session_duration']) if 'session_duration' in data.columns else None,
+            'pages': self._derived_counts(data, 'page'),
+            'sources': data.cube.counts(source_col) if source_col else None,
+            'hours': self._derived_counts(data, 'hour'),
+            'dates': self._derived_counts(data, 'date'),
+            'weekdays': self._derived_counts(data, 'day_of_week')
+        }
+    
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultati dell'analisi del traffico web"""
+        return {
+            'total_sessions': self._count_sessions(state),
+            'total_pageviews': self._count_pageviews(state),
+            'unique_visitors': self._count_unique_visitors(state),
+            'bounce_rate': self._calculate_bounce_rate(state),
+            'avg_session_duration': self._calculate_avg_duration(state),
+            'pages_per_session': self._calculate_pages_per_session(state),
+            'top_pages': self._get_top_pages(state),
+            'traffic_sources': self._get_traffic_sources(state),
+            'hourly_distribution': self._hourly_distribution(state),
+            'daily_trend': self._daily_trend(state),
+            'weekday_distribution': self._weekday_distribution(state)
         }
-        return self.results
     
-    def _count_pageviews(self, data: pd.DataFrame) -> int:
+    def _derived_counts(self, data: pd.DataFrame, name: str) -> Optional[KeyedSum]:
+        """Conteggio per valore di una colonna derivata (pagina normalizzata, ora, giorno...)"""
+        if name in data.derived:
+            return data.cube.counts(name)
+        return None
+    
+    def _count_sessions(self, state: Dict[str, Any]) -> int:
+        """Conta le sessioni (colonna sessions se presente, altrimenti una per riga)"""
+        if state['sessions'] is not None:
+            return int(state['sessions'])
+        return state['rows']
+    
+    def _count_pageviews(self, state: Dict[str, Any]) -> int:
         """Conta le pageviews"""
-        if 'pageviews' in data.columns:
-            return int(data['pageviews'].sum())
-        return len(data)
+        if state['pageviews'] is not None:
+            return int(state['pageviews'])
+        return state['rows']
     
-    def _count_unique_visitors(self, data: pd.DataFrame) -> int:
+    def _count_unique_visitors(self, state: Dict[str, Any]) -> int:
         """Conta i visitatori unici"""
-        if 'user_id' in data.columns:
-            return data['user_id'].nunique()
-        return data.shape[0]
+        if state['visitors'] is not None:
+            return len(state['visitors'])
+        return state['rows']
     
-    def _calculate_bounce_rate(self, data: pd.DataFrame) -> float:
+    def _calculate_bounce_rate(self, state: Dict[str, Any]) -> float:
         """Calcola bounce rate"""
-        if 'bounced' in data.columns:
-            bounces = (data['bounced'] == 1).sum()
-            return (bounces / len(data) * 100) if len(data) > 0 else 0
+        if state['bounces'] is not None:
+            # Sulle righe con bounced valorizzato (negli eventi GA4 solo la prima di ogni sessione)
+            rows = state.get('bounce_rows', state['rows'])
+            return (state['bounces'] / rows * 100) if rows > 0 else 0
         return 0.0
     
-    def _calculate_avg_duration(self, data: pd.DataFrame) -> float:
+    def _calculate_avg_duration(self, state: Dict[str, Any]) -> float:
         """Calcola durata media sessione"""
-        if 'session_duration' in data.columns:
-            return float(data['session_duration'].mean())
+        if state['duration'] is not None:
+            return float(state['duration'].mean())
         return 0.0
     
-    def _calculate_pages_per_session(self, data: pd.DataFrame) -> float:
+    def _calculate_pages_per_session(self, state: Dict[str, Any]) -> float:
         """Calcola pagine per sessione"""
-        if 'pageviews' in data.columns and 'sessions' in data.columns:
-            total_pages = data['pageviews'].sum()
-            total_sessions = data['sessions'].sum()
-            return total_pages / total_sessions if total_sessions > 0 else 0
+        if state['pageviews'] is not None and state['sessions'] is not None:
+            total_sessions = state['sessions']
+            return state['pageviews'] / total_sessions if total_sessions > 0 else 0
         return 0.0
     
-    def _get_top_pages(self, data: pd.DataFrame, limit: int = 10) -> list:
+    def _get_top_pages(self, state: Dict[str, Any], limit: int = 10) -> dict:
         """Ritorna top pagine"""
-        if 'page' in data.columns or 'page_path' in data.columns:
-            col = 'page' if 'page' in data.columns else 'page_path'
-            return data[col].value_counts().head(limit).to_dict()
+        if state['pages'] is not None:
+            return state['pages'].top(limit)
         return {}
     
-    def _get_traffic_sources(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _get_traffic_sources(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Ritorna sorgenti di traffico"""
-        if 'source' in data.columns or 'traffic_source' in data.columns:
-            col = 'source' if 'source' in data.columns else 'traffic_source'
-            return data[col].value_counts().to_dict()
+        if state['sources'] is not None:
+            return state['sources'].top()
         return {}
     
-    def _hourly_distribution(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _hourly_distribution(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Distribuzione oraria del traffico"""
-        if 'hour' in data.columns or 'timestamp' in data.columns:
-            if 'hour' not in data.columns:
-                data['hour'] = pd.to_datetime(data['timestamp']).dt.hour
-            return data['hour'].value_counts().sort_index().to_dict()
+        if state['hours'] is not None:
+            return state['hours'].sorted_by_key()
         return {}
     
-    def _daily_trend(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _daily_trend(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Trend giornaliero"""
-        if 'date' in data.columns or 'timestamp' in data.columns:
-            if 'date' not in data.columns:
-                data['date'] = pd.to_datetime(data['timestamp']).dt.date
-            return data['date'].value_counts().sort_index().to_dict()
+        if state['dates'] is not None:
+            return state['dates'].sorted_by_key()
+        return {}
+    
+    def _weekday_distribution(self, state: Dict[str, Any]) -> Dict[int, int]:
+        """Distribuzione per giorno della settimana (0 = lunedì)"""
+        if state['weekdays'] is not None:
+            return state['weekdays'].sorted_by_key()
         return {}
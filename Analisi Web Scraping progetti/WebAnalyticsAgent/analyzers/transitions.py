@@ -0,0 +1,485 @@
+"""
+Transitions - Matrice sparsa delle transizioni tra pagine
+"""
+
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+
+from .aggregates import KeyedSum, _hash_values
+
+# Colonne candidate (vale la prima presente)
+PAGE_COLUMNS = ['page', 'page_path', 'page_location']
+SESSION_COLUMNS = ['session_id', 'ga_session_id']
+ORDER_COLUMNS = ['event_time', 'timestamp']
+
+# ga_session_id è univoco solo per utente: la sessione è la coppia (utente, id)
+SESSION_USER_COLUMNS = {'ga_session_id': 'user_pseudo_id'}
+
+# Eventi che corrispondono a una pagina vista (export GA4 con event_name)
+PAGE_VIEW_EVENTS = ['page_view', 'screen_view']
+
+SEPARATOR = ' → '
+
+# Celle oltre le quali i duplicati si sommano ordinando invece che con un array denso
+DENSE_CELLS = 1 << 20
+
+# Eventi tenuti in memoria prima di essere riversati su disco, divisi per sessione
+# in 2**SPILL_BITS file (i primi bit dell'hash della sessione)
+SPILL_EVENTS = 1000000
+SPILL_BITS = 6
+
+# Evento: hash della sessione, tempo ordinabile, ordine di arrivo, codice della pagina
+EVENT_DTYPE = np.dtype([('session', np.uint64), ('time', np.int64), ('seq', np.int64), ('page', np.int64)])
+# Bordi di una sessione: primo e ultimo evento (ordinati per hash della sessione)
+BOUNDARY_DTYPE = np.dtype([
+    ('session', np.uint64), ('first_time', np.int64), ('first_page', np.int64),
+    ('last_time', np.int64), ('last_page', np.int64)
+])
+
+# Eventi senza tempo: in coda alla sessione, nell'ordine di arrivo
+NO_TIME = np.iinfo(np.int64).max
+
+
+def _time_keys(times: pd.Series) -> np.ndarray:
+    """
+    Tempi come int64 confrontabili tra chunk (NaT e valori non leggibili = NO_TIME)
+    
+    Date e ore diventano nanosecondi da epoch, i numeri una codifica dei
+    float64 che ne conserva l'ordine, le stringhe vengono lette come date.
+    """
+    if pd.api.types.is_numeric_dtype(times) and not pd.api.types.is_bool_dtype(times):
+        values = times.to_numpy(dtype='float64', na_value=np.nan)
+        keys = values.view(np.int64)
+        # Negativi: bit invertiti tranne il segno, così l'ordine degli int64 è quello dei float
+        keys = np.where(keys < 0, keys ^ np.int64(0x7FFFFFFFFFFFFFFF), keys)
+        keys[np.isnan(values)] = NO_TIME
+        return keys
+    
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times, errors='coerce')
+    if isinstance(times.dtype, pd.DatetimeTZDtype):
+        times = times.dt.tz_convert(None)
+    keys = times.to_numpy(dtype='datetime64[ns]').view(np.int64).copy()
+    keys[times.isna().to_numpy()] = NO_TIME
+    return keys
+
+
+class TransitionMatrix:
+    """
+    Conteggi delle transizioni pagina -> pagina, fondibili tra chunk
+    
+    Le pagine sono codificate con un dizionario (codice = posizione in pages)
+    e la matrice è memorizzata in forma sparsa come terne (riga, colonna,
+    conteggio) senza duplicati.
+    
+    Per le transizioni ricavate dagli eventi ogni chunk tiene gli eventi in
+    forma compatta (hash della sessione, tempo, ordine di arrivo, pagina):
+    le transizioni vengono contate alla prima lettura della matrice,
+    ordinando per sessione e tempo tutti gli eventi fusi, quindi una sessione
+    divisa tra chunk dà le stesse transizioni del caricamento completo in
+    qualunque ordine arrivino gli eventi. Oltre SPILL_EVENTS eventi vengono
+    riversati su disco divisi per sessione e contati un file alla volta.
+    
+    Tra esecuzioni incrementali restano solo i bordi (primo e ultimo evento)
+    di ogni sessione: le sessioni che proseguono vengono ricucite, ma se le
+    due parti si sovrappongono nel tempo la transizione al bordo non viene
+    contata e la sessione finisce in unordered_sessions.
+    """
+    
+    def __init__(self):
+        """Inizializza una matrice vuota"""
+        self.pages: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+        self.rows = np.empty(0, dtype=np.int64)
+        self.cols = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        # Bordi delle sessioni già contate (None = coppie esplicite)
+        self.boundaries: Optional[np.ndarray] = None
+        # Eventi non ancora contati: in memoria (blocchi) e su disco
+        self.events: List[np.ndarray] = []
+        self.event_count = 0
+        self.spill_dir: Optional[str] = None
+        self._cleanup: Optional[weakref.finalize] = None
+        # Stato accumulato da più chunk (non un parziale appena calcolato)
+        self.merged = False
+        # Sessioni con parti sovrapposte nel tempo tra esecuzioni incrementali
+        self.unordered_sessions = 0
+    
+    @classmethod
+    def from_pairs(cls, previous: pd.Series, pages: pd.Series) -> 'TransitionMatrix':
+        """
+        Crea la matrice da coppie esplicite (pagina precedente, pagina)
+        
+        Args:
+            previous: Pagina precedente (NaN = ingresso, non è una transizione)
+            pages: Pagina corrente
+        
+        Returns:
+            Matrice delle transizioni
+        """
+        mask = previous.notna() & pages.notna()
+        matrix = cls()
+        matrix._add(matrix._encode(previous[mask]), matrix._encode(pages[mask]))
+        return matrix
+    
+    @classmethod
+    def from_events(cls, data: pd.DataFrame, page_col: str, session_cols: List[str],
+                    order_col: Optional[str] = None) -> 'TransitionMatrix':
+        """
+        Crea la matrice dagli eventi: ordinati per sessione e tempo, ogni
+        evento forma una transizione con il precedente della stessa sessione
+        
+        Args:
+            data: Eventi con pagina e sessione
+            page_col: Colonna della pagina
+            session_cols: Colonne che identificano la sessione
+            order_col: Colonna del tempo (None = ordine delle righe)
+        
+        Returns:
+            Matrice delle transizioni (eventi contati alla prima lettura)
+        """
+        columns = session_cols + [page_col] + ([order_col] if order_col else [])
+        events = data[columns].dropna(subset=session_cols + [page_col])
+        
+        matrix = cls()
+        block = np.empty(len(events), dtype=EVENT_DTYPE)
+        block['session'] = _hash_values(events[session_cols])
+        block['time'] = _time_keys(events[order_col]) if order_col else NO_TIME
+        block['seq'] = np.arange(len(events))
+        block['page'] = matrix._encode(events[page_col])
+        
+        matrix.boundaries = np.empty(0, dtype=BOUNDARY_DTYPE)
+        matrix.events = [block]
+        matrix.event_count = len(block)
+        return matrix
+    
+    def _encode(self, pages) -> np.ndarray:
+        """Codici delle pagine (Series o array), aggiunte al dizionario se nuove"""
+        codes, uniques = pd.factorize(pages)
+        mapping = np.empty(len(uniques), dtype=np.int64)
+        for i, page in enumerate(uniques):
+            code = self._codes.get(page)
+            if code is None:
+                code = self._codes[page] = len(self.pages)
+                self.pages.append(page)
+            mapping[i] = code
+        return mapping[codes]
+    
+    def _add(self, rows: np.ndarray, cols: np.ndarray, counts: Optional[np.ndarray] = None):
+        """Aggiunge transizioni e somma i duplicati"""
+        if not len(rows):
+            return
+        counts = counts if counts is not None else np.ones(len(rows), dtype=np.int64)
+        size = max(len(self.pages), 1)
+        
+        keys = np.concatenate([self.rows * size + self.cols, rows * size + cols])
+        weights = np.concatenate([self.counts, counts])
+        if size * size <= DENSE_CELLS:
+            dense = np.bincount(keys, weights=weights, minlength=size * size)
+            unique = np.flatnonzero(dense)
+            self.counts = dense[unique].astype(np.int64)
+        else:
+            unique, inverse = np.unique(keys, return_inverse=True)
+            self.counts = np.bincount(inverse, weights=weights).astype(np.int64)
+        self.rows, self.cols = unique // size, unique % size
+    
+    def merge(self, other: 'TransitionMatrix') -> 'TransitionMatrix':
+        """
+        Fonde un'altra matrice (successiva nel flusso) in questa
+        
+        Transizioni già contate e bordi si sommano subito; gli eventi non
+        ancora contati si accodano a quelli di questa matrice, dopo nell'ordine
+        di arrivo, e vengono riversati su disco oltre SPILL_EVENTS.
+        """
+        self.merged = True
+        mapping = self._encode(np.asarray(other.pages, dtype=object))
+        self._add(mapping[other.rows], mapping[other.cols], other.counts)
+        self.unordered_sessions += other.unordered_sessions
+        
+        if other.boundaries is not None:
+            self._stitch(self._remap_boundaries(other.boundaries, mapping))
+        
+        for block in other._pending_blocks():
+            block = block.copy()
+            block['page'] = mapping[block['page']]
+            block['seq'] += self.event_count
+            self.events.append(block)
+        self.event_count += other.event_count
+        other._discard_spill()
+        
+        if sum(len(block) for block in self.events) >= SPILL_EVENTS:
+            self._spill()
+        return self
+    
+    def _remap_boundaries(self, boundaries: np.ndarray, mapping: np.ndarray) -> np.ndarray:
+        """Bordi con i codici pagina di un'altra matrice tradotti nel dizionario di questa"""
+        remapped = boundaries.copy()
+        remapped['first_page'] = mapping[boundaries['first_page']]
+        remapped['last_page'] = mapping[boundaries['last_page']]
+        return remapped
+    
+    def _pending_blocks(self):
+        """Eventi non ancora contati: blocchi in memoria e file su disco"""
+        yield from self.events
+        if self.spill_dir is not None:
+            for bucket in range(1 << SPILL_BITS):
+                path = os.path.join(self.spill_dir, f"{bucket}.bin")
+                if os.path.exists(path):
+                    yield np.fromfile(path, dtype=EVENT_DTYPE)
+    
+    def _spill(self):
+        """Riversa su disco gli eventi in memoria, un file per gruppo di sessioni (append)"""
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='transitions-')
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+        
+        events = np.concatenate(self.events)
+        self.events = []
+        buckets = (events['session'] >> np.uint64(64 - SPILL_BITS)).astype(np.int64)
+        order = np.argsort(buckets, kind='stable')
+        bounds = np.searchsorted(buckets[order], np.arange((1 << SPILL_BITS) + 1))
+        for bucket in range(1 << SPILL_BITS):
+            if bounds[bucket] < bounds[bucket + 1]:
+                with open(os.path.join(self.spill_dir, f"{bucket}.bin"), 'ab') as f:
+                    events[order[bounds[bucket]:bounds[bucket + 1]]].tofile(f)
+    
+    def _discard_spill(self):
+        """Elimina i file degli eventi riversati su disco"""
+        if self._cleanup is not None:
+            self._cleanup()
+        self.spill_dir = None
+        self._cleanup = None
+    
+    def _count_events(self):
+        """
+        Conta le transizioni degli eventi in sospeso e ne ricava i bordi delle sessioni
+        
+        Gli eventi sono ordinati per sessione, tempo e ordine di arrivo; con
+        lo spill su disco si legge un file (un gruppo di sessioni) alla volta.
+        """
+        if not self.events and self.spill_dir is None:
+            return
+        
+        if self.spill_dir is None:
+            groups = [np.concatenate(self.events)]
+        else:
+            # Ogni gruppo di sessioni: il suo file più gli eventi ancora in memoria
+            pending = np.concatenate(self.events) if self.events else np.empty(0, dtype=EVENT_DTYPE)
+            buckets = (pending['session'] >> np.uint64(64 - SPILL_BITS)).astype(np.int64)
+            groups = (
+                np.concatenate([
+                    np.fromfile(path, dtype=EVENT_DTYPE) if os.path.exists(path) else np.empty(0, dtype=EVENT_DTYPE),
+                    pending[buckets == bucket]
+                ])
+                for bucket, path in (
+                    (bucket, os.path.join(self.spill_dir, f"{bucket}.bin")) for bucket in range(1 << SPILL_BITS)
+                )
+            )
+        
+        # I gruppi seguono i primi bit dell'hash: i bordi escono già ordinati per sessione
+        boundaries = [self._sessions_of(group) for group in groups]
+        self.events = []
+        self._discard_spill()
+        self._stitch(np.concatenate(boundaries) if boundaries else np.empty(0, dtype=BOUNDARY_DTYPE))
+    
+    def _sessions_of(self, events: np.ndarray) -> np.ndarray:
+        """Conta le transizioni di eventi di sessioni complete e ne ritorna i bordi"""
+        events = events[np.lexsort((events['seq'], events['time'], events['session']))]
+        sessions, pages, times = events['session'], events['page'], events['time']
+        
+        # Coppie (precedente, corrente) dentro la stessa sessione
+        same = sessions[1:] == sessions[:-1]
+        self._add(pages[:-1][same], pages[1:][same])
+        
+        first = np.r_[True, ~same] if len(events) else np.empty(0, dtype=bool)
+        last = np.r_[~same, True] if len(events) else np.empty(0, dtype=bool)
+        boundaries = np.empty(int(first.sum()), dtype=BOUNDARY_DTYPE)
+        boundaries['session'] = sessions[first]
+        boundaries['first_time'], boundaries['first_page'] = times[first], pages[first]
+        boundaries['last_time'], boundaries['last_page'] = times[last], pages[last]
+        return boundaries
+    
+    def _stitch(self, after: np.ndarray):
+        """
+        Aggiunge i bordi di sessioni successive nel flusso a quelli già contati
+        
+        Le sessioni presenti in entrambi vengono ricucite: l'ultima pagina
+        della parte precedente forma una transizione con la prima della
+        successiva (o viceversa se la successiva è più vecchia). Se le due
+        parti si sovrappongono nel tempo non c'è un ordine certo: la
+        transizione al bordo non viene contata e la sessione è conteggiata
+        in unordered_sessions.
+        """
+        if self.boundaries is None or not len(self.boundaries):
+            self.boundaries = after
+            return
+        if not len(after):
+            return
+        
+        _, before_at, after_at = np.intersect1d(
+            self.boundaries['session'], after['session'], assume_unique=True, return_indices=True
+        )
+        before, later = self.boundaries[before_at], after[after_at]
+        untimed = (before['last_time'] == NO_TIME) | (later['first_time'] == NO_TIME)
+        forward = untimed | (before['last_time'] <= later['first_time'])
+        backward = ~forward & (later['last_time'] <= before['first_time'])
+        self.unordered_sessions += int((~forward & ~backward).sum())
+        
+        self._add(
+            np.concatenate([before['last_page'][forward], later['last_page'][backward]]),
+            np.concatenate([later['first_page'][forward], before['first_page'][backward]])
+        )
+        
+        # Bordi della sessione ricucita: primo evento della parte iniziale, ultimo della finale
+        starts_after = backward | (~forward & (later['first_time'] < before['first_time']))
+        ends_after = forward | (~backward & (later['last_time'] > before['last_time']))
+        stitched = before.copy()
+        stitched['first_time'] = np.where(starts_after, later['first_time'], before['first_time'])
+        stitched['first_page'] = np.where(starts_after, later['first_page'], before['first_page'])
+        stitched['last_time'] = np.where(ends_after, later['last_time'], before['last_time'])
+        stitched['last_page'] = np.where(ends_after, later['last_page'], before['last_page'])
+        
+        self.boundaries[before_at] = stitched
+        fresh = np.ones(len(after), dtype=bool)
+        fresh[after_at] = False
+        combined = np.concatenate([self.boundaries, after[fresh]])
+        self.boundaries = combined[np.argsort(combined['session'], kind='stable')]
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        """
+        Stato per pickle (stati incrementali, processi)
+        
+        Un parziale di chunk viaggia con i suoi eventi, che saranno fusi e
+        contati con gli altri; uno stato fuso (o con eventi su disco) viene
+        contato prima: quello salvato resta proporzionale alle sessioni, non
+        agli eventi.
+        """
+        if self.merged or self.spill_dir is not None:
+            self._count_events()
+        state = dict(self.__dict__)
+        state['_cleanup'] = None
+        return state
+    
+    def _label(self, row: int, col: int) -> str:
+        return f"{self.pages[row]}{SEPARATOR}{self.pages[col]}"
+    
+    def top(self, limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Transizioni più frequenti ('pagina → pagina': conteggio)
+        
+        Args:
+            limit: Numero di transizioni (None = tutte)
+        
+        Returns:
+            Dizionario ordinato per conteggio decrescente, come KeyedSum.top
+        """
+        self._count_events()
+        candidates = np.arange(len(self.counts))
+        if limit is not None and limit < len(self.counts):
+            # Solo le transizioni con conteggio almeno pari al limit-esimo (parità incluse)
+            threshold = np.partition(self.counts, -limit)[-limit] if limit > 0 else np.inf
+            candidates = np.flatnonzero(self.counts >= threshold)
+        
+        labeled = [(self._label(self.rows[i], self.cols[i]), int(self.counts[i])) for i in candidates]
+        ranked = sorted(labeled, key=lambda item: (-item[1], item[0]))
+        return dict(ranked[:limit] if limit is not None else ranked)
+    
+    def _degree(self, codes: np.ndarray, weighted: bool) -> KeyedSum:
+        self._count_events()
+        weights = self.counts if weighted else None
+        degree = np.bincount(codes, weights=weights, minlength=len(self.pages)).astype(np.int64)
+        return KeyedSum({self.pages[i]: int(degree[i]) for i in np.flatnonzero(degree)})
+    
+    def out_degree(self, weighted: bool = False) -> KeyedSum:
+        """Pagine successive distinte (weighted: transizioni in uscita) per pagina"""
+        return self._degree(self.rows, weighted)
+    
+    def in_degree(self, weighted: bool = False) -> KeyedSum:
+        """Pagine precedenti distinte (weighted: transizioni in ingresso) per pagina"""
+        return self._degree(self.cols, weighted)
+    
+    def reachable(self, page: Any, steps: int = 1) -> Dict[Any, int]:
+        """
+        Pagine raggiungibili da una pagina in al più steps transizioni
+        
+        Args:
+            page: Pagina di partenza
+            steps: Numero massimo di transizioni
+        
+        Returns:
+            Dizionario pagina -> numero minimo di transizioni (partenza esclusa)
+        """
+        self._count_events()
+        start = self._codes.get(page)
+        if start is None:
+            return {}
+        
+        distance = np.full(len(self.pages), -1, dtype=np.int64)
+        distance[start] = 0
+        frontier = np.zeros(len(self.pages), dtype=bool)
+        frontier[start] = True
+        
+        for step in range(1, steps + 1):
+            reached = np.zeros(len(self.pages), dtype=bool)
+            reached[self.cols[frontier[self.rows]]] = True
+            frontier = reached & (distance < 0)
+            if not frontier.any():
+                break
+            distance[frontier] = step
+        
+        return {self.pages[i]: int(distance[i]) for i in np.flatnonzero(distance > 0)}
+    
+    def reachability(self, page: Any, steps: int = 1) -> Dict[Any, float]:
+        """
+        Probabilità di trovarsi su ogni pagina dopo esattamente steps transizioni
+        
+        Il cammino segue le frequenze osservate in uscita da ogni pagina; dalle
+        pagine senza transizioni in uscita la sessione termina, quindi le
+        probabilità possono sommare a meno di 1.
+        
+        Args:
+            page: Pagina di partenza
+            steps: Numero di transizioni
+        
+        Returns:
+            Dizionario pagina -> probabilità (solo valori positivi)
+        """
+        self._count_events()
+        start = self._codes.get(page)
+        if start is None:
+            return {}
+        
+        outgoing = np.bincount(self.rows, weights=self.counts, minlength=len(self.pages))
+        probabilities = self.counts / outgoing[self.rows] if len(self.counts) else np.empty(0)
+        
+        state = np.zeros(len(self.pages))
+        state[start] = 1.0
+        for _ in range(steps):
+            state = np.bincount(self.cols, weights=state[self.rows] * probabilities, minlength=len(self.pages))
+        
+        return {self.pages[i]: float(state[i]) for i in np.flatnonzero(state > 0)}
+    
+    def _boundary_pages(self, field: str) -> Optional[KeyedSum]:
+        """Sessioni per pagina del primo o dell'ultimo evento"""
+        self._count_events()
+        if self.boundaries is None:
+            return None
+        counts = np.bincount(self.boundaries[field], minlength=len(self.pages))
+        return KeyedSum({self.pages[i]: int(counts[i]) for i in np.flatnonzero(counts)})
+    
+    def entries(self) -> Optional[KeyedSum]:
+        """Pagine di ingresso (primo evento di ogni sessione), None per le coppie esplicite"""
+        return self._boundary_pages('first_page')
+    
+    def exits(self) -> Optional[KeyedSum]:
+        """Pagine di uscita (ultimo evento di ogni sessione), None per le coppie esplicite"""
+        return self._boundary_pages('last_page')
+    
+    def __len__(self) -> int:
+        self._count_events()
+        return int(self.counts.size)
@@ -5,78 +5,112 @@ User Analyzer - Analizza il comportamento degli utenti
 import pandas as pd
 from typing import Dict, Any
 from .base_analyzer import BaseAnalyzer
+from .aggregates import DistinctSet
+from .cube import USER_COLUMNS
 
 
 class UserAnalyzer(BaseAnalyzer):
     """Analizzatore del comportamento utenti"""
     
+    INPUT_COLUMNS = [tuple(USER_COLUMNS), 'user_type', ('user_segment', 'region', 'country'), 'revenue', 'session_id']
+    SCALED_RESULTS = ['new_users', 'returning_users', 'user_segments.*', 'user_lifetime_value.total_revenue']
+    DISTINCT_RESULTS = ['total_users']
+    KPI_RESULTS = {'total_users': 'distinct', 'user_retention': 'rate'}
+    
     def __init__(self):
         super().__init__('UserAnalyzer')
     
-    def analyze(self, data: pd.DataFrame) -> Dict[str, Any]:
-        """Analizza gli utenti"""
-        self.results = {
-            'total_users': self._count_total_users(data),
-            'new_users': self._count_new_users(data),
-            'returning_users': self._count_returning_users(data),
-            'user_segments': self._segment_users(data),
-            'user_retention': self._calculate_retention(data),
-            'user_lifetime_value': self._calculate_ltv(data),
-            'avg_users_per_session': self._avg_users_per_session(data)
+    def partial(self, data: pd.DataFrame) -> Dict[str, Any]:
+        """Stato parziale degli utenti (user_pseudo_id negli export GA4, altrimenti user_id)"""
+        user_col = self._first_column(data, USER_COLUMNS)
+        segment_col = self._first_column(data, ['user_segment', 'region', 'country'])
+        
+        state = {
+            'rows': len(data),
+            'users': data.cube.users(user_col=user_col) if user_col else None,
+            'user_types': data.cube.counts('user_type') if 'user_type' in data.columns else None,
+            'segments': data.cube.counts(segment_col) if segment_col else None,
+            'segment_column': segment_col,
+            'revenue': None,
+            'user_revenue': None,
+            'sessions': None,
+            'session_users': None
+        }
+        
+        if 'revenue' in data.columns and user_col:
+            state['revenue'] = float(data.cube.total('revenue'))
+            state['user_revenue'] = float(data.loc[data[user_col].notna(), 'revenue'].sum())
+        
+        if 'session_id' in data.columns and user_col:
+            state['sessions'] = DistinctSet.from_values(data['session_id'])
+            state['session_users'] = DistinctSet.from_values(data[['session_id', user_col]])
+        
+        return state
+    
+    def finalize(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Risultati dell'analisi utenti"""
+        return {
+            'total_users': self._count_total_users(state),
+            'new_users': self._count_new_users(state),
+            'returning_users': self._count_returning_users(state),
+            'user_segments': self._segment_users(state),
+            'user_retention': self._calculate_retention(state),
+            'user_lifetime_value': self._calculate_ltv(state),
+            'avg_users_per_session': self._avg_users_per_session(state)
         }
-        return self.results
     
-    def _count_total_users(self, data: pd.DataFrame) -> int:
+    def _count_total_users(self, state: Dict[str, Any]) -> int:
         """Conta gli utenti totali"""
-        if 'user_id' in data.columns:
-            return data['user_id'].nunique()
-        return data.shape[0]
+        if state['users'] is not None:
+            return len(state['users'])
+        return state['rows']
     
-    def _count_new_users(self, data: pd.DataFrame) -> int:
+    def _count_new_users(self, state: Dict[str, Any]) -> int:
         """Conta nuovi utenti"""
-        if 'user_type' in data.columns:
-            return (data['user_type'] == 'new').sum()
+        if state['user_types'] is not None:
+            return state['user_types'].get('new')
         return 0
     
-    def _count_returning_users(self, data: pd.DataFrame) -> int:
+    def _count_returning_users(self, state: Dict[str, Any]) -> int:
         """Conta utenti di ritorno"""
-        if 'user_type' in data.columns:
-            return (data['user_type'] == 'returning').sum()
+        if state['user_types'] is not None:
+            return state['user_types'].get('returning')
         return 0
     
-    def _segment_users(self, data: pd.DataFrame) -> Dict[str, int]:
+    def _segment_users(self, state: Dict[str, Any]) -> Dict[str, int]:
         """Segmenta gli utenti"""
         segments = {}
         
-        if 'user_segment' in data.columns:
-            segments = data['user_segment'].value_counts().to_dict()
-        elif 'region' in data.columns or 'country' in data.columns:
-            col = 'region' if 'region' in data.columns else 'country'
-            segments = data[col].value_counts().head(10).to_dict()
+        if state['segments'] is not None:
+            limit = None if state['segment_column'] == 'user_segment' else 10
+            segments = state['segments'].top(limit)
         
         return segments
     
-    def _calculate_retention(self, data: pd.DataFrame) -> float:
+    def _calculate_retention(self, state: Dict[str, Any]) -> float:
         """Calcola retention rate"""
-        if 'user_type' in data.columns:
-            total = len(data)
-            returning = (data['user_type'] == 'returning').sum()
+        if state['user_types'] is not None:
+            total = state['rows']
+            returning = state['user_types'].get('returning')
             return (returning / total * 100) if total > 0 else 0
         return 0.0
     
-    def _calculate_ltv(self, data: pd.DataFrame) -> Dict[str, float]:
+    def _calculate_ltv(self, state: Dict[str, Any]) -> Dict[str, float]:
         """Calcola Lifetime Value"""
         ltv_data = {}
         
-        if 'revenue' in data.columns and 'user_id' in data.columns:
-            ltv_data['total_revenue'] = float(data['revenue'].sum())
-            ltv_data['avg_revenue_per_user'] = float(data.groupby('user_id')['revenue'].sum().mean())
+        if state['revenue'] is not None:
+            # Media delle somme per utente = ricavi degli utenti noti / utenti distinti
+            users = len(state['users'])
+            ltv_data['total_revenue'] = state['revenue']
+            ltv_data['avg_revenue_per_user'] = state['user_revenue'] / users if users > 0 else float('nan')
         
         return ltv_data
     
-    def _avg_users_per_session(self, data: pd.DataFrame) -> float:
+    def _avg_users_per_session(self, state: Dict[str, Any]) -> float:
         """Calcola media utenti per sessione"""
-        if 'session_id' in data.columns and 'user_id' in data.columns:
-            users_per_session = data.groupby('session_id')['user_id'].nunique()
-            return float(users_per_session.mean())
+        if state['sessions'] is not None:
+            # Media di nunique(user_id) per sessione = coppie distinte / sessioni distinte
+            sessions = len(state['sessions'])
+            return len(state['session_users']) / sessions if sessions > 0 else float('nan')
         return 0.0
@@ -12,6 +12,11 @@ from pathlib import Path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from web_analytics_agent import WebAnalyticsAgent
+from loaders.filters import parse_condition
+from loaders.partitions import is_partitioned
+from loaders.sampling import parse_sample
+from analyzers.executor import EXECUTOR_MODES
+from datetime import datetime
 import json
 import logging
 
@@ -19,6 +24,33 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _date_arg(value: str) -> str:
+    """Valida una data AAAA-MM-GG passata da riga di comando"""
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data non valida (atteso AAAA-MM-GG): {value}")
+    return value
+
+
+def _condition_arg(value: str) -> str:
+    """Valida un filtro colonna=valore passato da riga di comando"""
+    try:
+        parse_condition(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def _sample_arg(value: str) -> str:
+    """Valida una modalità di campionamento passata da riga di comando"""
+    try:
+        parse_sample(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
 def main():
     """Funzione principale CLI"""
     parser = argparse.ArgumentParser(
@@ -38,6 +70,30 @@ Esempi di uso:
 
   # Esporta i risultati
   python cli.py --data data.csv --export json
+
+  # Analizza un export molto grande a chunk
+  python cli.py --data export.csv --type ga4 --stream --chunk-size 50000
+
+  # Passa da solo alla lettura a chunk oltre 2 GB di memoria stimata
+  python cli.py --data export.csv --type ga4 --memory-budget 2048
+
+  # Analizza solo l'ultima settimana di un archivio giornaliero
+  python cli.py --data data/ga4/ --type ga4 --from 2026-01-01 --to 2026-01-07
+
+  # Solo traffico italiano da Facebook, ultimi tre giorni
+  python cli.py --data export.csv --type ga4 --where country=Italy --where utm_source=facebook.com --from 2026-01-03 --to 2026-01-05
+
+  # Esecuzione giornaliera: legge solo i file/le righe nuove
+  python cli.py --data data/ga4/ --type ga4 --incremental
+
+  # Anteprima veloce: 10% degli utenti, stime con intervalli di confidenza
+  python cli.py --data export.csv --type ga4 --sample users:0.1
+
+  # Analizzatori in parallelo su 4 processi
+  python cli.py --data export.csv --type ga4 --jobs 4 --executor process
+
+  # Più fonti analizzate insieme, un processo per fonte
+  python cli.py --data a.csv b.csv c.csv --source-workers 3
         """
     )
     
@@ -45,7 +101,7 @@ Esempi di uso:
         '--data', 
         type=str, 
         nargs='+',
-        help='Percorso ai file dati'
+        help='Percorso ai file dati (anche cartelle o glob di file giornalieri)'
     )
     
     parser.add_argument(
@@ -84,6 +140,91 @@ Esempi di uso:
         help='Esporta risultati in formato'
     )
     
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Lettura a chunk (memoria limitata per file molto grandi)'
+    )
+    
+    parser.add_argument(
+        '--no-result-cache',
+        action='store_true',
+        help='Ricalcola tutti gli analizzatori senza usare la cache dei risultati'
+    )
+    
+    parser.add_argument(
+        '--no-ga4-sessions',
+        action='store_true',
+        help='Non ricostruisce le sessioni dagli eventi GA4'
+    )
+    
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        help='Righe per chunk in modalità streaming'
+    )
+    
+    parser.add_argument(
+        '--memory-budget',
+        type=int,
+        help='MB massimi per fonte caricata per intero (oltre: lettura a chunk automatica)'
+    )
+    
+    parser.add_argument(
+        '--from',
+        dest='date_from',
+        type=_date_arg,
+        help='Primo giorno (AAAA-MM-GG): partizioni scelte per data e righe filtrate in lettura, con --where'
+    )
+    
+    parser.add_argument(
+        '--to',
+        dest='date_to',
+        type=_date_arg,
+        help='Ultimo giorno (AAAA-MM-GG): partizioni scelte per data e righe filtrate in lettura, con --where'
+    )
+    
+    parser.add_argument(
+        '--where',
+        action='append',
+        type=_condition_arg,
+        metavar='COLONNA=VALORE',
+        help='Filtro sulle righe applicato in lettura (ripetibile; anche !=, >, >=, <, <=)'
+    )
+    
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Analizza solo i dati nuovi rispetto all\'esecuzione precedente'
+    )
+    
+    parser.add_argument(
+        '--sample',
+        type=_sample_arg,
+        metavar='MODO[:VALORE]',
+        help='Anteprima su un campione: reservoir[:righe] (uniforme) o users[:quota] (per utente)'
+    )
+    
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        metavar='N',
+        help='Analizzatori eseguiti in parallelo per ogni fonte'
+    )
+    
+    parser.add_argument(
+        '--executor',
+        choices=EXECUTOR_MODES,
+        help='Esecuzione parallela degli analizzatori con thread o processi (default: thread)'
+    )
+    
+    parser.add_argument(
+        '--source-workers',
+        type=int,
+        metavar='N',
+        help='Fonti analizzate contemporaneamente in un pool di processi'
+    )
+    
     parser.add_argument(
         '--interactive',
         action='store_true',
@@ -104,6 +245,25 @@ Esempi di uso:
     
     agent = WebAnalyticsAgent(config_file)
     
+    if args.no_result_cache:
+        agent.config.setdefault('data_config', {})['result_cache'] = False
+    if args.no_ga4_sessions:
+        agent.config.setdefault('data_config', {})['ga4_sessions'] = False
+    if args.chunk_size:
+        agent.config.setdefault('data_config', {})['chunk_size'] = args.chunk_size
+    if args.where:
+        agent.config.setdefault('data_config', {})['filters'] = args.where
+    if args.memory_budget:
+        agent.config.setdefault('data_config', {})['memory_budget_mb'] = args.memory_budget
+    if args.sample:
+        agent.config.setdefault('data_config', {})['sample'] = args.sample
+    if args.jobs:
+        agent.config.setdefault('data_config', {})['jobs'] = args.jobs
+    if args.executor:
+        agent.config.setdefault('data_config', {})['executor'] = args.executor
+    if args.source_workers:
+        agent.config.setdefault('data_config', {})['source_workers'] = args.source_workers
+    
     # Modalità interattiva
     if args.interactive:
         interactive_mode(agent)
@@ -118,15 +278,19 @@ Esempi di uso:
     for i, data_file in enumerate(args.data):
         source_name = f"source_{i+1}" if len(args.data) > 1 else "main"
         
-        if not os.path.exists(data_file):
+        if not os.path.exists(data_file) and not is_partitioned(data_file):
             logger.error(f"❌ File non trovato: {data_file}")
             continue
         
-        agent.add_data_source(source_name, args.type, data_file)
+        agent.add_data_source(source_name, args.type, data_file, streaming=True if args.stream else None)
     
     # Analizza
     print("🔍 Avvio analisi...\n")
-    agent.analyze_all_sources()
+    agent.analyze_all_sources(
+        date_from=args.date_from,
+        date_to=args.date_to,
+        incremental=True if args.incremental else None
+    )
     
     # Genera report
     print("\n📝 Generazione report...\n")
@@ -159,6 +323,7 @@ def interactive_mode(agent):
     print("Comandi disponibili:")
     print("  add <name> <type> <path>  - Aggiungi fonte dati")
     print("  analyze                   - Analizza tutte le fonti")
+    print("  sample <modo[:valore]|off> - Anteprima su campione (reservoir, users)")
     print("  report <source> <format>  - Genera report")
     print("  export <format>           - Esporta risultati")
     print("  status                    - Mostra stato")
@@ -185,6 +350,13 @@ def interactive_mode(agent):
                 agent.analyze_all_sources()
                 print("✅ Analisi completata")
             
+            elif cmd[0] == 'sample' and len(cmd) >= 2:
+                value = None if cmd[1] == 'off' else cmd[1]
+                if value is not None:
+                    parse_sample(value)
+                agent.config.setdefault('data_config', {})['sample'] = value
+                print(f"✅ Campionamento: {value or 'disattivato'}")
+            
             elif cmd[0] == 'report' and len(cmd) >= 2:
                 source = cmd[1]
                 fmt = cmd[2] if len(cmd) > 2 else 'html'
@@ -199,7 +371,7 @@ def interactive_mode(agent):
                 print(json.dumps(agent.get_summary(), indent=2, default=str))
             
             elif cmd[0] == 'help':
-                print("Comandi disponibili: add, analyze, report, export, status, help, exit")
+                print("Comandi disponibili: add, analyze, sample, report, export, status, help, exit")
             
             else:
                 print("❌ Comando non riconosciuto")
@@ -0,0 +1,251 @@
+"""
+Access Log - Parser dei log nginx/Apache in formato combined
+"""
+
+import os
+import re
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
+import logging
+
+from .byte_ranges import iter_range_blocks, split_byte_ranges
+from .compression import detect_codec, iter_text_blocks
+
+logger = logging.getLogger(__name__)
+
+# 127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /index.html HTTP/1.0" 200 2326 "http://ref/" "Mozilla/4.08"
+COMBINED_LOG_PATTERN = re.compile(
+    r'^(\S+) \S+ (\S+) \[([^\]]+)\] "(\S+) (\S+)[^"]*" (\d{3}) (\S+)(?: "([^"]*)" "([^"]*)")?[^\n]*$',
+    re.MULTILINE
+)
+LOG_FIELDS = ['ip', 'remote_user', 'time', 'method', 'page', 'status', 'bytes', 'referrer', 'user_agent']
+
+ASSET_PATTERN = r'\.(?:css|js|png|jpe?g|gif|svg|ico|webp|woff2?|ttf|map)(?:\?|$)'
+BOT_PATTERN = r'(?i)bot|crawl|spider|slurp|curl|wget'
+MOBILE_PATTERN = r'(?i)mobi|android|iphone'
+TABLET_PATTERN = r'(?i)ipad|tablet'
+
+LOG_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+MONTHS = [b'Jan', b'Feb', b'Mar', b'Apr', b'May', b'Jun', b'Jul', b'Aug', b'Sep', b'Oct', b'Nov', b'Dec']
+
+SESSION_TIMEOUT_SECONDS = 30 * 60
+
+# Colonne del DataFrame prodotto da read_access_log
+ACCESS_LOG_COLUMNS = [
+    'timestamp', 'ip', 'user_id', 'method', 'page', 'status', 'bytes', 'referrer', 'source',
+    'device_type', 'bot', 'session_id', 'session_duration', 'previous_page',
+    'is_first_page', 'is_last_page', 'landing_page'
+]
+
+
+def _parse_block(text: str) -> pd.DataFrame:
+    """Applica il pattern precompilato a un blocco di righe"""
+    return pd.DataFrame(COMBINED_LOG_PATTERN.findall(text), columns=LOG_FIELDS)
+
+
+def _parse_range(path: str, start: int, end: int) -> pd.DataFrame:
+    """Esegue il parsing di un intervallo di byte (eseguita nei worker)"""
+    frames = [_parse_block(block) for block in iter_range_blocks(path, start, end)]
+    frames = [frame for frame in frames if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LOG_FIELDS)
+
+
+def _map_unique(values: pd.Series, func) -> np.ndarray:
+    """Applica func ai soli valori distinti (timestamp, referrer e user agent si ripetono)"""
+    codes, uniques = pd.factorize(values)
+    mapped = np.asarray(func(pd.Series(uniques, dtype=object)))
+    return mapped[codes]
+
+
+def parse_log_times(times: pd.Series) -> pd.DatetimeIndex:
+    """
+    Converte i timestamp del log ("10/Oct/2000:13:55:36 -0700") in UTC
+    
+    I campi hanno larghezza fissa: le cifre vengono lette direttamente dai
+    byte con NumPy invece di usare strptime riga per riga.
+    """
+    values = times.to_numpy(dtype=object)
+    if len(values) == 0 or any(len(value) != 26 for value in values):
+        return pd.DatetimeIndex(pd.to_datetime(times, format=LOG_TIME_FORMAT, utc=True, errors='coerce'))
+    
+    raw = np.asarray(values.astype('S26')).view(np.uint8).reshape(-1, 26).astype(np.int64)
+    digits = raw - ord('0')
+    
+    def number(*columns):
+        result = np.zeros(len(raw), dtype=np.int64)
+        for col in columns:
+            result = result * 10 + digits[:, col]
+        return result
+    
+    month_keys = raw[:, 3] << 16 | raw[:, 4] << 8 | raw[:, 5]
+    known = np.array([m[0] << 16 | m[1] << 8 | m[2] for m in MONTHS], dtype=np.int64)
+    month = np.searchsorted(np.sort(known), month_keys)
+    month = np.argsort(known)[np.minimum(month, 11)]
+    
+    digit_columns = [0, 1, 7, 8, 9, 10, 12, 13, 15, 16, 18, 19, 22, 23, 24, 25]
+    valid = (
+        ((digits[:, digit_columns] >= 0) & (digits[:, digit_columns] <= 9)).all(axis=1)
+        & (known[month] == month_keys)
+        & np.isin(raw[:, 21], [ord('+'), ord('-')])
+    )
+    if not valid.all():
+        return pd.DatetimeIndex(pd.to_datetime(times, format=LOG_TIME_FORMAT, utc=True, errors='coerce'))
+    
+    days = (
+        (number(7, 8, 9, 10) - 1970).astype('datetime64[Y]')
+        + month.astype('timedelta64[M]')
+    ).astype('datetime64[D]') + (number(0, 1) - 1).astype('timedelta64[D]')
+    sign = np.where(raw[:, 21] == ord('-'), -1, 1)
+    offset = sign * (number(22, 23) * 3600 + number(24, 25) * 60)
+    seconds = (
+        days.astype(np.int64) * 86400
+        + number(12, 13) * 3600 + number(15, 16) * 60 + number(18, 19)
+        - offset
+    )
+    
+    return pd.DatetimeIndex(seconds.astype('datetime64[s]')).tz_localize('UTC')
+
+
+def normalize_log_frame(raw: pd.DataFrame, exclude_assets: bool = True) -> pd.DataFrame:
+    """
+    Converte i campi grezzi del log nelle colonne usate dagli analizzatori
+    
+    Args:
+        raw: Campi estratti dal pattern (LOG_FIELDS)
+        exclude_assets: Scarta le richieste a risorse statiche (css, js, immagini)
+    
+    Returns:
+        DataFrame con timestamp, page, source, user_id, device_type, bot, ...
+    """
+    if exclude_assets and not raw.empty:
+        is_asset = _map_unique(raw['page'], lambda pages: pages.str.contains(ASSET_PATTERN, regex=True))
+        raw = raw[~is_asset.astype(bool)]
+    
+    referrer = raw['referrer'].replace('', '-')
+    user_agent = raw['user_agent']
+    
+    time_codes, time_values = pd.factorize(raw['time'])
+    timestamp = parse_log_times(pd.Series(time_values, dtype=object))[time_codes]
+    source = _map_unique(
+        referrer,
+        lambda refs: refs.str.extract(r'^[a-z]+://(?:www\.)?([^/:?#]+)', flags=re.IGNORECASE, expand=False)
+        .str.lower().fillna('direct')
+    )
+    device = _map_unique(
+        user_agent,
+        lambda agents: np.where(
+            agents.str.contains(TABLET_PATTERN, regex=True), 'tablet',
+            np.where(agents.str.contains(MOBILE_PATTERN, regex=True), 'mobile', 'desktop')
+        )
+    )
+    page = _map_unique(raw['page'], lambda pages: pages.str.split('?', n=1).str[0])
+    
+    data = pd.DataFrame({
+        'timestamp': timestamp,
+        'ip': raw['ip'].to_numpy(),
+        'user_id': pd.util.hash_pandas_object(raw[['ip', 'user_agent']], index=False).to_numpy(),
+        'method': pd.Categorical(raw['method']),
+        'page': pd.Categorical(page),
+        'status': pd.array(_map_unique(raw['status'], lambda codes: pd.to_numeric(codes)), dtype='Int16'),
+        'bytes': pd.array(pd.to_numeric(raw['bytes'], errors='coerce'), dtype='Int64'),
+        'referrer': pd.Categorical(referrer),
+        'source': pd.Categorical(source),
+        'device_type': pd.Categorical(device),
+        'bot': _map_unique(user_agent, lambda agents: agents.str.contains(BOT_PATTERN, regex=True)).astype(bool)
+    })
+    
+    return data.dropna(subset=['timestamp']).reset_index(drop=True)
+
+
+def sessionize(data: pd.DataFrame, timeout_seconds: int = SESSION_TIMEOUT_SECONDS) -> pd.DataFrame:
+    """
+    Raggruppa le richieste in sessioni (inattività > timeout = nuova sessione)
+    
+    Args:
+        data: Richieste normalizzate (timestamp, user_id, page)
+        timeout_seconds: Inattività massima all'interno di una sessione
+    
+    Returns:
+        DataFrame ordinato con session_id, session_duration, previous_page,
+        is_first_page, is_last_page e landing_page (una riga per richiesta)
+    """
+    data = data.sort_values(['user_id', 'timestamp'], kind='stable').reset_index(drop=True)
+    
+    user = data['user_id'].to_numpy()
+    seconds = ((data['timestamp'] - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    
+    new_session = np.ones(len(data), dtype=bool)
+    if len(data) > 1:
+        new_session[1:] = (user[1:] != user[:-1]) | (np.diff(seconds) > timeout_seconds)
+    session = np.cumsum(new_session) - 1
+    
+    # Riduzioni segmentate sui confini di sessione
+    starts = np.flatnonzero(new_session)
+    ends = np.append(starts[1:], len(data)) - 1
+    duration = seconds[ends] - seconds[starts]
+    
+    is_last = np.zeros(len(data), dtype=bool)
+    is_last[ends] = True
+    
+    previous_page = data['page'].astype(object).shift(1)
+    previous_page[new_session] = None
+    
+    data['session_id'] = session
+    data['session_duration'] = duration[session]
+    data['previous_page'] = previous_page
+    data['is_first_page'] = new_session
+    data['is_last_page'] = is_last
+    data['landing_page'] = data['page'].to_numpy(dtype=object)[starts][session]
+    
+    return data
+
+
+def _read_raw(path: str, workers: int, offset: int = 0) -> pd.DataFrame:
+    """Legge le righe grezze di un file di log, in parallelo per intervalli di byte"""
+    if detect_codec(path):
+        # Log ruotati compressi (access.log.2.gz): lettura sequenziale a blocchi
+        ranges = [(0, os.path.getsize(path))]
+        frames = [_parse_block(block) for block in iter_text_blocks(path)]
+        frames = [frame for frame in frames if not frame.empty] or [pd.DataFrame(columns=LOG_FIELDS)]
+    else:
+        ranges = split_byte_ranges(path, workers, offset)
+        if len(ranges) == 1:
+            frames = [_parse_range(path, *ranges[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                frames = list(pool.map(
+                    _parse_range, [path] * len(ranges),
+                    [start for start, _ in ranges], [end for _, end in ranges]
+                ))
+    
+    raw = pd.concat(frames, ignore_index=True)
+    logger.info(f"  📜 {len(raw)} righe di log lette da {len(ranges)} intervalli")
+    return raw
+
+
+def read_access_log(path: Union[str, List[str]], workers: Optional[int] = None, exclude_assets: bool = True,
+                    timeout_seconds: int = SESSION_TIMEOUT_SECONDS, offset: int = 0) -> pd.DataFrame:
+    """
+    Legge uno o più access log combined, in parallelo per intervalli di byte
+    
+    Args:
+        path: Percorso al file di log (anche compresso) o lista di file
+            (partizioni giornaliere, sessionizzate insieme)
+        workers: Processi del pool (default: numero di CPU)
+        exclude_assets: Scarta le richieste a risorse statiche
+        timeout_seconds: Timeout di inattività per la sessionizzazione
+        offset: Byte da cui iniziare a leggere un file singolo (righe aggiunte)
+    
+    Returns:
+        DataFrame sessionizzato con le colonne degli analizzatori
+    """
+    workers = workers or os.cpu_count() or 1
+    paths = [path] if isinstance(path, str) else list(path)
+    
+    # Una sessione a cavallo della mezzanotte attraversa due file
+    frames = [_read_raw(log_path, workers, offset if len(paths) == 1 else 0) for log_path in paths]
+    raw = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=LOG_FIELDS)
+    
+    return sessionize(normalize_log_frame(raw, exclude_assets), timeout_seconds)
@@ -0,0 +1,41 @@
+"""
+Byte Ranges - Suddivisione dei file di testo in intervalli di righe intere
+"""
+
+import os
+from typing import Iterator, List, Tuple
+
+BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def iter_range_blocks(path: str, start: int, end: int, block_size: int = BLOCK_SIZE) -> Iterator[str]:
+    """
+    Legge l'intervallo di byte [start, end) a blocchi di righe intere
+    
+    Una riga appartiene all'intervallo in cui inizia: ogni worker salta la
+    riga parziale iniziale e completa l'ultima riga oltre end.
+    """
+    with open(path, 'rb') as f:
+        if start > 0:
+            f.seek(start - 1)
+            if f.read(1) != b'\n':
+                f.readline()
+        
+        position = f.tell()
+        while position < end:
+            block = f.read(min(block_size, end - position))
+            if not block:
+                break
+            if not block.endswith(b'\n'):
+                block += f.readline()
+            position = f.tell()
+            yield block.decode('utf-8', errors='replace')
+
+
+def split_byte_ranges(path: str, parts: int, offset: int = 0) -> List[Tuple[int, int]]:
+    """Divide un file (da offset alla fine) in intervalli di byte di dimensione simile"""
+    size = os.path.getsize(path)
+    offset = min(offset, size)
+    parts = max(1, min(parts, (size - offset) // BLOCK_SIZE + 1))
+    step = -(-(size - offset) // parts) if size > offset else 1
+    return [(start, min(start + step, size)) for start in range(offset, size, step)] or [(offset, offset)]
@@ -0,0 +1,81 @@
+"""
+Chunked Reader - Lettura a blocchi delle fonti dati tabellari
+"""
+
+import pandas as pd
+from typing import Dict, Any, Iterator, List, Optional
+import logging
+
+from .columns import column_selector
+from .compression import open_source
+from .ga4_ndjson import is_ndjson_path, read_ga4_ndjson
+from .ga4_schema import read_ga4_csv
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedReader:
+    """Lettore a chunk: la memoria usata dipende da chunk_size, non dal file"""
+    
+    STREAMABLE_TYPES = ['csv', 'ga4']
+    
+    def __init__(self, source_info: Dict[str, Any], chunk_size: int = 100000,
+                 cache: Optional[Any] = None, paths: Optional[List[str]] = None,
+                 dedup: Optional[Any] = None, row_filter: Optional[Any] = None):
+        """
+        Inizializza il lettore
+        
+        Args:
+            source_info: Informazioni sulla fonte (type, path)
+            chunk_size: Numero di righe per chunk
+            cache: ColumnarCache da cui leggere se la fonte è già in cache
+            paths: File da leggere in sequenza (partizioni; default: path della fonte)
+            dedup: EventDeduplicator applicato a ogni chunk prima degli analizzatori
+            row_filter: RowFilter applicato in lettura (anche sulla cache colonnare)
+        """
+        if source_info['type'] not in self.STREAMABLE_TYPES:
+            raise ValueError(f"Streaming non supportato per il tipo: {source_info['type']}")
+        
+        self.source_info = source_info
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.paths = paths if paths is not None else [source_info['path']]
+        self.dedup = dedup
+        # Proiezione scelta dal planner (None = tutte le colonne)
+        self.columns = source_info.get('columns')
+        self.row_filter = row_filter if row_filter is not None and row_filter.active else None
+        self.rows_read = 0
+    
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        """Itera sui chunk della fonte (partizione per partizione)"""
+        for path in self.paths:
+            chunks = None
+            
+            if self.cache is not None:
+                chunks = self.cache.iter_chunks(
+                    path, self.source_info['type'], self.chunk_size, self.row_filter, self.columns
+                )
+            if chunks is None:
+                chunks = self._read_chunks(path)
+                if self.row_filter is not None:
+                    chunks = (self.row_filter.apply(chunk) for chunk in chunks)
+            
+            for chunk in chunks:
+                if self.dedup is not None:
+                    chunk = self.dedup.apply(chunk)
+                self.rows_read += len(chunk)
+                logger.debug(f"  … chunk da {len(chunk)} righe ({self.rows_read} totali)")
+                yield chunk
+    
+    def _read_chunks(self, path: str) -> Iterator[pd.DataFrame]:
+        """Legge la fonte a chunk, decompressa al volo se archiviata"""
+        if self.source_info['type'] == 'ga4' and is_ndjson_path(path):
+            yield from read_ga4_ndjson(path, chunksize=self.chunk_size, columns=self.columns)
+            return
+        
+        usecols = column_selector(self.columns)
+        with open_source(path) as handle:
+            if self.source_info['type'] == 'ga4':
+                yield from read_ga4_csv(handle, chunksize=self.chunk_size, usecols=usecols)
+            else:
+                yield from pd.read_csv(handle, chunksize=self.chunk_size, usecols=usecols)
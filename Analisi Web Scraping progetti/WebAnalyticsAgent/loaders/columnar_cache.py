@@ -0,0 +1,250 @@
+"""
+Columnar Cache - Cache colonnare (Arrow IPC) delle fonti già lette
+"""
+
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from typing import Dict, Any, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Da incrementare quando cambia il modo in cui le fonti vengono lette/tipizzate
+PARSER_VERSION = '2'
+
+# Indice stat -> hash dei file, condiviso dalle cache che lo leggono da più thread
+INDEX_FILE = 'index.json'
+_INDEX_LOCK = threading.Lock()
+
+
+def content_hash(path: str, cache_dir: str = './cache') -> str:
+    """
+    Hash del contenuto di un file, memorizzato per (path, size, mtime)
+    
+    Args:
+        path: Percorso al file sorgente
+        cache_dir: Cartella dell'indice degli hash
+    
+    Returns:
+        Digest esadecimale SHA-256
+    """
+    stat = os.stat(path)
+    stat_key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    with _INDEX_LOCK:
+        cached = _read_index(cache_dir).get(stat_key)
+    
+    if cached is not None:
+        return cached
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    
+    with _INDEX_LOCK:
+        index = _read_index(cache_dir)
+        index[stat_key] = digest.hexdigest()
+        _write_index(cache_dir, index)
+    return index[stat_key]
+
+
+def _read_index(cache_dir: str) -> Dict[str, str]:
+    """Legge l'indice stat -> hash"""
+    index_path = os.path.join(cache_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(cache_dir: str, index: Dict[str, str]):
+    """Scrive l'indice stat -> hash"""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, INDEX_FILE), 'w') as f:
+            json.dump(index, f, indent=2)
+    except OSError as e:
+        logger.warning(f"⚠️  Impossibile aggiornare l'indice della cache: {e}")
+
+
+class ColumnarCache:
+    """
+    Cache indirizzata per contenuto: hash del file + versione del parser
+    
+    Una fonte letta con la proiezione del planner viene salvata solo con le
+    colonne lette, in un file distinto per insieme di colonne: la prima
+    lettura non deve materializzare le colonne escluse (blob JSON inclusi)
+    solo per popolare la cache. Una copia completa, se presente, serve
+    qualunque proiezione.
+    """
+    
+    def __init__(self, cache_dir: str = './cache'):
+        """
+        Inizializza la cache
+        
+        Args:
+            cache_dir: Cartella dei file colonnari
+        """
+        self.cache_dir = cache_dir
+        self.available = self._check_pyarrow()
+        self.hits = 0
+        self.misses = 0
+    
+    def _check_pyarrow(self) -> bool:
+        """Verifica che pyarrow sia installato (dipendenza opzionale)"""
+        try:
+            import pyarrow  # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("⚠️  pyarrow non installato: cache colonnare disabilitata")
+            return False
+    
+    def content_hash(self, path: str) -> str:
+        """Hash del contenuto del file (vedi content_hash)"""
+        return content_hash(path, self.cache_dir)
+    
+    def cache_path(self, path: str, source_type: str, columns: Optional[List[str]] = None) -> str:
+        """Percorso del file colonnare per una fonte (e un insieme di colonne)"""
+        key = f"{self.content_hash(path)[:32]}_{source_type}_v{PARSER_VERSION}"
+        if columns is not None:
+            key += '_c' + hashlib.sha256('\0'.join(sorted(columns)).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{key}.arrow")
+    
+    def load(self, path: str, source_type: str, row_filter: Optional[Any] = None,
+             columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Carica una fonte dalla cache (memory-mapped)
+        
+        Args:
+            path: Percorso al file sorgente
+            source_type: Tipo della fonte
+            row_filter: RowFilter valutato sui dati Arrow prima della conversione
+            columns: Colonne da convertire (None = tutte)
+        
+        Returns:
+            DataFrame oppure None se non in cache
+        """
+        table = self._open(path, source_type, columns)
+        if table is None:
+            return None
+        return self._to_pandas(table, row_filter, columns)
+    
+    def iter_chunks(self, path: str, source_type: str, chunk_size: int,
+                    row_filter: Optional[Any] = None,
+                    columns: Optional[List[str]] = None) -> Optional[Iterator[pd.DataFrame]]:
+        """
+        Itera la fonte in cache a blocchi di righe
+        
+        Args:
+            path: Percorso al file sorgente
+            source_type: Tipo della fonte
+            chunk_size: Righe per chunk
+            row_filter: RowFilter valutato sui dati Arrow prima della conversione
+            columns: Colonne da convertire (None = tutte)
+        
+        Returns:
+            Iteratore di DataFrame oppure None se non in cache
+        """
+        table = self._open(path, source_type, columns)
+        if table is None:
+            return None
+        return (self._to_pandas(batch, row_filter, columns) for batch in table.to_batches(max_chunksize=chunk_size))
+    
+    def _to_pandas(self, table: Any, row_filter: Optional[Any] = None,
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Converte una tabella (o un batch) Arrow in DataFrame
+        
+        Vengono convertite solo le colonne richieste; con un filtro prima le
+        sole colonne del filtro e poi solo le righe che lo soddisfano: il resto
+        non lascia mai la memory-map.
+        """
+        import pyarrow as pa
+        
+        mask = None
+        if row_filter is not None and row_filter.active:
+            keys = table.select(row_filter.columns(table.schema.names)).to_pandas()
+            mask = row_filter.mask(keys)
+        if columns is not None:
+            table = table.select([col for col in table.schema.names if col in set(columns)])
+        if mask is not None and not mask.all():
+            table = table.filter(pa.array(mask))
+        return table.to_pandas()
+    
+    def store(self, path: str, source_type: str, data: pd.DataFrame,
+              columns: Optional[List[str]] = None) -> bool:
+        """
+        Salva una fonte letta in formato Arrow IPC
+        
+        Args:
+            path: Percorso al file sorgente
+            source_type: Tipo della fonte
+            data: DataFrame letto dal sorgente
+            columns: Proiezione con cui è stato letto (None = fonte completa)
+        
+        Returns:
+            True se salvato con successo
+        """
+        if not self.available:
+            return False
+        
+        import pyarrow as pa
+        
+        target = self.cache_path(path, source_type, columns)
+        tmp_target = f"{target}.tmp"
+        
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            table = pa.Table.from_pandas(data, preserve_index=False)
+            with pa.OSFile(tmp_target, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_target, target)
+        except (pa.ArrowException, OSError) as e:
+            logger.warning(f"⚠️  Impossibile salvare in cache {path}: {e}")
+            if os.path.exists(tmp_target):
+                os.remove(tmp_target)
+            return False
+        
+        logger.info(f"💾 Fonte salvata in cache: {target}")
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiche della cache"""
+        return {
+            'enabled': self.available,
+            'cache_dir': self.cache_dir,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+    
+    def _open(self, path: str, source_type: str, columns: Optional[List[str]] = None) -> Any:
+        """Apre in memory-map la copia completa o quella con le colonne richieste (None se assenti)"""
+        if not self.available:
+            return None
+        
+        import pyarrow as pa
+        
+        target = self.cache_path(path, source_type)
+        if not os.path.exists(target) and columns is not None:
+            target = self.cache_path(path, source_type, columns)
+        if not os.path.exists(target):
+            self.misses += 1
+            return None
+        
+        try:
+            table = pa.ipc.open_file(pa.memory_map(target, 'r')).read_all()
+        except (pa.ArrowException, OSError) as e:
+            logger.warning(f"⚠️  File di cache non leggibile {target}: {e}")
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        logger.info(f"⚡ Fonte letta dalla cache: {target}")
+        return table
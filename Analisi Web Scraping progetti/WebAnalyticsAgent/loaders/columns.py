@@ -0,0 +1,61 @@
+"""
+Columns - Colonne delle fonti lette senza caricare i dati
+"""
+
+import csv
+from typing import Callable, List, Optional
+import logging
+
+from .compression import open_source
+
+logger = logging.getLogger(__name__)
+
+
+def column_selector(columns: Optional[List[str]]) -> Optional[Callable[[str], bool]]:
+    """
+    usecols per pd.read_csv dalla proiezione del planner
+    
+    Un callable e non una lista: le partizioni possono non avere tutte le colonne.
+    """
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return lambda col: col in wanted
+
+
+def _csv_header(path: str) -> List[str]:
+    """Intestazione di un CSV (anche compresso)"""
+    with open_source(path, text=True) as f:
+        return next(csv.reader(f), [])
+
+
+def source_columns(source_type: str, paths: List[str]) -> Optional[List[str]]:
+    """
+    Colonne che la fonte avrà una volta caricata
+    
+    Args:
+        source_type: Tipo della fonte (csv, ga4, log, json)
+        paths: File da leggere (partizioni o file singolo)
+    
+    Returns:
+        Unione ordinata delle colonne dei file, None se non ricavabile
+        senza leggere i dati (json)
+    """
+    if source_type == 'log':
+        from .access_log import ACCESS_LOG_COLUMNS
+        return list(ACCESS_LOG_COLUMNS)
+    if source_type not in ('csv', 'ga4'):
+        return None
+    
+    from .ga4_ndjson import is_ndjson_path
+    from .ga4_schema import GA4_EXPORT_COLUMNS
+    
+    columns = []
+    for path in paths:
+        try:
+            header = GA4_EXPORT_COLUMNS if source_type == 'ga4' and is_ndjson_path(path) else _csv_header(path)
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning(f"⚠️  Intestazione non leggibile {path}: {e}")
+            return None
+        columns.extend(col for col in header if col not in columns)
+    return columns
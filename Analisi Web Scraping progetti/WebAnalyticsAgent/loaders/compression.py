@@ -0,0 +1,249 @@
+"""
+Compression - Decompressione in streaming delle fonti archiviate (.gz, .bz2, .xz, .zst)
+"""
+
+import io
+import os
+import bz2
+import gzip
+import lzma
+import zlib
+import queue
+import threading
+from typing import Any, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Firma (magic bytes) -> codec: il contenuto decide, non l'estensione
+CODEC_SIGNATURES = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd')
+]
+
+# Estensioni rimosse per riconoscere il formato interno (eventi.jsonl.zst)
+CODEC_EXTENSIONS = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zst': 'zstd'
+}
+
+READ_BLOCK_SIZE = 1024 * 1024
+READAHEAD_BLOCKS = 8
+
+# Byte compressi decompressi per stimare il rapporto di compressione
+RATIO_SAMPLE_BYTES = 1024 * 1024
+
+
+def detect_codec(path: str) -> Optional[str]:
+    """
+    Riconosce il codec di compressione di un file
+    
+    Args:
+        path: Percorso al file
+    
+    Returns:
+        Nome del codec (gzip, bz2, xz, zstd) oppure None se non compresso
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(6)
+    except OSError:
+        head = b''
+    
+    for signature, codec in CODEC_SIGNATURES:
+        if head.startswith(signature):
+            return codec
+    return None
+
+
+def strip_codec_suffix(path: str) -> str:
+    """Rimuove l'estensione del codec (es. eventi.jsonl.zst -> eventi.jsonl)"""
+    root, ext = os.path.splitext(str(path))
+    return root if ext.lower() in CODEC_EXTENSIONS else str(path)
+
+
+def _open_codec(path: str, codec: str) -> Any:
+    """Apre lo stream decompresso (binario) di un file"""
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'bz2':
+        return bz2.open(path, 'rb')
+    if codec == 'xz':
+        return lzma.open(path, 'rb')
+    if codec == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Per le fonti .zst installa il pacchetto 'zstandard'")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    raise ValueError(f"Codec non supportato: {codec}")
+
+
+def _decompressor(codec: str) -> Any:
+    """Decompressore incrementale (in memoria) per un codec"""
+    if codec == 'gzip':
+        return zlib.decompressobj(wbits=47)
+    if codec == 'bz2':
+        return bz2.BZ2Decompressor()
+    if codec == 'xz':
+        return lzma.LZMADecompressor()
+    if codec == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Per le fonti .zst installa il pacchetto 'zstandard'")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Codec non supportato: {codec}")
+
+
+def uncompressed_size(path: str, codec: Optional[str] = None) -> int:
+    """
+    Stima la dimensione decompressa di un file
+    
+    Decomprime solo i primi RATIO_SAMPLE_BYTES e proietta il rapporto di
+    compressione sul file intero (esatta per i file più piccoli del campione).
+    
+    Args:
+        path: Percorso al file
+        codec: Codec già noto (default: riconosciuto dal contenuto)
+    
+    Returns:
+        Dimensione in byte (quella su disco se il file non è compresso)
+    """
+    size = os.path.getsize(path)
+    codec = codec or detect_codec(path)
+    if codec is None or size == 0:
+        return size
+    
+    with open(path, 'rb') as f:
+        head = f.read(RATIO_SAMPLE_BYTES)
+    inflated = len(_decompressor(codec).decompress(head))
+    if not inflated:
+        # Blocco più grande del campione (bz2): rapporto tipico dei CSV
+        return size * 5
+    return int(size * inflated / len(head))
+
+
+class ReadaheadStream(io.RawIOBase):
+    """
+    Stream decompresso da un thread dedicato in una coda limitata
+    
+    zlib, bz2, lzma e zstd rilasciano il GIL: l'inflate procede mentre il
+    thread chiamante esegue il parsing dei blocchi già pronti.
+    """
+    
+    def __init__(self, stream: Any, block_size: int = READ_BLOCK_SIZE,
+                 depth: int = READAHEAD_BLOCKS):
+        """
+        Inizializza lo stream
+        
+        Args:
+            stream: Stream binario sorgente (già decompresso)
+            block_size: Byte letti per blocco
+            depth: Blocchi massimi in coda (limita la memoria usata)
+        """
+        super().__init__()
+        self._stream = stream
+        self._block_size = block_size
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._current = memoryview(b'')
+        self._eof = False
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+    
+    def _fill(self):
+        """Legge i blocchi decompressi (eseguita nel thread)"""
+        try:
+            while not self._stop.is_set():
+                block = self._stream.read(self._block_size)
+                self._put(block)
+                if not block:
+                    break
+        except Exception as e:
+            self._put(e)
+    
+    def _put(self, item: Any):
+        """Accoda un blocco, interrompendosi se lo stream viene chiuso"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        """Copia nel buffer i byte del blocco corrente"""
+        if not len(self._current):
+            if self._eof:
+                return 0
+            item = self._queue.get()
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self._current = memoryview(item)
+        
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+    
+    def close(self):
+        """Ferma il thread e chiude lo stream sorgente"""
+        if not self.closed:
+            self._stop.set()
+            self._thread.join()
+            self._stream.close()
+        super().close()
+
+
+def open_source(path: str, text: bool = False, codec: Optional[str] = None) -> Any:
+    """
+    Apre una fonte dati, decompressa al volo se necessario
+    
+    Args:
+        path: Percorso al file (compresso o no)
+        text: Ritorna uno stream di testo UTF-8 invece che binario
+        codec: Codec già noto (default: riconosciuto dal contenuto)
+    
+    Returns:
+        File object in lettura
+    """
+    codec = codec or detect_codec(path)
+    
+    if codec is None:
+        if text:
+            return open(path, 'r', encoding='utf-8', errors='replace', newline='\n')
+        return open(path, 'rb')
+    
+    stream = io.BufferedReader(ReadaheadStream(_open_codec(path, codec)), READ_BLOCK_SIZE)
+    if text:
+        return io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='\n')
+    return stream
+
+
+def iter_text_blocks(path: str, block_size: int = 16 * READ_BLOCK_SIZE) -> Iterator[str]:
+    """
+    Legge una fonte compressa a blocchi di righe intere
+    
+    Equivalente sequenziale di iter_range_blocks: uno stream compresso non
+    si può dividere per intervalli di byte.
+    """
+    with open_source(path) as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            if not block.endswith(b'\n'):
+                block += f.readline()
+            yield block.decode('utf-8', errors='replace')
@@ -0,0 +1,315 @@
+"""
+Dedup - Eliminazione degli eventi GA4 duplicati da estrazioni sovrapposte
+"""
+
+import os
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chiave naturale di un evento GA4
+DEDUP_KEY = ['user_pseudo_id', 'event_bundle_sequence_id', 'event_name', 'event_time']
+
+# Intestazione del filtro: bit, funzioni hash, capacità, eventi inseriti (uint64)
+BLOOM_HEADER_BYTES = 32
+BLOOM_BATCH_ROWS = 100000
+# Strati successivi del filtro: capacità raddoppiata, probabilità di errore dimezzata
+BLOOM_GROWTH = 2
+BLOOM_TIGHTENING = 0.5
+
+
+def event_hashes(data: pd.DataFrame, key: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Hash a 64 bit della chiave naturale, stabile tra chunk ed esecuzioni
+    
+    Args:
+        data: DataFrame con le colonne della chiave
+        key: Colonne della chiave (default: DEDUP_KEY)
+    
+    Returns:
+        Array uint64 con un hash per riga
+    """
+    normalized = {}
+    for col in key or DEDUP_KEY:
+        series = data[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            # Microsecondi da epoch: indipendente dall'unità (ns/us) del dtype
+            epoch = pd.Timestamp(0, tz=series.dt.tz)
+            series = ((series - epoch) // pd.Timedelta(microseconds=1)).astype('float64')
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            # Int64 con NA e float64 dello stesso valore devono coincidere
+            series = series.astype('float64')
+        normalized[col] = series
+    
+    frame = pd.DataFrame(normalized, index=data.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+class BloomFilter:
+    """
+    Filtro di Bloom su disco (memory-mapped) per gli eventi delle esecuzioni precedenti
+    
+    L'intestazione conserva capacità ed eventi inseriti: oltre la capacità la
+    probabilità di falso positivo cresce (eventi nuovi scartati come già
+    visti), quindi chi inserisce deve fermarsi a remaining (vedi
+    LayeredBloomFilter).
+    """
+    
+    def __init__(self, path: str, capacity: int = 10000000, error_rate: float = 0.001):
+        """
+        Apre o crea il filtro
+        
+        Args:
+            path: File del filtro
+            capacity: Eventi attesi (dimensiona il filtro alla creazione)
+            error_rate: Probabilità di falso positivo alla capacità indicata
+        """
+        self.path = path
+        
+        if os.path.exists(path):
+            header = np.fromfile(path, dtype=np.uint64, count=4)
+            self.bits_count, self.hash_count = int(header[0]), int(header[1])
+            self.capacity, self.inserted = int(header[2]), int(header[3])
+        else:
+            bits = -capacity * math.log(error_rate) / (math.log(2) ** 2)
+            self.bits_count = max(64, int(math.ceil(bits / 64)) * 64)
+            self.hash_count = max(1, int(round(self.bits_count / capacity * math.log(2))))
+            self.capacity, self.inserted = int(capacity), 0
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'wb') as f:
+                np.array([self.bits_count, self.hash_count, self.capacity, 0], dtype=np.uint64).tofile(f)
+                f.truncate(BLOOM_HEADER_BYTES + self.bits_count // 8)
+        
+        self.bits = np.memmap(path, dtype=np.uint8, mode='r+', offset=BLOOM_HEADER_BYTES,
+                              shape=(self.bits_count // 8,))
+    
+    @property
+    def remaining(self) -> int:
+        """Eventi inseribili prima di superare la capacità"""
+        return max(0, self.capacity - self.inserted)
+    
+    def false_positive_rate(self) -> float:
+        """Probabilità di falso positivo stimata con gli eventi inseriti"""
+        return (1 - math.exp(-self.hash_count * self.inserted / self.bits_count)) ** self.hash_count
+    
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        """Posizioni dei bit per doppio hashing (h1 + i * h2) mod m"""
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rounds = np.arange(self.hash_count, dtype=np.uint64)
+        return (h1[:, None] + rounds[None, :] * h2[:, None]) % np.uint64(self.bits_count)
+    
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Maschera degli hash probabilmente già inseriti"""
+        found = np.empty(len(hashes), dtype=bool)
+        for start in range(0, len(hashes), BLOOM_BATCH_ROWS):
+            positions = self._positions(hashes[start:start + BLOOM_BATCH_ROWS])
+            bytes_ = self.bits[(positions >> np.uint64(3)).astype(np.intp)]
+            bits = (bytes_ >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+            found[start:start + BLOOM_BATCH_ROWS] = bits.all(axis=1)
+        return found
+    
+    def add(self, hashes: np.ndarray):
+        """Inserisce gli hash nel filtro"""
+        for start in range(0, len(hashes), BLOOM_BATCH_ROWS):
+            positions = self._positions(hashes[start:start + BLOOM_BATCH_ROWS]).ravel()
+            masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+            np.bitwise_or.at(self.bits, (positions >> np.uint64(3)).astype(np.intp), masks)
+        self.inserted += len(hashes)
+    
+    def flush(self):
+        """Scrive su disco le pagine modificate e il numero di eventi inseriti"""
+        self.bits.flush()
+        with open(self.path, 'r+b') as f:
+            f.seek(3 * 8)
+            f.write(np.array([self.inserted], dtype=np.uint64).tobytes())
+
+
+class LayeredBloomFilter:
+    """
+    Filtro di Bloom che cresce a strati (path, path.1, path.2...)
+    
+    Quando lo strato corrente raggiunge la capacità se ne apre uno nuovo con
+    capacità BLOOM_GROWTH volte maggiore e probabilità di errore ridotta di
+    BLOOM_TIGHTENING: la probabilità complessiva di falso positivo resta sotto
+    error_rate / (1 - BLOOM_TIGHTENING) qualunque sia il numero di eventi,
+    invece di avvicinarsi a 1 esecuzione dopo esecuzione.
+    """
+    
+    def __init__(self, path: str, capacity: int = 10000000, error_rate: float = 0.001):
+        """
+        Apre gli strati esistenti o crea il primo
+        
+        Args:
+            path: File del primo strato
+            capacity: Eventi del primo strato
+            error_rate: Probabilità di falso positivo del primo strato
+        """
+        self.path = path
+        self.error_rate = error_rate
+        self.layers = [BloomFilter(layer_path) for layer_path in self.layer_paths(path)]
+        if not self.layers:
+            self.layers.append(BloomFilter(path, capacity, error_rate))
+    
+    @staticmethod
+    def layer_paths(path: str) -> List[str]:
+        """File degli strati esistenti, nell'ordine di creazione"""
+        paths = []
+        while os.path.exists(path if not paths else f"{path}.{len(paths)}"):
+            paths.append(path if not paths else f"{path}.{len(paths)}")
+        return paths
+    
+    @classmethod
+    def remove(cls, path: str):
+        """Elimina tutti gli strati del filtro"""
+        for layer_path in cls.layer_paths(path):
+            os.remove(layer_path)
+    
+    @property
+    def inserted(self) -> int:
+        return sum(layer.inserted for layer in self.layers)
+    
+    def false_positive_rate(self) -> float:
+        """Probabilità stimata che un evento nuovo risulti in almeno uno strato"""
+        return 1 - math.prod(1 - layer.false_positive_rate() for layer in self.layers)
+    
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Maschera degli hash probabilmente già inseriti in uno degli strati"""
+        found = self.layers[0].contains(hashes)
+        for layer in self.layers[1:]:
+            found |= layer.contains(hashes)
+        return found
+    
+    def add(self, hashes: np.ndarray):
+        """Inserisce gli hash, aprendo nuovi strati quando quello corrente è pieno"""
+        start = 0
+        while start < len(hashes):
+            layer = self.layers[-1]
+            if layer.remaining == 0:
+                self._grow()
+                continue
+            batch = hashes[start:start + layer.remaining]
+            layer.add(batch)
+            start += len(batch)
+    
+    def _grow(self):
+        """Apre uno strato più grande dopo quello pieno"""
+        last = self.layers[-1]
+        index = len(self.layers)
+        capacity = last.capacity * BLOOM_GROWTH
+        error_rate = self.error_rate * BLOOM_TIGHTENING ** index
+        logger.warning(f"  ⚠️  Filtro di Bloom pieno ({last.inserted} eventi): nuovo strato da {capacity} eventi")
+        self.layers.append(BloomFilter(f"{self.path}.{index}", capacity, error_rate))
+    
+    def flush(self):
+        """Scrive su disco tutti gli strati"""
+        for layer in self.layers:
+            layer.flush()
+
+
+class EventDeduplicator:
+    """
+    Scarta gli eventi già visti (nel run corrente o, con il filtro di Bloom, nei precedenti)
+    
+    Gli hash visti nel run sono sequenze ordinate (una per chunk) fuse a
+    coppie quando hanno dimensioni simili: ogni hash viene rifuso O(log N)
+    volte invece di riordinare tutto lo storico a ogni chunk. Il filtro di
+    Bloom viene solo letto durante la lettura: gli eventi del run vi entrano
+    con commit(), da chiamare dopo che lo stato che li contiene è stato
+    salvato, così un'esecuzione interrotta non li fa scartare alla successiva.
+    """
+    
+    def __init__(self, key: Optional[List[str]] = None, bloom: Optional[LayeredBloomFilter] = None):
+        """
+        Inizializza il deduplicatore
+        
+        Args:
+            key: Colonne della chiave naturale (default: DEDUP_KEY)
+            bloom: Filtro di Bloom persistente tra esecuzioni (opzionale)
+        """
+        self.key = key or DEDUP_KEY
+        self.bloom = bloom
+        # Hash visti nel run: sequenze uint64 ordinate, dimensioni decrescenti
+        self.runs: List[np.ndarray] = []
+        self.rows_in = 0
+        self.duplicates = 0
+        self.previous_runs = 0
+    
+    def applies_to(self, data: Any) -> bool:
+        """Indica se i dati contengono tutte le colonne della chiave"""
+        return isinstance(data, pd.DataFrame) and all(col in data.columns for col in self.key)
+    
+    def _seen(self, hashes: np.ndarray) -> np.ndarray:
+        """Maschera degli hash già visti nel run"""
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), run.size - 1)
+            found |= run[positions] == hashes
+        return found
+    
+    def _remember(self, fresh: np.ndarray):
+        """Aggiunge gli hash nuovi come sequenza ordinata, fondendo le sequenze simili"""
+        if not fresh.size:
+            return
+        self.runs.append(np.sort(fresh))
+        while len(self.runs) > 1 and self.runs[-2].size <= 2 * self.runs[-1].size:
+            last = self.runs.pop()
+            # Due sequenze ordinate: il sort stabile (timsort) le fonde in tempo lineare
+            self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind='stable')
+    
+    def apply(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Rimuove i duplicati in un passaggio vettoriale (vale la prima occorrenza)
+        
+        Args:
+            data: DataFrame o chunk di eventi
+        
+        Returns:
+            DataFrame senza gli eventi già visti
+        """
+        if not self.applies_to(data) or data.empty:
+            return data
+        
+        hashes = event_hashes(data, self.key)
+        duplicate = pd.Series(hashes).duplicated().to_numpy(copy=True)
+        duplicate |= self._seen(hashes)
+        if self.bloom is not None:
+            previous = self.bloom.contains(hashes) & ~duplicate
+            self.previous_runs += int(previous.sum())
+            duplicate |= previous
+        
+        self._remember(hashes[~duplicate])
+        
+        self.rows_in += len(data)
+        dropped = int(duplicate.sum())
+        self.duplicates += dropped
+        
+        return data[~duplicate].reset_index(drop=True) if dropped else data
+    
+    def commit(self):
+        """Inserisce nel filtro di Bloom gli eventi del run (dopo il salvataggio dello stato)"""
+        if self.bloom is None:
+            return
+        for run in self.runs:
+            self.bloom.add(run)
+        self.bloom.flush()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiche della deduplicazione"""
+        stats = {
+            'rows_in': self.rows_in,
+            'duplicates': self.duplicates,
+            'seen_in_previous_runs': self.previous_runs,
+            'rows_out': self.rows_in - self.duplicates
+        }
+        if self.bloom is not None:
+            stats['bloom'] = {
+                'events': self.bloom.inserted,
+                'layers': len(self.bloom.layers),
+                'false_positive_rate': round(self.bloom.false_positive_rate(), 6)
+            }
+        return stats
@@ -0,0 +1,218 @@
+"""
+Filters - Filtri sulle righe applicati durante la lettura delle fonti
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# colonna<op>valore, es. country=Italy, utm_source=facebook,instagram, purchase_revenue>=50
+CONDITION_PATTERN = re.compile(r'^\s*([A-Za-z_][\w.]*)\s*(!=|>=|<=|=|>|<)\s*(.*?)\s*$')
+
+# Colonne usate per l'intervallo di date (la prima presente)
+DATE_COLUMNS = ['event_date', 'date', 'event_time', 'timestamp']
+
+TRUE_VALUES = {'true', '1', 'yes', 'si', 'sì'}
+
+
+def parse_condition(expression: str) -> Tuple[str, str, List[str]]:
+    """
+    Interpreta una condizione testuale
+    
+    Args:
+        expression: Condizione colonna<op>valore; con = e != più valori
+            separati da virgola (es. utm_source=facebook,instagram)
+    
+    Returns:
+        Tupla (colonna, operatore, valori)
+    """
+    match = CONDITION_PATTERN.match(expression)
+    if not match:
+        raise ValueError(f"Filtro non valido: {expression!r} (atteso colonna=valore)")
+    
+    column, operator, value = match.groups()
+    values = [v.strip() for v in value.split(',')] if operator in ('=', '!=') else [value]
+    return column, operator, values
+
+
+def _as_datetime(series: pd.Series) -> pd.Series:
+    """Converte una colonna di date in datetime naive (UTC per le colonne con fuso)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Solo il dizionario viene convertito, non ogni riga
+        categories = _as_datetime(pd.Series(series.cat.categories))
+        codes = series.cat.codes.to_numpy()
+        values = categories.to_numpy()[np.where(codes >= 0, codes, 0)]
+        return pd.Series(np.where(codes >= 0, values, np.datetime64('NaT')), index=series.index)
+    
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series.astype('string'), format='ISO8601', errors='coerce', utc=True)
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert(None)
+    return series
+
+
+def _naive_timestamp(value: str) -> pd.Timestamp:
+    """Timestamp naive (UTC se il valore indica un fuso)"""
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_convert(None) if timestamp.tz is not None else timestamp
+
+
+class RowFilter:
+    """Condizioni sulle colonne e intervallo di date, valutate chunk per chunk"""
+    
+    def __init__(self, conditions: Union[List[str], Dict[str, Any], None] = None,
+                 date_from: Optional[str] = None, date_to: Optional[str] = None):
+        """
+        Inizializza il filtro
+        
+        Args:
+            conditions: Lista di condizioni (country=Italy) oppure dizionario
+                colonna -> valore o lista di valori
+            date_from: Primo giorno incluso (AAAA-MM-GG)
+            date_to: Ultimo giorno incluso (AAAA-MM-GG)
+        """
+        if isinstance(conditions, dict):
+            conditions = [
+                f"{col}={','.join(str(v) for v in value) if isinstance(value, (list, tuple)) else value}"
+                for col, value in conditions.items()
+            ]
+        self.conditions = [parse_condition(expression) for expression in conditions or []]
+        self.date_from = date_from
+        self.date_to = date_to
+        self.rows_in = 0
+        self.rows_out = 0
+        self._warned_dates = False
+    
+    @property
+    def active(self) -> bool:
+        """Indica se il filtro scarta qualcosa"""
+        return bool(self.conditions or self.date_from or self.date_to)
+    
+    def describe(self) -> List[str]:
+        """Condizioni in forma testuale (riepilogo e chiave dello stato incrementale)"""
+        described = [f"{col}{op}{','.join(values)}" for col, op, values in self.conditions]
+        if self.date_from:
+            described.append(f"date>={self.date_from}")
+        if self.date_to:
+            described.append(f"date<={self.date_to}")
+        return described
+    
+    def date_column(self, columns: List[str]) -> Optional[str]:
+        """Colonna su cui applicare l'intervallo di date"""
+        return next((col for col in DATE_COLUMNS if col in columns), None)
+    
+    def columns(self, available: List[str]) -> List[str]:
+        """Colonne necessarie per valutare il filtro"""
+        needed = [col for col, _, _ in self.conditions]
+        date_col = self.date_column(available) if self.date_from or self.date_to else None
+        if date_col and date_col not in needed:
+            needed.append(date_col)
+        return needed
+    
+    def _condition_mask(self, series: pd.Series, operator: str, values: List[str]) -> np.ndarray:
+        """Maschera di una condizione, con i valori convertiti al tipo della colonna"""
+        if pd.api.types.is_bool_dtype(series):
+            targets = [value.lower() in TRUE_VALUES for value in values]
+        elif pd.api.types.is_numeric_dtype(series):
+            try:
+                targets = [float(value) for value in values]
+            except ValueError:
+                # Valore non numerico su una colonna numerica o vuota nel chunk (letta come float64):
+                # confronto come testo, le righe vuote non corrispondono
+                series = series.astype('string')
+                targets = values
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            series = _as_datetime(series)
+            targets = [_naive_timestamp(value) for value in values]
+        else:
+            if isinstance(series.dtype, pd.CategoricalDtype) and operator in ('=', '!='):
+                # isin sul dizionario: nessuna conversione riga per riga
+                targets = values
+            else:
+                series = series.astype('string')
+                targets = values
+        
+        if operator in ('=', '!='):
+            mask = series.isin(targets).to_numpy(dtype=bool, na_value=False)
+            if operator == '!=':
+                mask = ~mask & series.notna().to_numpy()
+            return mask
+        
+        target = targets[0]
+        compare = {
+            '>': series > target,
+            '>=': series >= target,
+            '<': series < target,
+            '<=': series <= target
+        }[operator]
+        return compare.fillna(False).to_numpy(dtype=bool)
+    
+    def mask(self, data: pd.DataFrame) -> np.ndarray:
+        """
+        Maschera delle righe che soddisfano tutte le condizioni
+        
+        Args:
+            data: DataFrame o chunk (bastano le colonne di columns())
+        
+        Returns:
+            Array booleano, una posizione per riga (conteggiato nelle statistiche)
+        """
+        mask = np.ones(len(data), dtype=bool)
+        
+        for col, operator, values in self.conditions:
+            if col not in data.columns:
+                raise ValueError(f"Colonna del filtro non trovata: {col}")
+            mask &= self._condition_mask(data[col], operator, values)
+        
+        if self.date_from or self.date_to:
+            date_col = self.date_column(list(data.columns))
+            if date_col is not None:
+                mask &= self._date_mask(data[date_col])
+            elif not self._warned_dates:
+                logger.warning("  ⚠️  Nessuna colonna data: intervallo --from/--to ignorato sulle righe")
+                self._warned_dates = True
+        
+        self.rows_in += len(data)
+        self.rows_out += int(mask.sum())
+        return mask
+    
+    def _date_mask(self, series: pd.Series) -> np.ndarray:
+        """Maschera dell'intervallo [date_from, date_to] (giorni interi)"""
+        dates = _as_datetime(series)
+        mask = np.ones(len(series), dtype=bool)
+        if self.date_from:
+            mask &= (dates >= pd.Timestamp(self.date_from)).to_numpy(dtype=bool)
+        if self.date_to:
+            end = pd.Timestamp(datetime.strptime(self.date_to, '%Y-%m-%d') + timedelta(days=1))
+            mask &= (dates < end).to_numpy(dtype=bool)
+        return mask
+    
+    def apply(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Mantiene solo le righe che soddisfano il filtro
+        
+        Args:
+            data: DataFrame o chunk
+        
+        Returns:
+            DataFrame filtrato (indice ricostruito)
+        """
+        if not self.active or not isinstance(data, pd.DataFrame):
+            return data
+        
+        mask = self.mask(data)
+        
+        return data if mask.all() else data[mask].reset_index(drop=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiche del filtro"""
+        return {
+            'conditions': self.describe(),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out
+        }
@@ -0,0 +1,106 @@
+"""
+GA4 Items - Tabella delle righe prodotto dalla colonna items degli export GA4
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from itertools import chain
+from typing import Dict, Any, List, Optional
+
+LINE_ITEM_COLUMNS = ['event_row', 'item_id', 'item_name', 'item_category', 'price', 'quantity', 'item_revenue']
+
+
+class LineItems:
+    """Righe prodotto in formato CSR: offsets per evento + tabella piatta"""
+    
+    def __init__(self, offsets: np.ndarray, table: pd.DataFrame):
+        """
+        Inizializza la tabella
+        
+        Args:
+            offsets: Array (n_eventi + 1): le righe dell'evento i sono table[offsets[i]:offsets[i+1]]
+            table: Righe prodotto con chiave esterna event_row (indice dell'evento)
+        """
+        self.offsets = offsets
+        self.table = table
+    
+    def items_per_event(self) -> np.ndarray:
+        """Numero di righe prodotto per evento"""
+        return np.diff(self.offsets)
+    
+    def product_revenue(self, limit: Optional[int] = None) -> pd.DataFrame:
+        """Ricavi e quantità per prodotto, ordinati per ricavo"""
+        if self.table.empty:
+            return pd.DataFrame(columns=['item_id', 'item_name', 'revenue', 'quantity', 'events'])
+        
+        products = self.table.groupby(['item_id', 'item_name'], dropna=False, sort=False, observed=True).agg(
+            revenue=('item_revenue', 'sum'),
+            quantity=('quantity', 'sum'),
+            events=('event_row', 'nunique')
+        ).reset_index().sort_values(['revenue', 'item_id'], ascending=[False, True], kind='stable')
+        
+        return products.head(limit) if limit is not None else products
+    
+    def top_items(self, limit: int = 10) -> Dict[str, float]:
+        """Prodotti con più quantità venduta"""
+        if self.table.empty:
+            return {}
+        quantities = self.table.groupby('item_id', sort=False, observed=True)['quantity'].sum()
+        return quantities.sort_values(ascending=False, kind='stable').head(limit).to_dict()
+    
+    def basket_size(self) -> Dict[str, float]:
+        """Dimensione media del carrello (sugli eventi con almeno un prodotto)"""
+        counts = self.items_per_event()
+        baskets = int((counts > 0).sum())
+        return {
+            'baskets': baskets,
+            'avg_items': float(counts.sum() / baskets) if baskets > 0 else 0.0,
+            'avg_quantity': float(self.table['quantity'].sum() / baskets) if baskets > 0 else 0.0
+        }
+
+
+def build_line_items(data: pd.DataFrame, event_names: Optional[List[str]] = None) -> LineItems:
+    """
+    Espande la colonna items in una tabella di righe prodotto
+    
+    Args:
+        data: DataFrame GA4 con la colonna items
+        event_names: Eventi da considerare (es. ['purchase']); None = tutti
+    
+    Returns:
+        LineItems allineata agli eventi di data
+    """
+    blobs = data['items'] if 'items' in data.columns else pd.Series(None, index=data.index, dtype=object)
+    mask = blobs.notna().to_numpy(copy=True)
+    if event_names is not None and 'event_name' in data.columns:
+        mask &= data['event_name'].isin(event_names).to_numpy()
+    
+    # I blob senza item_id ("items": []) vengono scartati senza parsing
+    if mask.any():
+        mask[mask] = blobs[mask].astype(str).str.contains('"item_id"', regex=False).to_numpy()
+    
+    positions = np.flatnonzero(mask)
+    counts = np.zeros(len(data), dtype=np.int64)
+    records: List[Dict[str, Any]] = []
+    
+    if positions.size:
+        # Un solo json.loads su un array che concatena i blob selezionati
+        parsed = json.loads('[' + ','.join(blobs.iloc[positions].astype(str)) + ']')
+        lists = [blob.get('items') or [] for blob in parsed]
+        counts[positions] = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+        records = list(chain.from_iterable(lists))
+    
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    table = pd.DataFrame.from_records(records, columns=LINE_ITEM_COLUMNS[1:] + ['item_revenue_in_usd'])
+    table.insert(0, 'event_row', np.repeat(data.index.to_numpy(), counts))
+    
+    table['price'] = pd.to_numeric(table['price'], errors='coerce').astype('float64')
+    table['quantity'] = pd.to_numeric(table['quantity'], errors='coerce').fillna(1).astype('int64')
+    revenue = pd.to_numeric(table['item_revenue'], errors='coerce').fillna(
+        pd.to_numeric(table['item_revenue_in_usd'], errors='coerce')
+    )
+    table['item_revenue'] = revenue.fillna(table['price'] * table['quantity']).astype('float64')
+    table['item_category'] = table['item_category'].astype('category')
+    
+    return LineItems(offsets, table[LINE_ITEM_COLUMNS])
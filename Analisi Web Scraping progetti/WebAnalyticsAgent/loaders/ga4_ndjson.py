@@ -0,0 +1,290 @@
+"""
+GA4 NDJSON - Lettore degli export BigQuery GA4 in JSON delimitato da newline
+"""
+
+import os
+import json
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+import logging
+
+from .byte_ranges import iter_range_blocks, split_byte_ranges
+from .compression import detect_codec, iter_text_blocks, open_source, strip_codec_suffix
+from .ga4_params import VALUE_FIELDS
+from .ga4_schema import GA4_CATEGORICAL_COLUMNS, GA4_DTYPES, GA4_EXPORT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl', '.json')
+
+# Colonne ricavate da event_params (prima chiave presente)
+PARAM_KEYS: Dict[str, List[str]] = {
+    'ga_session_id': ['ga_session_id'],
+    'ga_session_number': ['ga_session_number'],
+    'engagement_time_msec': ['engagement_time_msec'],
+    'session_engaged': ['session_engaged'],
+    'page_location': ['page_location'],
+    'page_referrer': ['page_referrer'],
+    'page_title': ['page_title'],
+    'screen_name': ['firebase_screen', 'screen_name'],
+    'utm_source': ['source'],
+    'utm_medium': ['medium'],
+    'utm_campaign': ['campaign'],
+    'utm_term': ['term'],
+    'utm_content': ['content']
+}
+
+# Colonne ricavate dai record annidati (primo percorso non nullo)
+FIELD_PATHS: Dict[str, List[Tuple[str, ...]]] = {
+    'user_pseudo_id': [('user_pseudo_id',)],
+    'user_id': [('user_id',)],
+    'user_first_touch_timestamp': [('user_first_touch_timestamp',)],
+    'event_name': [('event_name',)],
+    'event_bundle_sequence_id': [('event_bundle_sequence_id',)],
+    'event_previous_timestamp': [('event_previous_timestamp',)],
+    'event_server_timestamp_offset': [('event_server_timestamp_offset',)],
+    'ts_source': [('traffic_source', 'source')],
+    'ts_medium': [('traffic_source', 'medium')],
+    'ts_campaign': [('traffic_source', 'name')],
+    'utm_source': [('collected_traffic_source', 'manual_source')],
+    'utm_medium': [('collected_traffic_source', 'manual_medium')],
+    'utm_campaign': [('collected_traffic_source', 'manual_campaign_name')],
+    'utm_term': [('collected_traffic_source', 'manual_term')],
+    'utm_content': [('collected_traffic_source', 'manual_content')],
+    'category': [('device', 'category')],
+    'operating_system': [('device', 'operating_system')],
+    'operating_system_version': [('device', 'operating_system_version')],
+    'browser': [('device', 'browser'), ('device', 'web_info', 'browser')],
+    'browser_version': [('device', 'browser_version'), ('device', 'web_info', 'browser_version')],
+    'language': [('device', 'language')],
+    'continent': [('geo', 'continent')],
+    'sub_continent': [('geo', 'sub_continent')],
+    'country': [('geo', 'country')],
+    'region': [('geo', 'region')],
+    'city': [('geo', 'city')],
+    'transaction_id': [('ecommerce', 'transaction_id')],
+    'purchase_revenue': [('ecommerce', 'purchase_revenue')],
+    'total_item_quantity': [('ecommerce', 'total_item_quantity')],
+    'tax_value': [('ecommerce', 'tax_value')],
+    'shipping_value': [('ecommerce', 'shipping_value')],
+    'analytics_storage': [('privacy_info', 'analytics_storage')],
+    'ads_storage': [('privacy_info', 'ads_storage')]
+}
+
+# Record ripetuti riserializzati come nel CSV: {"event_params": [...]}
+JSON_COLUMNS = ['event_params', 'user_properties', 'items']
+
+
+def is_ndjson_path(path: str) -> bool:
+    """Indica se il percorso è un export NDJSON (in base all'estensione, anche se compresso)"""
+    return strip_codec_suffix(path).lower().endswith(NDJSON_EXTENSIONS)
+
+
+def _nested(event: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    """Segue un percorso di chiavi nei record annidati"""
+    value = event
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _param_values(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Valore (primo campo non nullo) di ogni parametro chiave/valore"""
+    values = {}
+    for record in records:
+        value = record.get('value') or {}
+        for field in VALUE_FIELDS:
+            if value.get(field) is not None:
+                values[record.get('key')] = value[field]
+                break
+    return values
+
+
+def _flatten_event(event: Dict[str, Any]) -> List[Any]:
+    """Appiattisce un evento BigQuery nelle colonne dell'export CSV"""
+    params = _param_values(event.get('event_params') or [])
+    flat = {}
+    
+    for col, paths in FIELD_PATHS.items():
+        for path in paths:
+            value = _nested(event, path)
+            if value is not None:
+                flat[col] = value
+                break
+    # I parametri dell'evento hanno la precedenza sui campi di sessione raccolti
+    for col, keys in PARAM_KEYS.items():
+        for key in keys:
+            if params.get(key) is not None:
+                flat[col] = params[key]
+                break
+    
+    event_date = event.get('event_date')
+    if isinstance(event_date, str) and len(event_date) == 8:
+        event_date = f"{event_date[:4]}-{event_date[4:6]}-{event_date[6:]}"
+    flat['event_date'] = event_date
+    # Microsecondi: convertiti in datetime in modo vettoriale
+    flat['event_time'] = event.get('event_timestamp')
+    
+    for col in JSON_COLUMNS:
+        flat[col] = json.dumps({col: event.get(col) or []}, separators=(',', ':'))
+    
+    return [flat.get(col) for col in GA4_EXPORT_COLUMNS]
+
+
+def _as_int(value: Any) -> Optional[int]:
+    """Converte un intero BigQuery (spesso serializzato come stringa)"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+def _typed_frame(rows: List[List[Any]]) -> pd.DataFrame:
+    """Crea il DataFrame tipizzato (categoriche escluse, vedi _categorize)"""
+    data = pd.DataFrame(rows, columns=GA4_EXPORT_COLUMNS, dtype=object)
+    
+    for col, dtype in GA4_DTYPES.items():
+        if dtype in ('Int64', 'Int32', 'Int8'):
+            data[col] = pd.array([_as_int(value) for value in data[col]], dtype='Int64').astype(dtype)
+        elif dtype == 'float32':
+            data[col] = pd.to_numeric(data[col], errors='coerce').astype('float32')
+    
+    timestamps = pd.array([_as_int(value) for value in data['event_time']], dtype='Int64')
+    data['event_time'] = pd.to_datetime(timestamps, unit='us', utc=True)
+    
+    return data
+
+
+def _categorize(data: pd.DataFrame) -> pd.DataFrame:
+    """Converte le dimensioni a bassa cardinalità in categoriche"""
+    for col in GA4_CATEGORICAL_COLUMNS:
+        if col in data.columns:
+            data[col] = data[col].astype('category')
+    return data
+
+
+def _project(data: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """Mantiene solo le colonne della proiezione (None = tutte)"""
+    if columns is None:
+        return data
+    return data[[col for col in GA4_EXPORT_COLUMNS if col in set(columns)]]
+
+
+def _parse_lines(lines: List[str]) -> pd.DataFrame:
+    """Esegue il parsing di un gruppo di righe NDJSON (le righe non valide sono scartate)"""
+    rows = []
+    invalid = 0
+    
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            rows.append(_flatten_event(json.loads(line)))
+        except (ValueError, AttributeError):
+            invalid += 1
+    
+    if invalid:
+        logger.warning(f"⚠️ {invalid} righe NDJSON non valide ignorate")
+    return _typed_frame(rows)
+
+
+def parse_ga4_ndjson_lines(lines: List[str]) -> pd.DataFrame:
+    """
+    Converte un gruppo di righe NDJSON in un DataFrame con lo schema GA4
+    
+    Args:
+        lines: Righe NDJSON (un evento per riga)
+    
+    Returns:
+        DataFrame tipizzato con le dimensioni categoriche
+    """
+    return _categorize(_parse_lines(lines))
+
+
+def _parse_range(path: str, start: int, end: int, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Esegue il parsing di un intervallo di byte (eseguita nei worker)"""
+    # split('\n') e non splitlines(): U+2028 è ammesso nelle stringhe JSON
+    frames = [_project(_parse_lines(block.split('\n')), columns) for block in iter_range_blocks(path, start, end)]
+    frames = [frame for frame in frames if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else _project(_typed_frame([]), columns)
+
+
+def iter_ga4_ndjson(path: str, chunksize: int, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Legge un export NDJSON riga per riga, a chunk di chunksize eventi
+    
+    Args:
+        path: Percorso al file NDJSON (anche compresso)
+        chunksize: Numero di eventi per chunk
+        columns: Colonne da mantenere (None = tutte)
+    
+    Returns:
+        Iteratore di DataFrame con le colonne e i tipi dell'export CSV
+    """
+    with open_source(path, text=True) as f:
+        lines = []
+        for line in f:
+            lines.append(line)
+            if len(lines) >= chunksize:
+                yield _project(parse_ga4_ndjson_lines(lines), columns)
+                lines = []
+        if lines:
+            yield _project(parse_ga4_ndjson_lines(lines), columns)
+
+
+def read_ga4_ndjson(path: str, workers: Optional[int] = None, chunksize: Optional[int] = None,
+                    offset: int = 0, row_filter: Optional[Any] = None,
+                    columns: Optional[List[str]] = None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Legge un export GA4 NDJSON, in parallelo per intervalli di byte
+    
+    Args:
+        path: Percorso al file NDJSON (compresso: lettura sequenziale)
+        workers: Processi del pool (default: numero di CPU)
+        chunksize: Se indicato, lettura in streaming a chunk (sequenziale)
+        offset: Byte da cui iniziare (righe aggiunte dopo una lettura precedente)
+        row_filter: RowFilter applicato a ogni blocco prima della concatenazione
+        columns: Colonne da mantenere (proiezione già nei worker, None = tutte)
+    
+    Returns:
+        DataFrame, oppure iteratore di DataFrame se è indicato chunksize
+    """
+    if chunksize:
+        return iter_ga4_ndjson(path, chunksize, columns)
+    
+    workers = workers or os.cpu_count() or 1
+    
+    if detect_codec(path):
+        # Uno stream compresso non si divide: inflate in un thread, parsing a blocchi
+        ranges = [(0, os.path.getsize(path))]
+        frames = [_project(_parse_lines(block.split('\n')), columns) for block in iter_text_blocks(path)]
+        if row_filter is not None:
+            frames = [row_filter.apply(frame) for frame in frames]
+        frames = [frame for frame in frames if not frame.empty] or [_project(_typed_frame([]), columns)]
+    else:
+        ranges = split_byte_ranges(path, workers, offset)
+        if len(ranges) == 1:
+            frames = [_parse_range(path, *ranges[0], columns)]
+        else:
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                frames = list(pool.map(
+                    _parse_range, [path] * len(ranges),
+                    [start for start, _ in ranges], [end for _, end in ranges],
+                    [columns] * len(ranges)
+                ))
+        if row_filter is not None:
+            frames = [row_filter.apply(frame) for frame in frames]
+    
+    # Categoriche dopo la concatenazione: i dizionari dei worker sono diversi
+    data = _categorize(pd.concat(frames, ignore_index=True))
+    logger.info(f"  🧾 {len(data)} eventi NDJSON letti da {len(ranges)} intervalli")
+    
+    return data
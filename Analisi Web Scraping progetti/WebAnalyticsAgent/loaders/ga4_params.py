@@ -0,0 +1,169 @@
+"""
+GA4 Params - Estrazione su richiesta di event_params e user_properties
+"""
+
+import os
+import json
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Colonne JSON con record chiave/valore in formato BigQuery
+GA4_KEY_VALUE_COLUMNS = ['event_params', 'user_properties']
+
+VALUE_FIELDS = ['string_value', 'int_value', 'float_value', 'double_value']
+
+
+def _extract_keys(values: List[Any], column: str, keys: List[str]) -> Dict[str, List[Any]]:
+    """
+    Estrae le chiavi richieste da una lista di blob JSON (eseguita nei worker)
+    
+    Args:
+        values: Blob JSON della colonna (uno per evento)
+        column: Nome della colonna (chiave della lista nel blob)
+        keys: Chiavi dei parametri da estrarre
+    
+    Returns:
+        Dizionario chiave -> lista di valori grezzi (None se assente)
+    """
+    wanted = set(keys)
+    markers = [f'"{key}"' for key in keys]
+    extracted = {key: [None] * len(values) for key in keys}
+    
+    for i, blob in enumerate(values):
+        # Evita il parsing dei blob che non contengono nessuna chiave richiesta
+        if not isinstance(blob, str) or not any(marker in blob for marker in markers):
+            continue
+        
+        try:
+            records = json.loads(blob).get(column, [])
+        except (ValueError, AttributeError):
+            continue
+        
+        for record in records:
+            key = record.get('key')
+            if key not in wanted:
+                continue
+            value = record.get('value') or {}
+            for field in VALUE_FIELDS:
+                if value.get(field) is not None:
+                    extracted[key][i] = value[field]
+                    break
+    
+    return extracted
+
+
+def _to_typed_series(raw: List[Any], index: pd.Index) -> pd.Series:
+    """Converte i valori grezzi in una colonna tipizzata (Int64, float64 o stringa)"""
+    series = pd.Series(raw, index=index, dtype=object)
+    present = series.notna()
+    numeric = pd.to_numeric(series, errors='coerce')
+    
+    if present.any() and numeric[present].notna().all():
+        if (numeric[present] % 1 == 0).all():
+            return numeric.astype('Int64')
+        return numeric.astype('float64')
+    
+    return series.astype('string')
+
+
+class GA4ParamExtractor:
+    """Estrattore pigro e parallelo dei parametri GA4, con cache per chiave"""
+    
+    def __init__(self, data: pd.DataFrame, workers: Optional[int] = None,
+                 parallel_threshold: int = 50000):
+        """
+        Inizializza l'estrattore
+        
+        Args:
+            data: DataFrame GA4 con le colonne JSON
+            workers: Processi del pool (default: numero di CPU)
+            parallel_threshold: Righe minime per usare il pool di processi
+        """
+        self.data = data
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self._cache: Dict[Tuple[str, str], pd.Series] = {}
+    
+    def get(self, keys: List[str], column: str = 'event_params') -> pd.DataFrame:
+        """
+        Ritorna i parametri richiesti come colonne tipizzate
+        
+        Args:
+            keys: Chiavi dei parametri (es. engagement_time_msec, page_location)
+            column: Colonna JSON (event_params o user_properties)
+        
+        Returns:
+            DataFrame con una colonna per chiave, allineato ai dati
+        """
+        if column not in GA4_KEY_VALUE_COLUMNS:
+            raise ValueError(f"Colonna non supportata: {column}")
+        
+        missing = [key for key in keys if (column, key) not in self._cache]
+        if missing:
+            if column in self.data.columns:
+                extracted = self._extract(column, missing)
+            else:
+                extracted = {key: [None] * len(self.data) for key in missing}
+            for key in missing:
+                self._cache[(column, key)] = _to_typed_series(extracted[key], self.data.index)
+        
+        return pd.DataFrame({key: self._cache[(column, key)] for key in keys}, index=self.data.index)
+    
+    def cached_keys(self) -> List[Tuple[str, str]]:
+        """Chiavi già estratte"""
+        return list(self._cache.keys())
+    
+    def _extract(self, column: str, keys: List[str]) -> Dict[str, List[Any]]:
+        """Estrae le chiavi, in parallelo se i dati sono abbastanza grandi"""
+        values = self.data[column].tolist()
+        
+        if self.workers <= 1 or len(values) < self.parallel_threshold:
+            return _extract_keys(values, column, keys)
+        
+        size = -(-len(values) // self.workers)
+        parts = [values[i:i + size] for i in range(0, len(values), size)]
+        
+        extracted = {key: [] for key in keys}
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for part in pool.map(_extract_keys, parts, [column] * len(parts), [keys] * len(parts)):
+                for key in keys:
+                    extracted[key].extend(part[key])
+        
+        logger.debug(f"  … estratti {keys} da {column} con {len(parts)} processi")
+        return extracted
+
+
+@pd.api.extensions.register_dataframe_accessor('ga4')
+class GA4Accessor:
+    """Accessor data.ga4: un estrattore (e una cache) per DataFrame"""
+    
+    def __init__(self, data: pd.DataFrame):
+        self._data = data
+        self._extractor = GA4ParamExtractor(data)
+        self._line_items: Dict[Any, Any] = {}
+    
+    def params(self, keys: List[str]) -> pd.DataFrame:
+        """Parametri evento richiesti (es. data.ga4.params(['ga_session_id']))"""
+        return self._extractor.get(keys, 'event_params')
+    
+    def user_properties(self, keys: List[str]) -> pd.DataFrame:
+        """Proprietà utente richieste"""
+        return self._extractor.get(keys, 'user_properties')
+    
+    def line_items(self, event_names: Optional[List[str]] = None) -> Any:
+        """Righe prodotto della colonna items (LineItems), con cache per filtro eventi"""
+        from .ga4_items import build_line_items
+        
+        cache_key = tuple(event_names) if event_names is not None else None
+        if cache_key not in self._line_items:
+            self._line_items[cache_key] = build_line_items(self._data, event_names)
+        return self._line_items[cache_key]
+    
+    @property
+    def extractor(self) -> GA4ParamExtractor:
+        """Estrattore sottostante"""
+        return self._extractor
@@ -0,0 +1,103 @@
+"""
+GA4 Schema - Tipi compatti per gli export GA4 (formato BigQuery)
+"""
+
+import pandas as pd
+from typing import Dict, Any, Iterator, Union
+
+# Dimensioni a bassa cardinalità: categoriche (codici interi + dizionario)
+GA4_CATEGORICAL_COLUMNS = [
+    'event_date', 'event_name',
+    'ts_source', 'ts_medium', 'ts_campaign',
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'category', 'operating_system', 'operating_system_version',
+    'browser', 'browser_version', 'language',
+    'continent', 'sub_continent', 'country', 'region', 'city',
+    'screen_name', 'analytics_storage', 'ads_storage'
+]
+
+GA4_DTYPES: Dict[str, Any] = {
+    **{col: 'category' for col in GA4_CATEGORICAL_COLUMNS},
+    # Identificativi: stringhe (letti come float perderebbero precisione)
+    'user_pseudo_id': str,
+    'user_id': str,
+    'transaction_id': str,
+    # Timestamp in microsecondi interi
+    'user_first_touch_timestamp': 'Int64',
+    'event_previous_timestamp': 'Int64',
+    'event_server_timestamp_offset': 'Int64',
+    'event_bundle_sequence_id': 'Int64',
+    'ga_session_id': 'Int64',
+    'engagement_time_msec': 'Int64',
+    # Interi piccoli nullable
+    'ga_session_number': 'Int32',
+    'session_engaged': 'Int8',
+    'total_item_quantity': 'Int32',
+    # Importi
+    'purchase_revenue': 'float32',
+    'tax_value': 'float32',
+    'shipping_value': 'float32',
+    # Testo libero e JSON annidato
+    'page_location': str,
+    'page_referrer': str,
+    'page_title': str,
+    'event_params': str,
+    'user_properties': str,
+    'items': str
+}
+
+# Colonne testuali convertite in datetime UTC (int64 in memoria)
+GA4_TIMESTAMP_COLUMNS = ['event_time']
+
+# Ordine delle colonne dell'export CSV (estrazione05012026.csv)
+GA4_EXPORT_COLUMNS = [
+    'user_pseudo_id', 'user_id', 'user_first_touch_timestamp',
+    'event_date', 'event_time', 'event_name', 'event_bundle_sequence_id',
+    'event_previous_timestamp', 'event_server_timestamp_offset',
+    'ga_session_id', 'ga_session_number', 'engagement_time_msec', 'session_engaged',
+    'page_location', 'page_referrer', 'page_title', 'screen_name',
+    'ts_source', 'ts_medium', 'ts_campaign',
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'category', 'operating_system', 'operating_system_version',
+    'browser', 'browser_version', 'language',
+    'continent', 'sub_continent', 'country', 'region', 'city',
+    'transaction_id', 'purchase_revenue', 'total_item_quantity', 'tax_value', 'shipping_value',
+    'analytics_storage', 'ads_storage',
+    'event_params', 'user_properties', 'items'
+]
+
+
+def apply_ga4_types(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte le colonne timestamp testuali di un export GA4
+    
+    Args:
+        data: DataFrame letto con GA4_DTYPES
+    
+    Returns:
+        Lo stesso DataFrame con i timestamp tipizzati
+    """
+    for col in GA4_TIMESTAMP_COLUMNS:
+        if col in data.columns and not pd.api.types.is_datetime64_any_dtype(data[col]):
+            # Formato BigQuery: "2026-01-04 08:54:47.435710 UTC"
+            values = data[col].astype('string').str.replace(' UTC', '', regex=False)
+            data[col] = pd.to_datetime(values, format='ISO8601', utc=True, errors='coerce')
+    return data
+
+
+def read_ga4_csv(path, **kwargs) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Legge un export GA4 in CSV con lo schema tipizzato
+    
+    Args:
+        path: Percorso o buffer del CSV
+        **kwargs: Argomenti aggiuntivi per pd.read_csv (es. chunksize)
+    
+    Returns:
+        DataFrame, oppure iteratore di DataFrame se è indicato chunksize
+    """
+    reader = pd.read_csv(path, dtype=GA4_DTYPES, **kwargs)
+    
+    if kwargs.get('chunksize'):
+        return (apply_ga4_types(chunk) for chunk in reader)
+    return apply_ga4_types(reader)
@@ -0,0 +1,500 @@
+"""
+GA4 Sessions - Sessionizzazione vettoriale degli eventi degli export GA4
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chiave di sessione degli export GA4 (ga_session_id è univoco solo per utente)
+SESSION_KEY = ['user_pseudo_id', 'ga_session_id']
+
+# Colonne degli eventi lette dalla sessionizzazione (le assenti sono ignorate)
+SESSION_INPUT_COLUMNS = SESSION_KEY + [
+    'event_time', 'event_name', 'page_location', 'session_engaged', 'engagement_time_msec',
+    'utm_source', 'utm_medium', 'ts_source', 'ts_medium'
+]
+
+# Colonne aggiunte agli eventi, come quelle dei CSV di sessione e degli access log
+SESSION_COLUMNS = [
+    'session_id', 'sessions', 'session_duration', 'pageviews', 'bounced', 'session_converted',
+    'is_first_page', 'is_last_page', 'landing_page', 'source', 'medium'
+]
+
+PAGE_VIEW_EVENTS = ['page_view', 'screen_view']
+CONVERSION_EVENTS = ['purchase']
+
+# Sessione coinvolta per GA4: oltre 10 secondi di engagement, 2 pagine viste o una conversione
+ENGAGED_MSEC = 10000
+ENGAGED_PAGEVIEWS = 2
+
+# Sorgente della sessione: prima coppia presente (traffico dell'evento, poi primo contatto dell'utente)
+SOURCE_COLUMNS = [('utm_source', 'utm_medium'), ('ts_source', 'ts_medium')]
+
+# Colonne parziali con valori testuali: lette solo nelle righe scelte per ogni sessione
+VALUE_COLUMNS = ['entry_page', 'exit_page', 'source', 'medium']
+
+# Tempo assente (NaT) o evento senza il valore cercato
+NO_TIME = np.iinfo(np.int64).max
+# NaT come intero (e minimo per il massimo della fine sessione)
+NAT = np.iinfo(np.int64).min
+
+# Righe parziali accumulate prima di fonderle nella tabella (lettura a chunk)
+MERGE_ROWS = 1000000
+
+
+def needs_sessions(columns: List[str]) -> bool:
+    """Colonne di un flusso di eventi GA4 grezzo, senza colonne di sessione"""
+    return all(col in columns for col in SESSION_KEY + ['event_time']) and 'session_duration' not in columns
+
+
+def _pick(times: np.ndarray, ranks: np.ndarray, segment: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Riga di ogni sessione con il tempo minimo (a parità, rank minimo)
+    
+    Args:
+        times: Tempi nell'ordine per sessione (NO_TIME = nessun valore)
+        ranks: Spareggio univoco nella sessione (posizione nel flusso)
+        segment: Sessione di ogni riga
+        starts: Prima riga di ogni sessione
+    
+    Returns:
+        Indice della riga scelta per sessione, -1 se la sessione non ha valori
+    """
+    best = np.minimum.reduceat(times, starts)
+    candidate = times == best[segment]
+    best_rank = np.minimum.reduceat(np.where(candidate, ranks, NO_TIME), starts)
+    picked = np.flatnonzero(candidate & (ranks == best_rank[segment]) & (times != NO_TIME))
+    rows = np.full(len(starts), -1, dtype=np.int64)
+    rows[segment[picked]] = picked
+    return rows
+
+
+def _take(values: Any, rows: np.ndarray) -> np.ndarray:
+    """
+    values[rows] come array di oggetti, None dove rows è -1 o il valore manca
+    
+    Args:
+        values: Array numpy, categorico o di pandas (non convertito per intero)
+        rows: Indici da leggere
+    """
+    out = np.full(len(rows), None, dtype=object)
+    found = np.flatnonzero(rows >= 0)
+    if len(found):
+        out[found] = np.asarray(values.take(rows[found]), dtype=object)
+        out[pd.isna(out)] = None
+    return out
+
+
+def _coalesce(events: pd.DataFrame, columns: List[str], choice: np.ndarray) -> pd.Categorical:
+    """
+    Categorico con, per ogni riga, il valore della colonna columns[choice]
+    
+    Le colonne sono fattorizzate una volta (categoriche e stringhe di
+    pyarrow senza conversione a oggetti Python).
+    """
+    codes = np.full(len(events), -1, dtype=np.int64)
+    categories: List[Any] = []
+    for position, col in enumerate(columns):
+        if col not in events.columns:
+            continue
+        col_codes, uniques = pd.factorize(events[col])
+        chosen = (choice == position) & (col_codes >= 0)
+        codes[chosen] = col_codes[chosen] + len(categories)
+        categories.extend(np.asarray(uniques, dtype=object))
+    # Lo stesso valore in più colonne diventa una sola categoria
+    merged, unique = pd.factorize(np.asarray(categories, dtype=object))
+    codes = np.where(codes >= 0, merged[codes] if len(merged) else codes, -1)
+    return pd.Categorical.from_codes(codes, pd.Index(unique, dtype=object))
+
+
+def _reduce(columns: Dict[str, np.ndarray]) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Riduce righe parziali (eventi o sessioni parziali) a una riga per sessione
+    
+    Un solo ordinamento stabile per chiave di sessione, poi riduzioni
+    segmentate: a parità di tempo vale la posizione nel flusso, così la
+    tabella non dipende da come gli eventi sono divisi in chunk.
+    
+    Args:
+        columns: Array delle colonne parziali (vedi _event_partials)
+    
+    Returns:
+        Tupla (sessioni parziali in ordine di chiave, sessione di ogni riga
+        in ingresso o -1 per le righe senza chiave)
+    """
+    users, sessions = columns['user_pseudo_id'], columns['ga_session_id']
+    user_codes, user_values = pd.factorize(users)
+    session_codes, session_values = pd.factorize(sessions)
+    valid = (user_codes >= 0) & (session_codes >= 0)
+    keys = np.where(valid, user_codes.astype(np.int64) * max(len(session_values), 1) + session_codes, -1)
+    
+    # Ordinamento stabile come un solo sort di interi chiave * righe + posizione
+    # (sort vettoriale di numpy, molto più rapido di argsort stabile)
+    order = np.flatnonzero(valid)
+    keys = keys[order]
+    span = max(len(users), 1)
+    if len(keys) and (int(keys.max()) + 1) * span >= 2 ** 62:
+        keys = pd.factorize(keys)[0].astype(np.int64)
+    composite = np.sort(keys * span + order)
+    order, keys = composite % span, composite // span
+    
+    new_session = np.ones(len(order), dtype=bool)
+    if len(order) > 1:
+        new_session[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(new_session)
+    segment = np.cumsum(new_session) - 1
+    
+    row_session = np.full(len(users), -1, dtype=np.int64)
+    row_session[order] = segment
+    if not len(order):
+        return pd.DataFrame({name: values[:0] for name, values in columns.items()}), row_session
+    
+    gathered: Dict[int, np.ndarray] = {}
+    
+    def sorted_(name: str) -> np.ndarray:
+        # Le colonne di posizione degli eventi sono lo stesso array: riordinato una volta
+        values = columns[name]
+        if id(values) not in gathered:
+            gathered[id(values)] = values[order]
+        return gathered[id(values)]
+    
+    def picked(name: str, rows: np.ndarray) -> np.ndarray:
+        # Righe scelte (indici nell'ordine per sessione) lette dalla colonna originale
+        return _take(columns[name], np.where(rows >= 0, order[np.maximum(rows, 0)], -1))
+    
+    start, head_row = sorted_('start'), sorted_('head_row')
+    # La prima riga esiste anche se la sessione non ha tempi validi
+    head = _pick(np.where(start == NO_TIME, NO_TIME - 1, start), head_row, segment, starts)
+    entry = _pick(sorted_('entry_time'), sorted_('entry_row'), segment, starts)
+    # Ultima pagina vista: tempo massimo, a parità posizione massima
+    exit_time = sorted_('exit_time')
+    exit_ = _pick(np.where(exit_time == NO_TIME, NO_TIME, -exit_time), -sorted_('exit_row'), segment, starts)
+    source = _pick(sorted_('source_time'), sorted_('source_row'), segment, starts)
+    
+    first = order[starts]
+    reduced = pd.DataFrame({
+        'user_pseudo_id': np.asarray(user_values, dtype=object)[user_codes[first]],
+        'ga_session_id': np.asarray(session_values)[session_codes[first]],
+        'start': start[head],
+        'head_row': head_row[head],
+        'end': np.maximum.reduceat(sorted_('end'), starts),
+        'page_views': np.add.reduceat(sorted_('page_views'), starts),
+        'engagement_msec': np.add.reduceat(sorted_('engagement_msec'), starts),
+        'engaged': np.logical_or.reduceat(sorted_('engaged'), starts),
+        'converted': np.logical_or.reduceat(sorted_('converted'), starts),
+        'entry_time': np.where(entry >= 0, sorted_('entry_time')[entry], NO_TIME),
+        'entry_row': np.where(entry >= 0, sorted_('entry_row')[entry], NO_TIME),
+        'entry_page': picked('entry_page', entry),
+        'exit_time': np.where(exit_ >= 0, exit_time[exit_], NO_TIME),
+        'exit_row': np.where(exit_ >= 0, sorted_('exit_row')[exit_], NO_TIME),
+        'exit_page': picked('exit_page', exit_),
+        'source_time': np.where(source >= 0, sorted_('source_time')[source], NO_TIME),
+        'source_row': np.where(source >= 0, sorted_('source_row')[source], NO_TIME),
+        'source': picked('source', source),
+        'medium': picked('medium', source)
+    })
+    return reduced, row_session
+
+
+def _column(events: pd.DataFrame, col: str) -> Optional[pd.Series]:
+    return events[col] if col in events.columns else None
+
+
+def _event_partials(events: pd.DataFrame, offset: int) -> Dict[str, Any]:
+    """
+    Ogni evento come sessione parziale di una riga
+    
+    Args:
+        events: Eventi GA4
+        offset: Posizione nel flusso del primo evento
+    
+    Returns:
+        Array delle colonne parziali, allineati agli eventi (quelli di
+        VALUE_COLUMNS e user_pseudo_id restano array di pandas)
+    """
+    n = len(events)
+    rows = np.arange(offset, offset + n, dtype=np.int64)
+    
+    times = pd.to_datetime(events['event_time'], utc=True)
+    nanos = times.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    timed = times.notna().to_numpy()
+    nanos = np.where(timed, nanos, NO_TIME)
+    
+    names = _column(events, 'event_name')
+    page_view = names.isin(PAGE_VIEW_EVENTS).to_numpy() if names is not None else np.ones(n, dtype=bool)
+    converted = names.isin(CONVERSION_EVENTS).to_numpy() if names is not None else np.zeros(n, dtype=bool)
+    pages = _column(events, 'page_location')
+    if pages is None:
+        pages = pd.Series(None, index=events.index, dtype=object)
+    page_view = page_view & timed & pages.notna().to_numpy()
+    
+    engaged = _column(events, 'session_engaged')
+    msec = _column(events, 'engagement_time_msec')
+    
+    # Sorgente dell'evento: la prima coppia con la sorgente valorizzata
+    choice = np.full(n, -1, dtype=np.int64)
+    for position, (source_col, _) in enumerate(SOURCE_COLUMNS):
+        if source_col in events.columns:
+            choice[(choice < 0) & events[source_col].notna().to_numpy()] = position
+    sourced = timed & (choice >= 0)
+    
+    return {
+        'user_pseudo_id': events['user_pseudo_id'].array,
+        'ga_session_id': events['ga_session_id'].to_numpy(dtype='float64', na_value=np.nan),
+        'start': nanos,
+        'head_row': rows,
+        'end': np.where(timed, nanos, NAT),
+        'page_views': page_view.astype(np.int64),
+        'engagement_msec': (
+            pd.to_numeric(msec, errors='coerce').fillna(0).to_numpy(dtype='float64')
+            if msec is not None else np.zeros(n)
+        ),
+        'engaged': (engaged == 1).fillna(False).to_numpy(dtype=bool) if engaged is not None else np.zeros(n, dtype=bool),
+        'converted': converted,
+        'entry_time': np.where(page_view, nanos, NO_TIME),
+        'entry_row': rows,
+        'entry_page': pages.array,
+        'exit_time': np.where(page_view, nanos, NO_TIME),
+        'exit_row': rows,
+        'exit_page': pages.array,
+        'source_time': np.where(sourced, nanos, NO_TIME),
+        'source_row': rows,
+        'source': _coalesce(events, [source_col for source_col, _ in SOURCE_COLUMNS], choice),
+        'medium': _coalesce(events, [medium_col for _, medium_col in SOURCE_COLUMNS], choice)
+    }
+
+
+class SessionBuilder:
+    """
+    Tabella delle sessioni da un flusso di eventi GA4, anche letto a chunk
+    
+    Ogni chunk viene ridotto a sessioni parziali (inizio, fine, pagine
+    viste, prima e ultima pagina...) che si fondono tra loro con la stessa
+    riduzione: una sessione divisa tra due chunk è ricomposta esattamente.
+    Gli eventi sono numerati nell'ordine di lettura; la stessa numerazione
+    in SessionAttacher ritrova la prima riga, l'ingresso e l'uscita.
+    """
+    
+    def __init__(self):
+        """Inizializza il builder"""
+        self.rows = 0
+        self._merged: Optional[pd.DataFrame] = None
+        self._pending: List[pd.DataFrame] = []
+        self._pending_rows = 0
+    
+    def add(self, events: pd.DataFrame) -> np.ndarray:
+        """
+        Aggiunge un chunk di eventi
+        
+        Args:
+            events: Eventi (con le colonne di SESSION_KEY e event_time)
+        
+        Returns:
+            Sessione parziale di ogni evento nel chunk (-1 senza chiave)
+        """
+        partials, row_session = _reduce(_event_partials(events, self.rows))
+        self.rows += len(events)
+        self._pending.append(partials)
+        self._pending_rows += len(partials)
+        if self._pending_rows >= max(MERGE_ROWS, len(self._merged) if self._merged is not None else 0):
+            self._merge()
+        return row_session
+    
+    def _merge(self):
+        """Fonde le sessioni parziali accumulate nella tabella"""
+        frames = ([self._merged] if self._merged is not None else []) + self._pending
+        self._pending, self._pending_rows = [], 0
+        if len(frames) == 1:
+            self._merged = frames[0]
+            return
+        combined = pd.concat(frames, ignore_index=True)
+        self._merged, _ = _reduce({
+            col: combined[col].array if col in VALUE_COLUMNS + ['user_pseudo_id'] else combined[col].to_numpy()
+            for col in combined.columns
+        })
+    
+    def build(self) -> pd.DataFrame:
+        """
+        Tabella delle sessioni, una riga per sessione
+        
+        Returns:
+            DataFrame con session_id (numero di riga), chiave GA4, session_start,
+            session_end, session_duration (secondi), pageviews, engaged,
+            bounced, entry_page, exit_page, source, medium, converted e le
+            posizioni nel flusso della prima riga, dell'ingresso e dell'uscita
+        """
+        self._merge()
+        partials = self._merged if self._merged is not None else _reduce(_event_partials(
+            pd.DataFrame(columns=SESSION_KEY + ['event_time']), 0
+        ))[0]
+        
+        start = partials['start'].to_numpy()
+        end = partials['end'].to_numpy()
+        timed = start != NO_TIME
+        duration = np.where(timed, (end - np.where(timed, start, 0)) / 1e9, np.nan)
+        page_views = partials['page_views'].to_numpy()
+        engaged = (
+            partials['engaged'].to_numpy(dtype=bool)
+            | (partials['engagement_msec'].to_numpy() >= ENGAGED_MSEC)
+            | (page_views >= ENGAGED_PAGEVIEWS)
+            | partials['converted'].to_numpy(dtype=bool)
+        )
+        
+        return pd.DataFrame({
+            'session_id': np.arange(len(partials), dtype=np.int64),
+            'user_pseudo_id': partials['user_pseudo_id'].to_numpy(),
+            'ga_session_id': partials['ga_session_id'].to_numpy(),
+            'session_start': pd.to_datetime(np.where(timed, start, NAT).view('datetime64[ns]'), utc=True),
+            'session_end': pd.to_datetime(np.where(timed, end, NAT).view('datetime64[ns]'), utc=True),
+            'session_duration': duration,
+            'pageviews': page_views,
+            'engaged': engaged,
+            'bounced': (~engaged).astype(np.int8),
+            'entry_page': partials['entry_page'].to_numpy(),
+            'exit_page': partials['exit_page'].to_numpy(),
+            'source': partials['source'].to_numpy(),
+            'medium': partials['medium'].to_numpy(),
+            'converted': partials['converted'].to_numpy(dtype=bool),
+            'head_row': partials['head_row'].to_numpy(),
+            'entry_row': partials['entry_row'].to_numpy(),
+            'exit_row': partials['exit_row'].to_numpy()
+        })
+
+
+class SessionAttacher:
+    """
+    Aggiunge agli eventi le colonne della loro sessione (SESSION_COLUMNS)
+    
+    Le misure di sessione (sessions, session_duration, pageviews, bounced,
+    session_converted) stanno solo sulla prima riga della sessione e sono
+    NaN (sessions 0) sulle altre: somme e medie contano ogni sessione una
+    volta. session_id, landing_page, source e medium valgono per tutti gli
+    eventi; is_first_page e is_last_page segnano la prima e l'ultima pagina
+    vista. Gli eventi devono arrivare nello stesso ordine e con gli stessi
+    chunk letti da SessionBuilder.
+    """
+    
+    def __init__(self, sessions: pd.DataFrame):
+        """
+        Inizializza l'attacher
+        
+        Args:
+            sessions: Tabella di SessionBuilder.build()
+        """
+        self.sessions = sessions
+        self.rows = 0
+        self._index: Optional[Tuple[pd.Index, pd.Index, pd.Index]] = None
+        self._landings = pd.factorize(sessions['entry_page'])
+        self._sources = pd.factorize(sessions['source'])
+        self._mediums = pd.factorize(sessions['medium'])
+    
+    def _lookup(self, events: pd.DataFrame) -> np.ndarray:
+        """
+        Riga della tabella di ogni evento (-1 senza sessione)
+        
+        Utente e ga_session_id sono cercati tra i valori distinti del chunk,
+        poi la coppia come un solo intero: nessun confronto di stringhe per riga.
+        """
+        if self._index is None:
+            users = pd.Index(pd.unique(self.sessions['user_pseudo_id'].to_numpy(dtype=object)))
+            session_ids = pd.Index(pd.unique(self.sessions['ga_session_id'].to_numpy(dtype='float64')))
+            keys = (
+                users.get_indexer(self.sessions['user_pseudo_id'].to_numpy(dtype=object)).astype(np.int64)
+                * len(session_ids)
+                + session_ids.get_indexer(self.sessions['ga_session_id'].to_numpy(dtype='float64'))
+            )
+            self._index = (users, session_ids, pd.Index(keys))
+        users, session_ids, keys = self._index
+        
+        user_codes, user_values = pd.factorize(events['user_pseudo_id'])
+        session_codes, session_values = pd.factorize(
+            events['ga_session_id'].to_numpy(dtype='float64', na_value=np.nan)
+        )
+        user_rows = users.get_indexer(np.asarray(user_values, dtype=object))
+        session_rows = session_ids.get_indexer(session_values)
+        user_codes = np.where(user_codes >= 0, user_rows[user_codes] if len(user_rows) else -1, -1)
+        session_codes = np.where(session_codes >= 0, session_rows[session_codes] if len(session_rows) else -1, -1)
+        
+        found = (user_codes >= 0) & (session_codes >= 0)
+        rows = np.full(len(events), -1, dtype=np.int64)
+        rows[found] = keys.get_indexer(user_codes[found].astype(np.int64) * len(session_ids) + session_codes[found])
+        return rows
+    
+    def attach(self, events: pd.DataFrame, row_session: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Eventi con le colonne di sessione (nuovo DataFrame, gli eventi non sono modificati)
+        
+        Args:
+            events: Chunk di eventi
+            row_session: Riga della tabella di ogni evento, se già nota
+        
+        Returns:
+            Eventi con SESSION_COLUMNS
+        """
+        session = self._lookup(events) if row_session is None else row_session
+        rows = np.arange(self.rows, self.rows + len(events), dtype=np.int64)
+        self.rows += len(events)
+        
+        found = session >= 0
+        at = np.where(found, session, 0)
+        table = self.sessions
+        
+        def on_session(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+            return np.where(mask, values[at] if len(values) else np.nan, np.nan)
+        
+        head = found & (table['head_row'].to_numpy()[at] == rows) if len(table) else found
+        
+        def categories(factorized: Tuple[np.ndarray, Any]) -> pd.Categorical:
+            codes, uniques = factorized
+            values = np.where(found, codes[at] if len(codes) else -1, -1)
+            return pd.Categorical.from_codes(values, pd.Index(uniques, dtype=object))
+        
+        columns = {
+            'session_id': pd.array(np.where(found, session, 0), dtype='Int64'),
+            'sessions': head.astype(np.int8),
+            'session_duration': on_session(table['session_duration'].to_numpy(), head),
+            'pageviews': pd.array(on_session(table['pageviews'].to_numpy(dtype='float64'), head), dtype='Int64'),
+            'bounced': on_session(table['bounced'].to_numpy(dtype='float64'), head),
+            'session_converted': on_session(table['converted'].to_numpy(dtype='float64'), head),
+            'is_first_page': found & (table['entry_row'].to_numpy()[at] == rows) if len(table) else found,
+            'is_last_page': found & (table['exit_row'].to_numpy()[at] == rows) if len(table) else found,
+            'landing_page': categories(self._landings),
+            'source': categories(self._sources),
+            'medium': categories(self._mediums)
+        }
+        columns['session_id'][~found] = pd.NA
+        return events.assign(**{name: pd.Series(values, index=events.index) for name, values in columns.items()})
+
+
+def sessionize_events(events: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Sessionizza un flusso di eventi GA4 in memoria
+    
+    Args:
+        events: Eventi GA4 (export grezzo, già deduplicato)
+    
+    Returns:
+        Tupla (eventi con SESSION_COLUMNS, tabella delle sessioni)
+    """
+    builder = SessionBuilder()
+    row_session = builder.add(events)
+    sessions = builder.build()
+    # Un solo chunk: le sessioni parziali sono già la tabella, nello stesso ordine
+    return SessionAttacher(sessions).attach(events, row_session), sessions
+
+
+def session_summary(sessions: pd.DataFrame, events: int) -> Dict[str, Any]:
+    """Riepilogo della tabella delle sessioni (per il record della fonte)"""
+    total = len(sessions)
+    return {
+        'events': int(events),
+        'sessions': total,
+        'users': int(sessions['user_pseudo_id'].nunique()),
+        'engaged_sessions': int(sessions['engaged'].sum()),
+        'converted_sessions': int(sessions['converted'].sum()),
+        'events_per_session': float(events / total) if total > 0 else 0.0
+    }
@@ -0,0 +1,219 @@
+"""
+Incremental - Watermark delle fonti e stato persistente degli analizzatori
+"""
+
+import io
+import os
+import pickle
+import hashlib
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import logging
+
+from .columnar_cache import PARSER_VERSION
+from .compression import detect_codec
+
+logger = logging.getLogger(__name__)
+
+# Da incrementare quando cambia il formato degli stati parziali degli analizzatori
+STATE_VERSION = '4'
+
+# Byte finali confrontati per verificare che un file sia stato solo esteso
+TAIL_CHECK_BYTES = 64 * 1024
+
+
+def _tail_digest(path: str, size: int) -> str:
+    """Hash degli ultimi TAIL_CHECK_BYTES byte dei primi size byte del file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - TAIL_CHECK_BYTES))
+        digest.update(f.read(min(size, TAIL_CHECK_BYTES)))
+    return digest.hexdigest()
+
+
+def file_watermark(path: str) -> Dict[str, Any]:
+    """
+    Watermark di un file: dimensione, mtime e hash della parte finale
+    
+    Args:
+        path: Percorso al file
+    
+    Returns:
+        Dizionario con size, mtime_ns e tail
+    """
+    stat = os.stat(path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'tail': _tail_digest(path, stat.st_size)
+    }
+
+
+def appended_offset(watermark: Dict[str, Any], path: str) -> Optional[int]:
+    """
+    Offset da cui leggere le righe aggiunte dopo il watermark
+    
+    Args:
+        watermark: Watermark salvato alla lettura precedente
+        path: Percorso al file
+    
+    Returns:
+        Offset in byte (uguale alla dimensione se non ci sono dati nuovi),
+        None se il file è stato riscritto o è compresso
+    """
+    stat = os.stat(path)
+    if stat.st_size == watermark['size'] and stat.st_mtime_ns == watermark['mtime_ns']:
+        return watermark['size']
+    if stat.st_size < watermark['size'] or detect_codec(path):
+        return None
+    # Il file è stato solo esteso se i byte già letti sono invariati
+    if _tail_digest(path, watermark['size']) != watermark['tail']:
+        return None
+    return watermark['size']
+
+
+def partitions_changed(watermarks: Dict[str, Dict[str, Any]], paths: List[str]) -> bool:
+    """Indica se una partizione già letta è stata modificata o rimossa"""
+    current = set(paths)
+    for path, watermark in watermarks.items():
+        if path not in current:
+            return True
+        stat = os.stat(path)
+        if stat.st_size != watermark['size'] or stat.st_mtime_ns != watermark['mtime_ns']:
+            return True
+    return False
+
+
+def read_tail(path: str, source_type: str, offset: int, workers: Optional[int] = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Legge solo le righe aggiunte a un file dopo offset
+    
+    Args:
+        path: Percorso al file (non compresso)
+        source_type: Tipo della fonte (csv, ga4, log)
+        offset: Byte già letti alla lettura precedente
+        workers: Processi del pool per NDJSON e log
+        columns: Proiezione del planner (None = tutte le colonne)
+    
+    Returns:
+        DataFrame con le sole righe nuove
+    """
+    if source_type == 'log':
+        from .access_log import read_access_log
+        return read_access_log(path, workers=workers, offset=offset)
+    
+    from .ga4_ndjson import is_ndjson_path, read_ga4_ndjson
+    if source_type == 'ga4' and is_ndjson_path(path):
+        return read_ga4_ndjson(path, workers=workers, offset=offset, columns=columns)
+    
+    # CSV: intestazione + righe nuove (l'offset cade sempre a fine record)
+    with open(path, 'rb') as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        buffer = io.BytesIO(header + f.read())
+    
+    from .columns import column_selector
+    if source_type == 'ga4':
+        from .ga4_schema import read_ga4_csv
+        return read_ga4_csv(buffer, usecols=column_selector(columns))
+    return pd.read_csv(buffer, usecols=column_selector(columns))
+
+
+class IncrementalStore:
+    """Stato fondibile degli analizzatori e watermark per fonte, su disco"""
+    
+    def __init__(self, state_dir: str = './state'):
+        """
+        Inizializza lo store
+        
+        Args:
+            state_dir: Cartella dei file di stato
+        """
+        self.state_dir = state_dir
+    
+    def state_key(self, source_info: Dict[str, Any], modules: List[str],
+                  date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  filters: Optional[List[str]] = None) -> str:
+        """
+        Chiave dello stato: fonte, moduli attivi, intervallo di date, filtri e versioni
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            modules: Nomi degli analizzatori attivi
+            date_from: Primo giorno delle fonti partizionate
+            date_to: Ultimo giorno delle fonti partizionate
+            filters: Condizioni sulle righe (RowFilter.describe)
+        
+        Returns:
+            Chiave esadecimale
+        """
+        parts = [
+            source_info['type'], os.path.abspath(source_info['path']),
+            ','.join(sorted(modules)), str(date_from), str(date_to),
+            ';'.join(filters or []), PARSER_VERSION, STATE_VERSION
+        ]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+    
+    def _state_path(self, key: str) -> str:
+        return os.path.join(self.state_dir, f"{key}.pkl")
+    
+    def bloom_path(self, key: str) -> str:
+        """File del filtro di Bloom degli eventi già analizzati per una fonte"""
+        return os.path.join(self.state_dir, f"{key}.bloom")
+    
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Carica lo stato salvato
+        
+        Args:
+            key: Chiave da state_key
+        
+        Returns:
+            Record con watermark e stati, None se assente o illeggibile
+        """
+        path = self._state_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logger.warning(f"⚠️  Stato incrementale non leggibile {path}: {e}")
+            return None
+    
+    def save(self, key: str, watermark: Dict[str, Any], states: Dict[str, Any], rows: int) -> bool:
+        """
+        Salva watermark e stati (scrittura atomica)
+        
+        Args:
+            key: Chiave da state_key
+            watermark: Partizioni lette o watermark del file
+            states: Stati parziali fusi degli analizzatori
+            rows: Righe totali incluse negli stati
+        
+        Returns:
+            True se salvato con successo
+        """
+        target = self._state_path(key)
+        tmp_target = f"{target}.tmp"
+        record = {
+            'watermark': watermark,
+            'states': states,
+            'rows': rows,
+            'updated_at': datetime.now().isoformat()
+        }
+        
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            with open(tmp_target, 'wb') as f:
+                pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_target, target)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning(f"⚠️  Impossibile salvare lo stato incrementale: {e}")
+            if os.path.exists(tmp_target):
+                os.remove(tmp_target)
+            return False
+        
+        return True
@@ -0,0 +1,202 @@
+"""
+Memory Budget - Stima della memoria delle fonti e scelta dell'esecuzione a chunk
+"""
+
+import io
+import os
+import csv
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from .compression import detect_codec, open_source, uncompressed_size
+from .ga4_ndjson import is_ndjson_path, parse_ga4_ndjson_lines
+from .ga4_schema import read_ga4_csv
+
+logger = logging.getLogger(__name__)
+
+# Righe lette per stimare la memoria occupata da una riga
+SAMPLE_ROWS = 5000
+
+# Quota del budget per un chunk: il resto va a stati, copie e temporanei degli analizzatori
+CHUNK_BUDGET_FRACTION = 0.2
+MIN_CHUNK_ROWS = 1000
+
+# Quota della memoria disponibile usabile se inferiore al budget configurato
+AVAILABLE_MEMORY_FRACTION = 0.5
+
+MB = 1024 * 1024
+
+
+def available_memory() -> Optional[int]:
+    """
+    Memoria fisica disponibile in byte
+    
+    Returns:
+        MemAvailable (Linux) o pagine libere, None se non rilevabile
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _sample_csv(path: str, rows: int) -> Tuple[bytes, bool]:
+    """
+    Primi record di un CSV (intestazione inclusa), rispettando i campi quotati su più righe
+    
+    Returns:
+        Tupla (byte dei record letti, True se il file è stato letto tutto)
+    """
+    consumed = []
+    
+    with open_source(path) as f:
+        def lines():
+            for line in f:
+                consumed.append(line)
+                yield line.decode('utf-8', errors='replace')
+        
+        # Intestazione + rows record
+        records = 0
+        for records, _ in enumerate(csv.reader(lines()), start=1):
+            if records > rows:
+                break
+        exhausted = records <= rows or not f.read(1)
+    
+    return b''.join(consumed), exhausted
+
+
+def _sample_ndjson(path: str, rows: int) -> Tuple[bytes, bool]:
+    """Prime righe di un NDJSON (vedi _sample_csv)"""
+    consumed = []
+    
+    with open_source(path) as f:
+        for line in f:
+            consumed.append(line)
+            if len(consumed) >= rows:
+                break
+        exhausted = len(consumed) < rows or not f.read(1)
+    
+    return b''.join(consumed), exhausted
+
+
+def sample_source(path: str, source_type: str, rows: int = SAMPLE_ROWS) -> Tuple[pd.DataFrame, int, bool]:
+    """
+    Legge un campione della fonte con lo stesso parser del caricamento completo
+    
+    Args:
+        path: Percorso al file (anche compresso)
+        source_type: Tipo della fonte (csv, ga4)
+        rows: Righe del campione
+    
+    Returns:
+        Tupla (DataFrame del campione, byte decompressi letti, file letto tutto)
+    """
+    if source_type == 'ga4' and is_ndjson_path(path):
+        raw, exhausted = _sample_ndjson(path, rows)
+        return parse_ga4_ndjson_lines(raw.decode('utf-8', errors='replace').split('\n')), len(raw), exhausted
+    
+    raw, exhausted = _sample_csv(path, rows)
+    if source_type == 'ga4':
+        return read_ga4_csv(io.BytesIO(raw)), len(raw), exhausted
+    return pd.read_csv(io.BytesIO(raw)), len(raw), exhausted
+
+
+class MemoryGovernor:
+    """Decide se una fonte entra nel budget di memoria o va letta a chunk"""
+    
+    def __init__(self, budget_mb: float, default_chunk_size: int = 100000):
+        """
+        Inizializza il governor
+        
+        Args:
+            budget_mb: Memoria massima per una fonte caricata per intero
+            default_chunk_size: Righe per chunk se la stima non è disponibile
+        """
+        available = available_memory()
+        self.budget = int(budget_mb * MB)
+        if available is not None:
+            self.budget = min(self.budget, int(available * AVAILABLE_MEMORY_FRACTION))
+        self.default_chunk_size = default_chunk_size
+    
+    def estimate(self, source_info: Dict[str, Any], paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Stima la memoria della fonte caricata per intero da un campione
+        
+        La memoria per byte del campione (memory_usage deep) è proiettata
+        sulla dimensione decompressa di tutti i file da leggere.
+        
+        Args:
+            source_info: Informazioni sulla fonte (type, path)
+            paths: File delle partizioni (None = file singolo)
+        
+        Returns:
+            Dizionario con rows, bytes, memory_bytes e memory_per_row
+        """
+        paths = paths if paths is not None else [source_info['path']]
+        sizes = [uncompressed_size(path) for path in paths]
+        total_bytes = sum(sizes)
+        if not paths or not total_bytes:
+            return {'rows': 0, 'bytes': 0, 'memory_bytes': 0, 'memory_per_row': 0.0}
+        
+        # Il file più grande è il più rappresentativo
+        largest = max(range(len(paths)), key=lambda i: sizes[i])
+        sample, sample_bytes, exhausted = sample_source(paths[largest], source_info['type'])
+        
+        if source_info.get('columns') is not None:
+            # Solo le colonne della proiezione del planner vengono caricate
+            sample = sample[[col for col in sample.columns if col in set(source_info['columns'])]]
+        sample_memory = int(sample.memory_usage(deep=True).sum())
+        memory_per_row = sample_memory / len(sample) if len(sample) else 0.0
+        if exhausted and len(paths) == 1:
+            rows, memory = len(sample), sample_memory
+        else:
+            scale = total_bytes / max(sample_bytes, 1)
+            rows, memory = int(len(sample) * scale), int(sample_memory * scale)
+        
+        return {
+            'rows': rows,
+            'bytes': total_bytes,
+            'memory_bytes': memory,
+            'memory_per_row': memory_per_row
+        }
+    
+    def chunk_size(self, memory_per_row: float) -> int:
+        """Righe per chunk che occupano CHUNK_BUDGET_FRACTION del budget"""
+        if memory_per_row <= 0:
+            return self.default_chunk_size
+        rows = int(self.budget * CHUNK_BUDGET_FRACTION / memory_per_row)
+        return max(MIN_CHUNK_ROWS, rows // 1000 * 1000)
+    
+    def plan(self, source_info: Dict[str, Any], paths: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Sceglie l'esecuzione di una fonte
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            paths: File delle partizioni (None = file singolo)
+        
+        Returns:
+            Piano con mode (in_memory/chunked), chunk_size e stima in MB
+        """
+        estimate = self.estimate(source_info, paths)
+        chunked = estimate['memory_bytes'] > self.budget
+        
+        return {
+            'mode': 'chunked' if chunked else 'in_memory',
+            'chunk_size': self.chunk_size(estimate['memory_per_row']) if chunked else None,
+            'estimated_rows': estimate['rows'],
+            'estimated_mb': round(estimate['memory_bytes'] / MB, 1),
+            'budget_mb': round(self.budget / MB, 1)
+        }
+    
+    def exceeds_budget(self, path: str) -> bool:
+        """Indica se un file non leggibile a chunk supera il budget già su disco"""
+        return uncompressed_size(path, detect_codec(path)) > self.budget
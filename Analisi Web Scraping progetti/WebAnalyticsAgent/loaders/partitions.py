@@ -0,0 +1,170 @@
+"""
+Partitions - Fonti partizionate per data (cartelle o glob di file giornalieri)
+"""
+
+import os
+import re
+import glob
+import pandas as pd
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional, Union
+import logging
+
+from .compression import strip_codec_suffix
+
+logger = logging.getLogger(__name__)
+
+GLOB_CHARS = '*?['
+
+# Partizioni in stile Hive: dt=2026-01-05, date=20260105
+HIVE_DATE_PATTERN = re.compile(r'(?:^|[^a-z])(?:dt|date|event_date)=(\d{4}-?\d{2}-?\d{2})', re.IGNORECASE)
+ISO_DATE_PATTERN = re.compile(r'(?<!\d)(\d{4})-(\d{2})-(\d{2})(?!\d)')
+COMPACT_DATE_PATTERN = re.compile(r'(?<!\d)(\d{8})(?!\d)')
+
+# Estensioni dei file di dati nelle cartelle (dopo quella del codec: eventi.ndjson.gz)
+DATA_EXTENSIONS = ('.csv', '.ndjson', '.jsonl', '.json', '.log')
+# Log ruotati: access.log.1, access.log.2.gz
+ROTATED_LOG_PATTERN = re.compile(r'\.log\.\d+$')
+
+
+def is_partitioned(path: str) -> bool:
+    """Indica se il percorso è una cartella o un glob (una fonte con più file)"""
+    return os.path.isdir(path) or any(char in str(path) for char in GLOB_CHARS)
+
+
+def _compact_date(digits: str) -> Optional[date]:
+    """
+    Interpreta 8 cifre come AAAAMMGG (export BigQuery) o GGMMAAAA
+    (estrazioni manuali, es. estrazione05012026.csv)
+    """
+    for fmt in ('%Y%m%d', '%d%m%Y'):
+        try:
+            parsed = datetime.strptime(digits, fmt).date()
+        except ValueError:
+            continue
+        if 1990 <= parsed.year <= 2100:
+            return parsed
+    return None
+
+
+def partition_date(path: str) -> Optional[date]:
+    """
+    Ricava la data di una partizione dal percorso
+    
+    Args:
+        path: Percorso del file (nome file o cartelle in stile Hive)
+    
+    Returns:
+        Data della partizione oppure None se il percorso non contiene date
+    """
+    hive = HIVE_DATE_PATTERN.search(path)
+    if hive:
+        return _compact_date(hive.group(1).replace('-', ''))
+    
+    name = os.path.basename(path)
+    for text in (name, path):
+        iso = ISO_DATE_PATTERN.search(text)
+        if iso:
+            try:
+                return date(*(int(part) for part in iso.groups()))
+            except ValueError:
+                pass
+        for digits in COMPACT_DATE_PATTERN.findall(text):
+            parsed = _compact_date(digits)
+            if parsed is not None:
+                return parsed
+    return None
+
+
+def is_data_file(path: str) -> bool:
+    """Indica se il nome del file ha un'estensione di dati supportata (codec esclusi)"""
+    name = strip_codec_suffix(os.path.basename(path)).lower()
+    return name.endswith(DATA_EXTENSIONS) or ROTATED_LOG_PATTERN.search(name) is not None
+
+
+def list_partitions(location: str) -> List[Dict[str, Any]]:
+    """
+    Elenca i file di una fonte partizionata
+    
+    Nelle cartelle sono partizioni solo i file con un'estensione di dati
+    (DATA_EXTENSIONS, anche compressi): checksum .crc, marker _SUCCESS,
+    .DS_Store o README vengono ignorati. Un glob sceglie già i suoi file.
+    
+    Args:
+        location: Cartella (ricorsiva) o glob (es. data/ga4/events_*.ndjson.gz)
+    
+    Returns:
+        Lista di {'path', 'date'} ordinata per data e percorso
+    """
+    if os.path.isdir(location):
+        paths, skipped = [], []
+        for root, dirs, files in os.walk(location):
+            # File nascosti o marker (_SUCCESS) non sono partizioni
+            dirs[:] = sorted(d for d in dirs if not d.startswith(('.', '_')))
+            for name in files:
+                if name.startswith(('.', '_')):
+                    continue
+                (paths if is_data_file(name) else skipped).append(os.path.join(root, name))
+        if skipped:
+            logger.info(f"  ⏭️  {len(skipped)} file non di dati ignorati in {location} (es. {os.path.basename(skipped[0])})")
+    else:
+        paths = [path for path in glob.glob(location, recursive=True) if os.path.isfile(path)]
+    
+    partitions = [{'path': path, 'date': partition_date(path)} for path in paths]
+    return sorted(partitions, key=lambda p: (p['date'] or date.min, p['path']))
+
+
+def _as_date(value: Union[str, date, None]) -> Optional[date]:
+    """Converte un estremo dell'intervallo (AAAA-MM-GG) in date"""
+    if value is None or isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def prune_partitions(partitions: List[Dict[str, Any]], date_from: Union[str, date, None] = None,
+                     date_to: Union[str, date, None] = None) -> List[Dict[str, Any]]:
+    """
+    Seleziona le partizioni nell'intervallo [date_from, date_to]
+    
+    Args:
+        partitions: Partizioni da list_partitions
+        date_from: Primo giorno incluso (None = nessun limite)
+        date_to: Ultimo giorno incluso (None = nessun limite)
+    
+    Returns:
+        Partizioni da leggere (gli altri file non vengono aperti)
+    """
+    start, end = _as_date(date_from), _as_date(date_to)
+    if start is None and end is None:
+        return partitions
+    
+    undated = [p for p in partitions if p['date'] is None]
+    if undated:
+        logger.warning(f"⚠️  {len(undated)} file senza data esclusi dal filtro per date")
+    
+    return [
+        p for p in partitions
+        if p['date'] is not None
+        and (start is None or p['date'] >= start)
+        and (end is None or p['date'] <= end)
+    ]
+
+
+def concat_partitions(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena i DataFrame delle partizioni mantenendo le colonne categoriche
+    
+    Categoriche con dizionari diversi diventerebbero object con pd.concat.
+    """
+    frames = [frame for frame in frames if not frame.empty] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    
+    categorical = [
+        col for col in frames[0].columns
+        if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames if col in frame.columns)
+    ]
+    data = pd.concat(frames, ignore_index=True)
+    for col in categorical:
+        data[col] = data[col].astype('category')
+    return data
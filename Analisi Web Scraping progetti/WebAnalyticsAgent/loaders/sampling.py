@@ -0,0 +1,269 @@
+"""
+Sampling - Campionamento delle fonti durante la lettura per anteprime veloci
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Union
+import logging
+
+from .partitions import concat_partitions
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_MODES = ('reservoir', 'users')
+
+# Righe del campione uniforme e quota di utenti tenuti se non indicate
+DEFAULT_RESERVOIR_ROWS = 100000
+DEFAULT_USER_RATE = 0.1
+
+# Identificativo dell'utente per il campionamento per utenti (la prima presente)
+USER_KEY_COLUMNS = ['user_pseudo_id', 'user_id', 'ip']
+
+# Gli hash a 64 bit sono confrontati con rate * 2^64
+HASH_SPACE = 2 ** 64
+
+
+def parse_sample(spec: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Interpreta la modalità di campionamento
+    
+    Args:
+        spec: 'reservoir[:righe]', 'users[:quota]' oppure dizionario con
+            mode e size (reservoir) o rate (users)
+    
+    Returns:
+        Dizionario con mode e size o rate
+    """
+    if isinstance(spec, dict):
+        mode, value = spec.get('mode'), spec.get('size', spec.get('rate'))
+    else:
+        mode, _, value = str(spec).partition(':')
+        mode, value = mode.strip(), value.strip() or None
+    
+    if mode not in SAMPLE_MODES:
+        raise ValueError(f"Campionamento non valido: {spec!r} (atteso reservoir[:righe] o users[:quota])")
+    
+    try:
+        if mode == 'reservoir':
+            size = int(value) if value is not None else DEFAULT_RESERVOIR_ROWS
+            if size <= 0:
+                raise ValueError
+            return {'mode': mode, 'size': size}
+        rate = float(value) if value is not None else DEFAULT_USER_RATE
+        if not 0 < rate <= 1:
+            raise ValueError
+        return {'mode': mode, 'rate': rate}
+    except (TypeError, ValueError):
+        limits = 'un intero positivo' if mode == 'reservoir' else 'una quota in (0, 1]'
+        raise ValueError(f"Campionamento non valido: {spec!r} (il valore deve essere {limits})")
+
+
+def make_sampler(spec: Dict[str, Any], seed: Optional[int] = None) -> Any:
+    """
+    Crea il campionatore per una modalità interpretata da parse_sample
+    
+    Args:
+        spec: Modalità di campionamento
+        seed: Seme del generatore (reservoir) o sale dell'hash (users)
+    
+    Returns:
+        ReservoirSampler o UserSampler
+    """
+    if spec['mode'] == 'reservoir':
+        return ReservoirSampler(spec['size'], seed)
+    return UserSampler(spec['rate'], seed)
+
+
+class ReservoirSampler:
+    """Campione uniforme di dimensione fissa su un flusso di chunk (algoritmo R vettoriale)"""
+    
+    def __init__(self, size: int, seed: Optional[int] = None):
+        """
+        Inizializza il campionatore
+        
+        Args:
+            size: Righe del campione
+            seed: Seme del generatore (campioni riproducibili)
+        """
+        self.size = size
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.reservoir: Optional[pd.DataFrame] = None
+        self.rows_seen = 0
+    
+    def add(self, chunk: pd.DataFrame):
+        """
+        Aggiunge un chunk al flusso campionato
+        
+        La riga i-esima del flusso entra nel campione con probabilità size / (i + 1)
+        al posto di una riga scelta a caso: ogni riga ha la stessa probabilità
+        di restare nel campione finale.
+        
+        Args:
+            chunk: Chunk di righe
+        """
+        if chunk.empty:
+            return
+        
+        start = self.rows_seen
+        self.rows_seen += len(chunk)
+        
+        # Finché il campione non è pieno le righe entrano tutte
+        free = max(0, self.size - start)
+        if free:
+            head = chunk.iloc[:free]
+            self.reservoir = head if self.reservoir is None else concat_partitions([self.reservoir, head])
+        if free >= len(chunk):
+            return
+        
+        positions = np.arange(start + free, start + len(chunk))
+        slots = self.rng.integers(0, positions + 1)
+        accepted = np.flatnonzero(slots < self.size)
+        if not accepted.size:
+            return
+        
+        # Più sostituzioni dello stesso posto nel chunk: vale l'ultima
+        replaced, last = np.unique(slots[accepted][::-1], return_index=True)
+        rows = chunk.iloc[free + accepted[::-1][last]]
+        
+        combined = concat_partitions([self.reservoir, rows])
+        take = np.arange(self.size)
+        take[replaced] = self.size + np.arange(len(replaced))
+        self.reservoir = combined.iloc[take].reset_index(drop=True)
+    
+    def sample(self) -> pd.DataFrame:
+        """Campione corrente (vuoto se non è stata letta alcuna riga)"""
+        return self.reservoir.reset_index(drop=True) if self.reservoir is not None else pd.DataFrame()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Descrizione del campione per le stime
+        
+        Returns:
+            Dizionario con mode, righe della popolazione e del campione,
+            unità indipendenti (righe), frazione campionata e fattore di scala
+        """
+        rows = len(self.reservoir) if self.reservoir is not None else 0
+        fraction = rows / self.rows_seen if self.rows_seen else 1.0
+        return {
+            'mode': 'reservoir',
+            'size': self.size,
+            'seed': self.seed,
+            'population_rows': self.rows_seen,
+            'sample_rows': rows,
+            'units': rows,
+            'cluster_size': 1.0,
+            'fraction': fraction,
+            'scale': 1 / fraction if fraction else 1.0
+        }
+
+
+class UserSampler:
+    """
+    Campione per utenti: tiene tutte le righe degli utenti il cui hash cade sotto la quota
+    
+    Le righe senza utente sono campionate a parte, una per una, alla stessa
+    quota (hash della posizione nel flusso): ogni riga ha la stessa
+    probabilità di entrare nel campione e il fattore di scala resta 1 / quota.
+    """
+    
+    def __init__(self, rate: float, seed: Optional[int] = None, key: Optional[List[str]] = None):
+        """
+        Inizializza il campionatore
+        
+        Args:
+            rate: Quota di utenti da tenere
+            seed: Sale dell'hash (None = 0): stessi utenti a ogni esecuzione
+            key: Colonne candidate per l'utente (default: USER_KEY_COLUMNS)
+        """
+        self.rate = rate
+        self.seed = seed
+        self.key = key or USER_KEY_COLUMNS
+        self.frames: List[pd.DataFrame] = []
+        self.rows_seen = 0
+        self.keyless_seen = 0
+        self.keyless_rows = 0
+        self.key_column: Optional[str] = None
+    
+    def _below_rate(self, hashes: np.ndarray) -> np.ndarray:
+        """Hash a 64 bit che cadono sotto la quota"""
+        return hashes < np.uint64(int(self.rate * HASH_SPACE))
+    
+    def _mask(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Maschera delle righe degli utenti campionati e delle righe senza utente campionate"""
+        col = next((col for col in self.key if col in chunk.columns), None)
+        if col is None:
+            raise ValueError(f"Campionamento per utenti: nessuna colonna utente ({', '.join(self.key)})")
+        self.key_column = col
+        
+        # Hash del valore (stringa): lo stesso utente ha lo stesso hash in ogni chunk e partizione
+        values = chunk[col].astype('string')
+        known = values.notna().to_numpy()
+        keyless = ~known
+        self.keyless_seen += int(keyless.sum())
+        if self.rate >= 1:
+            self.keyless_rows += int(keyless.sum())
+            return np.ones(len(chunk), dtype=bool)
+        
+        hashes = pd.util.hash_pandas_object(values, index=False, hash_key=f"{self.seed or 0:016d}"[-16:])
+        mask = self._below_rate(hashes.to_numpy(dtype=np.uint64)) & known
+        if keyless.any():
+            # Posizione della riga nel flusso, con il seme: campione riproducibile
+            positions = np.arange(self.rows_seen, self.rows_seen + len(chunk), dtype=np.uint64)[keyless]
+            salt = np.uint64((self.seed or 0) * 0x9E3779B97F4A7C15 % HASH_SPACE)
+            kept = self._below_rate(pd.util.hash_array(positions ^ salt))
+            mask[np.flatnonzero(keyless)[kept]] = True
+            self.keyless_rows += int(kept.sum())
+        return mask
+    
+    def add(self, chunk: pd.DataFrame):
+        """
+        Aggiunge un chunk: restano le righe degli utenti campionati
+        
+        Args:
+            chunk: Chunk di righe
+        """
+        if chunk.empty:
+            return
+        
+        mask = self._mask(chunk)
+        self.rows_seen += len(chunk)
+        if mask.any():
+            self.frames.append(chunk[mask] if not mask.all() else chunk)
+    
+    def sample(self) -> pd.DataFrame:
+        """Righe degli utenti campionati"""
+        if not self.frames:
+            return pd.DataFrame()
+        return concat_partitions(self.frames).reset_index(drop=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Descrizione del campione per le stime
+        
+        Returns:
+            Dizionario con mode, righe della popolazione e del campione,
+            unità indipendenti (utenti, più le righe senza utente),
+            righe per unità pesate per le righe (cluster_size), righe senza
+            utente nella popolazione e nel campione, frazione campionata e
+            fattore di scala
+        """
+        rows = sum(len(frame) for frame in self.frames)
+        per_user = self.sample()[self.key_column].value_counts() if self.frames else pd.Series(dtype='int64')
+        # Ogni riga senza utente è un'unità a sé (grappolo di una riga)
+        squares = float((per_user ** 2).sum()) + self.keyless_rows
+        return {
+            'mode': 'users',
+            'rate': self.rate,
+            'seed': self.seed,
+            'key_column': self.key_column,
+            'population_rows': self.rows_seen,
+            'sample_rows': rows,
+            'keyless_population_rows': self.keyless_seen,
+            'keyless_sample_rows': self.keyless_rows,
+            'units': len(per_user) + self.keyless_rows,
+            'cluster_size': squares / rows if rows else 1.0,
+            'fraction': self.rate,
+            'scale': 1 / self.rate
+        }
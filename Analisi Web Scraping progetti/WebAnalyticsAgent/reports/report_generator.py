@@ -44,6 +44,40 @@ class ReportGenerator:
         else:
             return self._generate_text(source_name, analysis_data, config)
     
+    def _kpi(self, results: Dict, key: str, template: str = '{:.0f}') -> str:
+        """
+        Valore di un KPI con l'intervallo di confidenza, se stimato da un campione
+        
+        Args:
+            results: Risultati di un analizzatore
+            key: Chiave del KPI
+            template: Formato del valore (es. '{:.2f}%')
+        
+        Returns:
+            Testo del KPI, es. '9.86% (IC 95%: 8.12%–11.60%)'
+        """
+        text = template.format(results.get(key, 0))
+        interval = results.get('confidence_intervals', {}).get(key)
+        if interval:
+            text += (f" (IC {interval['level']:.0%}: "
+                     f"{template.format(interval['low'])}–{template.format(interval['high'])})")
+        return text
+    
+    def _sample_note(self, analysis_data: Dict) -> str:
+        """Nota sulle stime da campione (vuota per le analisi complete)"""
+        sample = analysis_data.get('sample')
+        if not sample:
+            return ''
+        note = (f"Stime da campione {sample['mode']}: {sample['sample_rows']} righe su "
+                f"{sample['population_rows']}, conteggi riportati alla popolazione (x{sample['scale']:.1f})")
+        if sample.get('not_extrapolated'):
+            note += (f"; {', '.join(sample['not_extrapolated'])} sono i valori distinti del campione, "
+                     f"non riportati alla popolazione e senza intervallo")
+        elif sample.get('keyless_population_rows'):
+            note += (f"; le {sample['keyless_population_rows']} righe senza utente sono campionate "
+                     f"a parte, una per una, alla stessa quota ({sample['keyless_sample_rows']} nel campione)")
+        return note
+    
     def _generate_html(self, source_name: str, analysis_data: Dict, config: Dict) -> str:
         """Genera report HTML"""
         output_dir = config.get('output_dir', './reports')
@@ -90,12 +124,16 @@ class ReportGenerator:
         conversions = analysis.get('conversions', {})
         engagement = analysis.get('engagement', {})
         
+        sample_note = self._sample_note(analysis_data)
+        if sample_note:
+            html_content += f"        <p><em>⚠️ {sample_note}</em></p>\n"
+        
         metrics = [
-            ('Total Sessions', traffic.get('total_sessions', 0)),
-            ('Unique Visitors', users.get('total_users', 0)),
-            ('Conversion Rate', f"{conversions.get('conversion_rate', 0):.2f}%"),
-            ('Avg Session Duration', f"{engagement.get('avg_time_on_site', 0):.0f}s"),
-            ('Bounce Rate', f"{traffic.get('bounce_rate', 0):.2f}%"),
+            ('Total Sessions', self._kpi(traffic, 'total_sessions')),
+            ('Unique Visitors', self._kpi(users, 'total_users')),
+            ('Conversion Rate', self._kpi(conversions, 'conversion_rate', '{:.2f}%')),
+            ('Avg Session Duration', self._kpi(engagement, 'avg_time_on_site', '{:.0f}s')),
+            ('Bounce Rate', self._kpi(traffic, 'bounce_rate', '{:.2f}%')),
             ('Pages per Session', f"{traffic.get('pages_per_session', 0):.1f}"),
         ]
         
@@ -153,21 +191,22 @@ class ReportGenerator:
         users = analysis.get('users', {})
         conversions = analysis.get('conversions', {})
         engagement = analysis.get('engagement', {})
+        sample_note = self._sample_note(analysis_data)
         
         md_content = f"""# 📊 Web Analytics Report
 
 **Source:** {source_name}  
 **Generated:** {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
-
+{chr(10) + '> ⚠️ ' + sample_note + chr(10) if sample_note else ''}
 ## 📈 Key Metrics
 
 | Metric | Value |
 |--------|-------|
-| Total Sessions | {traffic.get('total_sessions', 0)} |
-| Unique Visitors | {users.get('total_users', 0)} |
-| Conversion Rate | {conversions.get('conversion_rate', 0):.2f}% |
-| Avg Session Duration | {engagement.get('avg_time_on_site', 0):.0f}s |
-| Bounce Rate | {traffic.get('bounce_rate', 0):.2f}% |
+| Total Sessions | {self._kpi(traffic, 'total_sessions')} |
+| Unique Visitors | {self._kpi(users, 'total_users')} |
+| Conversion Rate | {self._kpi(conversions, 'conversion_rate', '{:.2f}%')} |
+| Avg Session Duration | {self._kpi(engagement, 'avg_time_on_site', '{:.0f}s')} |
+| Bounce Rate | {self._kpi(traffic, 'bounce_rate', '{:.2f}%')} |
 | Pages per Session | {traffic.get('pages_per_session', 0):.1f} |
 
 ## 🔍 Traffic Analysis
@@ -203,8 +242,8 @@ class ReportGenerator:
 
 ## 💰 Conversion Analysis
 
-- **Total Conversions**: {conversions.get('total_conversions', 0)}
-- **Conversion Rate**: {conversions.get('conversion_rate', 0):.2f}%
+- **Total Conversions**: {self._kpi(conversions, 'total_conversions')}
+- **Conversion Rate**: {self._kpi(conversions, 'conversion_rate', '{:.2f}%')}
 - **Total Conversion Value**: ${conversions.get('conversion_value', 0):.2f}
 - **Avg Conversion Value**: ${conversions.get('avg_conversion_value', 0):.2f}
 
@@ -232,6 +271,8 @@ class ReportGenerator:
             'generated_at': datetime.now().isoformat(),
             'analysis': analysis_data.get('analysis', {})
         }
+        if analysis_data.get('sample'):
+            report_data['sample'] = analysis_data['sample']
         
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(report_data, f, indent=2, default=str)
@@ -257,13 +298,13 @@ WEB ANALYTICS REPORT
 
 Source: {source_name}
 Generated: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}
-
+{self._sample_note(analysis_data)}
 KEY METRICS
 -----------
-Total Sessions: {traffic.get('total_sessions', 0)}
-Unique Visitors: {users.get('total_users', 0)}
-Bounce Rate: {traffic.get('bounce_rate', 0):.2f}%
-Avg Session Duration: {traffic.get('avg_session_duration', 0):.0f}s
+Total Sessions: {self._kpi(traffic, 'total_sessions')}
+Unique Visitors: {self._kpi(users, 'total_users')}
+Bounce Rate: {self._kpi(traffic, 'bounce_rate', '{:.2f}%')}
+Avg Session Duration: {self._kpi(traffic, 'avg_session_duration', '{:.0f}s')}
 Pages per Session: {traffic.get('pages_per_session', 0):.1f}
 
 {'='*70}
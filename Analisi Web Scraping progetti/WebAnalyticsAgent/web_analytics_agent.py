@@ -7,7 +7,7 @@ import os
 import sys
 import json
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 
@@ -32,6 +32,10 @@ class WebAnalyticsAgent:
         self.data_sources = {}
         self.analyzed_data = {}
         self.reports = {}
+        self.cache = None
+        self.result_cache = None
+        self.governor = None
+        self.registry = None
         self.timestamp = datetime.now()
         
         logger.info("🤖 Web Analytics Agent inizializzato")
@@ -42,7 +46,7 @@ class WebAnalyticsAgent:
             'project_name': 'Web Analytics Analysis',
             'data_dir': './data',
             'output_dir': './reports',
-            'supported_formats': ['csv', 'json', 'ga4'],
+            'supported_formats': ['csv', 'json', 'ga4', 'log'],
             'analysis_modules': [
                 'traffic',
                 'users',
@@ -52,7 +56,31 @@ class WebAnalyticsAgent:
                 'device',
                 'behavioral'
             ],
-            'report_format': ['html', 'pdf', 'markdown', 'json']
+            # Analizzatori aggiuntivi: nome -> 'modulo:Classe' (da abilitare in analysis_modules)
+            'analyzer_plugins': {},
+            'report_format': ['html', 'pdf', 'markdown', 'json'],
+            'data_config': {
+                'streaming': False,
+                'chunk_size': 100000,
+                'cache_enabled': True,
+                'cache_dir': './cache',
+                'result_cache': True,
+                'result_cache_dir': './cache/results',
+                'result_cache_max_mb': 256,
+                'incremental': False,
+                'state_dir': './state',
+                'dedup': True,
+                'dedup_bloom': True,
+                'ga4_sessions': True,
+                'column_projection': True,
+                'sample': None,
+                'sample_seed': None,
+                'sample_confidence': 0.95,
+                'jobs': 1,
+                'executor': 'thread',
+                'source_workers': 1,
+                'max_file_size_mb': 500
+            }
         }
         
         if config_file and os.path.exists(config_file):
@@ -62,19 +90,90 @@ class WebAnalyticsAgent:
         
         return default_config
     
-    def add_data_source(self, name: str, source_type: str, path: str) -> bool:
+    def _data_setting(self, key: str, default: Any = None) -> Any:
+        """Ritorna un'impostazione della sezione data_config"""
+        return self.config.get('data_config', {}).get(key, default)
+    
+    def _get_cache(self) -> Any:
+        """Ritorna la cache colonnare (None se disabilitata o senza pyarrow)"""
+        if not self._data_setting('cache_enabled', True):
+            return None
+        
+        if self.cache is None:
+            from loaders.columnar_cache import ColumnarCache
+            self.cache = ColumnarCache(self._data_setting('cache_dir', './cache'))
+        
+        return self.cache if self.cache.available else None
+    
+    def _get_result_cache(self) -> Any:
+        """Ritorna la cache dei risultati degli analizzatori (None se disabilitata)"""
+        if not self._data_setting('result_cache', True):
+            return None
+        
+        if self.result_cache is None:
+            from analyzers.result_cache import ResultCache
+            self.result_cache = ResultCache(self._data_setting('result_cache_dir', './cache/results'),
+                                            self._data_setting('result_cache_max_mb', 256))
+        
+        return self.result_cache
+    
+    def _get_governor(self) -> Any:
+        """Ritorna il governor del budget di memoria (None se disabilitato)"""
+        budget_mb = self._data_setting('memory_budget_mb') or self._data_setting('max_file_size_mb')
+        if not budget_mb:
+            return None
+        
+        if self.governor is None:
+            from loaders.memory_budget import MemoryGovernor
+            self.governor = MemoryGovernor(budget_mb, self._data_setting('chunk_size', 100000))
+        
+        return self.governor
+    
+    def _make_executor(self, jobs: Optional[int] = None) -> Any:
+        """
+        Executor degli analizzatori di una fonte
+        
+        Args:
+            jobs: Analizzatori in parallelo (None = data_config.jobs)
+        
+        Returns:
+            AnalyzerExecutor con data_config.executor ('thread' o 'process')
+        """
+        from analyzers.executor import AnalyzerExecutor
+        jobs = jobs if jobs is not None else self._data_setting('jobs', 1)
+        return AnalyzerExecutor(jobs or 1, self._data_setting('executor', 'thread'))
+    
+    def add_data_source(self, name: str, source_type: str, path: str,
+                        streaming: Optional[bool] = None,
+                        filters: Optional[List[str]] = None) -> bool:
         """
         Aggiunge una fonte dati
         
         Args:
             name: Nome identificativo della fonte
             source_type: Tipo (csv, json, ga4, log)
-            path: Percorso al file dati
+            path: Percorso al file dati (anche .gz, .bz2, .xz, .zst), oppure
+                cartella o glob di file giornalieri (fonte partizionata per data)
+            streaming: Lettura a chunk (None = usa data_config.streaming)
+            filters: Condizioni sulle righe, es. ['country=Italy']
+                (None = usa data_config.filters)
         
         Returns:
             True se aggiunto con successo
         """
-        if not os.path.exists(path):
+        from loaders.compression import detect_codec
+        from loaders.partitions import is_partitioned, list_partitions
+        
+        partitioned = is_partitioned(path)
+        if partitioned:
+            if source_type == 'json':
+                logger.error(f"❌ Le fonti json non possono essere partizionate: {path}")
+                return False
+            partitions = list_partitions(path)
+            if not partitions:
+                logger.error(f"❌ Nessun file trovato: {path}")
+                return False
+        elif not os.path.exists(path):
             logger.error(f"❌ Percorso non trovato: {path}")
             return False
         
@@ -82,85 +181,1089 @@ class WebAnalyticsAgent:
             'type': source_type,
             'path': path,
             'added_at': datetime.now().isoformat(),
-            'status': 'pending'
+            'status': 'pending',
+            'streaming': streaming,
+            'filters': filters,
+            'compression': None if partitioned else detect_codec(path),
+            'partitioned': partitioned
         }
         
-        logger.info(f"✅ Fonte dati aggiunta: {name} ({source_type})")
+        if partitioned:
+            logger.info(f"✅ Fonte dati aggiunta: {name} ({source_type}, {len(partitions)} partizioni)")
+        else:
+            codec = self.data_sources[name]['compression']
+            logger.info(f"✅ Fonte dati aggiunta: {name} ({source_type}{', ' + codec if codec else ''})")
         return True
     
-    def analyze_all_sources(self) -> Dict[str, Any]:
+    def analyze_all_sources(self, date_from: Optional[str] = None,
+                            date_to: Optional[str] = None,
+                            incremental: Optional[bool] = None,
+                            sample: Optional[Any] = None) -> Dict[str, Any]:
         """
         Analizza tutte le fonti dati aggiunte
         
+        Args:
+            date_from: Primo giorno (AAAA-MM-GG) delle fonti partizionate
+            date_to: Ultimo giorno (AAAA-MM-GG) delle fonti partizionate
+            incremental: Legge solo i dati nuovi rispetto all'analisi precedente
+                (None = usa data_config.incremental)
+            sample: Anteprima su un campione: 'reservoir[:righe]' o
+                'users[:quota]' (None = usa data_config.sample)
+        
         Returns:
             Dizionario con risultati analisi
         """
         logger.info(f"🔍 Inizio analisi di {len(self.data_sources)} fonti dati")
         
-        from analyzers.traffic_analyzer import TrafficAnalyzer
-        from analyzers.user_analyzer import UserAnalyzer
-        from analyzers.conversion_analyzer import ConversionAnalyzer
-        from analyzers.engagement_analyzer import EngagementAnalyzer
-        from analyzers.geographic_analyzer import GeographicAnalyzer
-        from analyzers.device_analyzer import DeviceAnalyzer
-        from analyzers.behavioral_analyzer import BehavioralAnalyzer
-        
-        analyzers = {
-            'traffic': TrafficAnalyzer(),
-            'users': UserAnalyzer(),
-            'conversions': ConversionAnalyzer(),
-            'engagement': EngagementAnalyzer(),
-            'geographic': GeographicAnalyzer(),
-            'device': DeviceAnalyzer(),
-            'behavioral': BehavioralAnalyzer()
+        analyzers = self._make_analyzers()
+        
+        if incremental is None:
+            incremental = bool(self._data_setting('incremental', False))
+        
+        from loaders.sampling import parse_sample
+        
+        sample = sample if sample is not None else self._data_setting('sample')
+        sample_spec = parse_sample(sample) if sample else None
+        if sample_spec is not None and incremental:
+            # Uno stato stimato da un campione non va fuso con gli stati completi
+            logger.warning("⚠️  Campionamento attivo: analisi incrementale disattivata")
+            incremental = False
+        options = {
+            'date_from': date_from,
+            'date_to': date_to,
+            'incremental': incremental,
+            'sample_spec': sample_spec
         }
         
+        # Più fonti: un processo per fonte (data_config.source_workers)
+        workers = min(len(self.data_sources), self._data_setting('source_workers') or 1)
+        if workers > 1:
+            self._analyze_sources_parallel(workers, options)
+            logger.info("✅ Analisi completata")
+            return self.analyzed_data
+        
+        # Filtri sulle righe: valutati in lettura, prima di dedup e analizzatori
+        row_filters = {
+            name: self._make_row_filter(info, date_from, date_to)
+            for name, info in self.data_sources.items()
+        }
+        if incremental or sample_spec is not None:
+            prefetch, loading = None, {}
+        else:
+            prefetch, loading = self._prefetch_compressed(analyzers, row_filters)
+        
         for source_name, source_info in self.data_sources.items():
             logger.info(f"\n📊 Analizzando: {source_name}")
             
             try:
-                # Carica i dati
-                data = self._load_data(source_info)
-                
-                # Esegui analisi
-                analysis_results = {}
-                for analyzer_name, analyzer in analyzers.items():
-                    if analyzer_name in self.config['analysis_modules']:
-                        analysis_results[analyzer_name] = analyzer.analyze(data)
-                        logger.info(f"  ✓ {analyzer_name} completato")
-                
-                self.analyzed_data[source_name] = {
-                    'raw_data': data,
-                    'analysis': analysis_results,
-                    'timestamp': datetime.now().isoformat()
-                }
-                
+                self.analyzed_data[source_name] = self._analyze_source(
+                    source_name, source_info, analyzers, row_filters[source_name], options, loading
+                )
                 self.data_sources[source_name]['status'] = 'completed'
-                
+            
             except Exception as e:
                 logger.error(f"  ❌ Errore analizzando {source_name}: {e}")
                 self.data_sources[source_name]['status'] = 'failed'
         
+        if prefetch is not None:
+            prefetch.shutdown(wait=True)
+        
         logger.info("✅ Analisi completata")
         return self.analyzed_data
     
-    def _load_data(self, source_info: Dict) -> Any:
-        """Carica i dati da fonte"""
+    def _get_registry(self) -> Any:
+        """Registro degli analizzatori: inclusi, entry point e analyzer_plugins della configurazione"""
+        if self.registry is None:
+            from analyzers.registry import AnalyzerRegistry
+            self.registry = AnalyzerRegistry(self.config.get('analyzer_plugins'))
+        return self.registry
+    
+    def _make_analyzers(self) -> Dict[str, Any]:
+        """Istanze degli analizzatori abilitati in analysis_modules (e delle dipendenze), in ordine topologico"""
+        return self._get_registry().create(self.config['analysis_modules'])
+    
+    def _analyze_source(self, source_name: str, source_info: Dict, analyzers: Dict[str, Any],
+                        row_filter: Any, options: Dict[str, Any],
+                        loading: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Analizza una fonte
+        
+        Args:
+            source_name: Nome della fonte
+            source_info: Informazioni sulla fonte (piano e colonne aggiornati)
+            analyzers: Analizzatori attivi
+            row_filter: RowFilter della fonte (None = nessun filtro)
+            options: date_from, date_to, incremental e sample_spec dell'analisi
+            loading: Future dei dati delle fonti compresse già in decompressione
+        
+        Returns:
+            Record della fonte per analyzed_data
+        """
+        loading = loading or {}
+        date_from, date_to = options['date_from'], options['date_to']
+        # Analizzatori indipendenti in parallelo (data_config.jobs)
+        executor = self._make_executor()
+        
+        try:
+            # Fonti partizionate: si aprono solo i file nell'intervallo di date
+            paths, partitions = self._select_partitions(source_info, date_from, date_to)
+            increment = sampled = None
+            source_sample = options['sample_spec']
+            if source_sample is not None and source_info['type'] == 'json':
+                logger.warning("  ⚠️  Campionamento non applicabile alle fonti json: analisi completa")
+                source_sample = None
+            if source_name not in loading:
+                self._prepare_source(source_info, analyzers, paths, row_filter, source_sample)
+            dedup = self._make_deduplicator(source_info)
+            source_analyzers = self._source_analyzers(source_info, analyzers)
+            incremental = options['incremental'] and source_info['type'] in ('csv', 'ga4', 'log')
+            if incremental and self._raw_ga4_events(source_info, paths):
+                # Una sessione può proseguire nell'estrazione successiva: gli stati
+                # salvati sarebbero per evento e i KPI GA4 cambierebbero significato
+                logger.warning("  ⚠️  Analisi incrementale non applicabile agli eventi GA4 da sessionizzare: "
+                               "analisi completa")
+                incremental = False
+                increment = {'mode': 'disabled', 'sessionized': True}
+            
+            # Risultati già calcolati sugli stessi dati con lo stesso codice
+            # (non per campioni e analisi incrementali, che hanno uno stato proprio)
+            result_cache = self._get_result_cache() if source_sample is None and not incremental else None
+            cached, keys = {}, None
+            if result_cache is not None:
+                keys = self._result_keys(source_info, source_analyzers, paths, row_filter)
+                cached = result_cache.lookup(keys)
+                for analyzer_name, results in cached.items():
+                    analyzers[analyzer_name].results = results
+                    logger.info(f"  ⚡ {analyzer_name} dalla cache dei risultati")
+            pending = {name: analyzer for name, analyzer in source_analyzers.items() if name not in cached}
+            # Riepilogo della sessionizzazione degli eventi GA4
+            sessions: Dict[str, Any] = {}
+            
+            if source_sample is not None:
+                # Anteprima: analisi del campione e stime riportate alla popolazione
+                data, analysis_results, sampled = self._analyze_sampled(
+                    source_info, source_analyzers, paths, source_sample, dedup, row_filter, executor, sessions
+                )
+            elif incremental:
+                # Solo i dati oltre il watermark, fusi negli stati salvati
+                data, analysis_results, increment = self._analyze_incremental(
+                    source_info, source_analyzers, paths, date_from, date_to, dedup, row_filter, executor
+                )
+            elif not pending:
+                # Tutti i risultati in cache: la fonte non viene letta
+                data, analysis_results = None, {}
+            elif self._use_streaming(source_info):
+                # Lettura a chunk con stati parziali fondibili
+                data = None
+                analysis_results = self._analyze_streaming(
+                    source_info, pending, paths, dedup, row_filter, executor, cached, sessions
+                )
+            else:
+                # Carica i dati (già in decompressione se la fonte è compressa)
+                if source_name in loading:
+                    data = loading[source_name].result()
+                else:
+                    data = self._load_source(source_info, paths, row_filter)
+                if dedup is not None:
+                    data = dedup.apply(data)
+                data = self._sessionize(source_info, data, sessions)
+                
+                # Esegui analisi
+                analysis_results = executor.analyze(pending, data, cached)
+                for analyzer_name in analysis_results:
+                    logger.info(f"  ✓ {analyzer_name} completato")
+        finally:
+            executor.close()
+        
+        if result_cache is not None:
+            result_cache.store(keys, analysis_results)
+            analysis_results = {
+                name: cached[name] if name in cached else analysis_results[name] for name in source_analyzers
+            }
+        
+        record = {
+            'raw_data': data,
+            'analysis': analysis_results,
+            'timestamp': datetime.now().isoformat(),
+            'plan': source_info['plan'],
+            'timings': executor.get_timings()
+        }
+        self._log_timings(executor)
+        if source_info.get('execution') is not None:
+            record['execution'] = source_info['execution']
+        if partitions is not None:
+            record['partitions'] = partitions
+        if row_filter is not None:
+            record['filters'] = row_filter.get_stats()
+            logger.info(f"  🔎 {row_filter.rows_out}/{row_filter.rows_in} righe nei filtri")
+        if increment is not None:
+            record['incremental'] = increment
+        if sampled is not None:
+            record['sample'] = sampled
+        if dedup is not None and dedup.rows_in:
+            record['dedup'] = dedup.get_stats()
+            logger.info(f"  🧹 {dedup.duplicates} eventi duplicati scartati")
+        if result_cache is not None:
+            record['result_cache'] = {'hits': list(cached), 'misses': list(pending)}
+        if sessions:
+            record['sessions'] = sessions
+        
+        return record
+    
+    def _source_analyzers(self, source_info: Dict, analyzers: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analizzatori eseguibili su una fonte pianificata
+        
+        Solo quelli con i propri input presenti nella fonte e con le
+        dipendenze obbligatorie eseguibili.
+        """
+        source_analyzers = {}
+        for name, analyzer in analyzers.items():
+            if name in source_info['plan']['analyzers'] and all(
+                dep in source_analyzers for dep in getattr(analyzer, 'DEPENDS_ON', [])
+            ):
+                source_analyzers[name] = analyzer
+        return source_analyzers
+    
+    def _result_keys(self, source_info: Dict, analyzers: Dict[str, Any],
+                     paths: Optional[List[str]] = None, row_filter: Any = None) -> Dict[str, str]:
+        """
+        Chiavi della cache dei risultati per gli analizzatori di una fonte
+        
+        Combinano l'hash del contenuto dei file letti (le partizioni
+        selezionate per le fonti partizionate), il codice di ogni analizzatore
+        e le impostazioni che cambiano le righe analizzate: tipo, filtri (con
+        l'intervallo di date), deduplicazione, sessionizzazione GA4 e versione
+        del parser.
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            analyzers: Analizzatori eseguibili sulla fonte, in ordine topologico
+            paths: File delle partizioni (None = file singolo)
+            row_filter: RowFilter della fonte (None = nessun filtro)
+        
+        Returns:
+            Dizionario nome analizzatore -> chiave
+        """
+        import hashlib
+        from loaders.columnar_cache import PARSER_VERSION, content_hash
+        
+        cache_dir = self._data_setting('cache_dir', './cache')
+        digest = hashlib.sha256(source_info['type'].encode('utf-8'))
+        for path in paths if paths is not None else [source_info['path']]:
+            digest.update(content_hash(path, cache_dir).encode('utf-8'))
+        
+        settings = {
+            'type': source_info['type'],
+            'filters': row_filter.describe() if row_filter is not None else [],
+            'dedup': self._make_deduplicator(source_info) is not None,
+            'ga4_sessions': self._sessionizes(source_info),
+            'parser': PARSER_VERSION
+        }
+        return self._get_result_cache().keys(analyzers, digest.hexdigest(), settings)
+    
+    def _analyze_sources_parallel(self, workers: int, options: Dict[str, Any]):
+        """
+        Analizza le fonti in un pool di processi, una fonte per processo
+        
+        Ogni processo ricrea agente e analizzatori dalla configurazione e
+        restituisce solo il record compatto della fonte (senza raw_data) e il
+        piano calcolato: i DataFrame non tornano al processo principale. Una
+        fonte che fallisce viene segnata failed senza fermare le altre; se un
+        processo termina (es. memoria esaurita) il pool si rompe e le fonti
+        rimaste vengono rianalizzate ciascuna in un processo proprio.
+        
+        Args:
+            workers: Processi del pool
+            options: Opzioni dell'analisi (vedi _analyze_source)
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from concurrent.futures.process import BrokenProcessPool
+        
+        logger.info(f"🧵 Analisi parallela di {len(self.data_sources)} fonti su {workers} processi")
+        
+        start_method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        context = multiprocessing.get_context(start_method)
+        
+        def submit(pool: Any, name: str) -> Any:
+            return pool.submit(_analyze_source_worker, self.config, name, self.data_sources[name], options)
+        
+        def collect(name: str, future: Any, retry: bool) -> bool:
+            """Registra il risultato di una fonte; False se il pool si è rotto e va ritentata"""
+            try:
+                record, plan = future.result()
+            except BrokenProcessPool as e:
+                if retry:
+                    return False
+                logger.error(f"  ❌ Errore analizzando {name}: processo terminato ({e})")
+                self.data_sources[name]['status'] = 'failed'
+            except Exception as e:
+                logger.error(f"  ❌ Errore analizzando {name}: {e}")
+                self.data_sources[name]['status'] = 'failed'
+            else:
+                self.data_sources[name].update(plan)
+                self.analyzed_data[name] = record
+                self.data_sources[name]['status'] = 'completed'
+                if 'result_cache' in record:
+                    self._get_result_cache().add_usage(record['result_cache'])
+            return True
+        
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {name: submit(pool, name) for name in self.data_sources}
+            # Risultati raccolti nell'ordine delle fonti: la durata è quella della fonte più lenta
+            broken = [name for name, future in futures.items() if not collect(name, future, retry=True)]
+        
+        if broken:
+            logger.warning(f"⚠️  Pool interrotto: {len(broken)} fonti rianalizzate una per processo")
+        for name in broken:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                collect(name, submit(pool, name), retry=False)
+    
+    def _log_timings(self, executor: Any):
+        """Riporta nel log i tempi degli analizzatori di una fonte"""
+        timings = executor.get_timings()
+        if not timings:
+            return
+        wall = sum(timing['wall_time'] for timing in timings.values())
+        cpu = sum(timing['cpu_time'] for timing in timings.values())
+        slowest = max(timings, key=lambda name: timings[name]['wall_time'])
+        logger.info(f"  ⏱️  Analizzatori ({executor.mode} x{executor.jobs}): {wall:.2f}s reali, {cpu:.2f}s CPU "
+                    f"(più lento: {slowest}, {timings[slowest]['wall_time']:.2f}s)")
+    
+    def _prefetch_compressed(self, analyzers: Dict[str, Any],
+                             row_filters: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Avvia in parallelo il caricamento delle fonti compresse
+        
+        Con più fonti compresse l'inflate (che rilascia il GIL) di una fonte si
+        sovrappone al parsing delle altre invece di procedere in sequenza.
+        
+        Args:
+            analyzers: Analizzatori attivi (per la proiezione delle colonne)
+            row_filters: RowFilter di ogni fonte (None = nessun filtro)
+        
+        Returns:
+            Tupla (executor o None, dizionario nome fonte -> Future dei dati)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        names = []
+        for name, info in self.data_sources.items():
+            if not info.get('compression'):
+                continue
+            self._prepare_source(info, analyzers, None, row_filters.get(name))
+            if self._use_streaming(info):
+                continue
+            result_cache = self._get_result_cache()
+            if result_cache is not None and result_cache.contains(
+                self._result_keys(info, self._source_analyzers(info, analyzers), None, row_filters.get(name))
+            ):
+                # Risultati tutti in cache: la fonte non verrà letta
+                continue
+            names.append(name)
+        if len(names) < 2:
+            return None, {}
+        
+        workers = min(len(names), self._data_setting('workers') or os.cpu_count() or 1)
+        executor = ThreadPoolExecutor(max_workers=max(2, workers))
+        logger.info(f"🗜️  Decompressione parallela di {len(names)} fonti")
+        
+        return executor, {
+            name: executor.submit(self._load_data, self.data_sources[name], row_filters.get(name))
+            for name in names
+        }
+    
+    def _make_row_filter(self, source_info: Dict, date_from: Optional[str],
+                         date_to: Optional[str]) -> Any:
+        """
+        Crea il filtro sulle righe di una fonte
+        
+        Args:
+            source_info: Informazioni sulla fonte (filters della fonte o data_config.filters)
+            date_from: Primo giorno incluso, applicato anche alle righe
+            date_to: Ultimo giorno incluso, applicato anche alle righe
+        
+        Returns:
+            RowFilter, None se non ci sono condizioni
+        """
+        from loaders.filters import RowFilter
+        
+        conditions = source_info.get('filters')
+        if conditions is None:
+            conditions = self._data_setting('filters')
+        row_filter = RowFilter(conditions, date_from, date_to)
+        if not row_filter.active:
+            return None
+        if source_info['type'] == 'json':
+            logger.warning("  ⚠️  Filtri non applicabili alle fonti json: ignorati")
+            return None
+        return row_filter
+    
+    def _make_deduplicator(self, source_info: Dict) -> Any:
+        """Crea il deduplicatore degli eventi GA4 (None se disattivato)"""
+        if not self._data_setting('dedup', True) or source_info['type'] not in ('csv', 'ga4'):
+            return None
+        
+        from loaders.dedup import EventDeduplicator
+        # Applicato solo ai dati che contengono tutte le colonne della chiave naturale
+        return EventDeduplicator()
+    
+    def _sessionizes(self, source_info: Dict) -> bool:
+        """Gli eventi GA4 grezzi della fonte vanno sessionizzati (data_config.ga4_sessions)"""
+        return source_info['type'] == 'ga4' and bool(self._data_setting('ga4_sessions', True))
+    
+    def _raw_ga4_events(self, source_info: Dict, paths: Optional[List[str]] = None) -> bool:
+        """
+        La fonte contiene eventi GA4 grezzi da sessionizzare
+        
+        Le colonne vengono dall'intestazione (o dallo schema); se non sono
+        ricavabili senza leggere i dati la fonte viene considerata grezza.
+        """
+        if not self._sessionizes(source_info):
+            return False
+        
+        from loaders.columns import source_columns
+        from loaders.ga4_sessions import needs_sessions
+        
+        columns = source_columns(source_info['type'], paths if paths is not None else [source_info['path']])
+        return columns is None or needs_sessions(columns)
+    
+    def _sessionize(self, source_info: Dict, data: Any, summary: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Sessionizza in memoria gli eventi GA4 grezzi (dopo filtri e deduplicazione)
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            data: Eventi caricati
+            summary: Dizionario in cui scrivere il riepilogo delle sessioni
+        
+        Returns:
+            Eventi con le colonne di sessione, o data invariato se non è un
+            export GA4 grezzo
+        """
         import pandas as pd
+        from loaders.ga4_sessions import needs_sessions, session_summary, sessionize_events
+        
+        if not self._sessionizes(source_info) or not isinstance(data, pd.DataFrame) \
+                or not needs_sessions(list(data.columns)):
+            return data
+        
+        events, sessions = sessionize_events(data)
+        self._log_sessions(session_summary(sessions, len(events)), summary)
+        return events
+    
+    def _session_attacher(self, source_info: Dict, paths: Optional[List[str]] = None,
+                          row_filter: Any = None, summary: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Tabella delle sessioni di una fonte GA4 letta a chunk
+        
+        Una sessione può attraversare più chunk: una prima lettura riduce gli
+        eventi a sessioni parziali fondibili, la seconda (quella degli
+        analizzatori) riceve le colonne di sessione da SessionAttacher. Le due
+        letture applicano filtri e deduplicazione allo stesso modo, così gli
+        eventi arrivano nello stesso ordine.
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            paths: File delle partizioni (None = file singolo)
+            row_filter: RowFilter della fonte (le statistiche restano della seconda lettura)
+            summary: Dizionario in cui scrivere il riepilogo delle sessioni
+        
+        Returns:
+            SessionAttacher, None se la fonte non va sessionizzata
+        """
+        if not self._sessionizes(source_info):
+            return None
+        
+        import copy
+        from loaders.chunked_reader import ChunkedReader
+        from loaders.ga4_sessions import SessionAttacher, SessionBuilder, needs_sessions, session_summary
+        
+        reader = ChunkedReader(
+            source_info,
+            self._chunk_size(source_info),
+            cache=self._get_cache(),
+            paths=paths,
+            dedup=self._make_deduplicator(source_info),
+            row_filter=copy.copy(row_filter)
+        )
+        builder = SessionBuilder()
+        for chunk in reader:
+            if not needs_sessions(list(chunk.columns)):
+                return None
+            builder.add(chunk)
+        
+        sessions = builder.build()
+        self._log_sessions(session_summary(sessions, builder.rows), summary)
+        return SessionAttacher(sessions)
+    
+    def _log_sessions(self, stats: Dict[str, Any], summary: Optional[Dict[str, Any]] = None):
+        """Registra il riepilogo della sessionizzazione"""
+        logger.info(f"  🧩 {stats['sessions']} sessioni da {stats['events']} eventi GA4 "
+                    f"({stats['engaged_sessions']} con engagement)")
+        if summary is not None:
+            summary.update(stats)
+    
+    def _select_partitions(self, source_info: Dict, date_from: Optional[str],
+                           date_to: Optional[str]) -> Tuple[Optional[List[str]], Optional[Dict[str, Any]]]:
+        """
+        Seleziona i file di una fonte partizionata nell'intervallo di date
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            date_from: Primo giorno incluso (None = nessun limite)
+            date_to: Ultimo giorno incluso (None = nessun limite)
+        
+        Returns:
+            Tupla (percorsi da leggere, riepilogo delle partizioni), entrambi
+            None per una fonte a file singolo
+        """
+        if not source_info.get('partitioned'):
+            return None, None
+        
+        from loaders.partitions import list_partitions, prune_partitions
+        
+        # Elencate a ogni analisi: i file arrivati dopo add_data_source sono inclusi
+        partitions = list_partitions(source_info['path'])
+        selected = prune_partitions(partitions, date_from, date_to)
+        logger.info(f"  🗂️  {len(selected)}/{len(partitions)} partizioni da leggere")
+        
+        dates = [p['date'] for p in selected if p['date'] is not None]
+        return [p['path'] for p in selected], {
+            'total': len(partitions),
+            'read': len(selected),
+            'from': min(dates).isoformat() if dates else None,
+            'to': max(dates).isoformat() if dates else None
+        }
+    
+    def _load_source(self, source_info: Dict, paths: Optional[List[str]] = None,
+                     row_filter: Any = None) -> Any:
+        """
+        Carica una fonte, concatenando le partizioni selezionate
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            paths: File delle partizioni (None = fonte a file singolo)
+            row_filter: RowFilter applicato durante la lettura
+        
+        Returns:
+            Dati caricati
+        """
+        if paths is None:
+            return self._load_data(source_info, row_filter)
+        
+        import pandas as pd
+        from concurrent.futures import ThreadPoolExecutor
+        from loaders.compression import detect_codec
+        from loaders.partitions import concat_partitions
+        
+        if not paths:
+            return pd.DataFrame()
+        if source_info['type'] == 'log':
+            # Sessionizzazione unica: le sessioni attraversano i file giornalieri
+            from loaders.access_log import read_access_log
+            data = read_access_log(paths, workers=self._data_setting('workers'))
+            return row_filter.apply(data) if row_filter is not None else data
+        
+        parts = [dict(source_info, path=path) for path in paths]
+        if sum(1 for path in paths if detect_codec(path)) > 1:
+            # Partizioni compresse: inflate e parsing si sovrappongono tra file
+            workers = self._data_setting('workers') or os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=max(2, min(len(parts), workers))) as pool:
+                frames = list(pool.map(self._load_data, parts, [row_filter] * len(parts)))
+        else:
+            frames = [self._load_data(part, row_filter) for part in parts]
+        
+        return concat_partitions(frames)
+    
+    def _prepare_source(self, source_info: Dict, analyzers: Dict[str, Any],
+                        paths: Optional[List[str]] = None, row_filter: Any = None,
+                        sample_spec: Optional[Dict[str, Any]] = None):
+        """
+        Pianifica una fonte prima di leggerne i dati
+        
+        Dalle colonne della fonte (intestazione o schema) e da quelle dichiarate
+        dagli analizzatori si ricava la proiezione da leggere e gli analizzatori
+        da saltare; il piano di esecuzione stima poi la memoria delle sole
+        colonne proiettate. I piani sono salvati in source_info['plan'] e
+        source_info['columns'].
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            analyzers: Analizzatori attivi
+            paths: File delle partizioni (None = file singolo)
+            row_filter: RowFilter della fonte (le sue colonne vanno lette)
+            sample_spec: Campionamento (per utenti va letta la colonna utente)
+        """
+        from analyzers.planner import AnalysisPlanner
+        from loaders.columns import source_columns
+        from loaders.dedup import DEDUP_KEY
+        from loaders.ga4_sessions import SESSION_COLUMNS, SESSION_INPUT_COLUMNS, needs_sessions
+        from loaders.sampling import USER_KEY_COLUMNS
+        
+        columns = None
+        if self._data_setting('column_projection', True):
+            columns = source_columns(source_info['type'], paths if paths is not None else [source_info['path']])
+        
+        extra, added = [], []
+        if columns is not None and self._sessionizes(source_info) and needs_sessions(columns):
+            # Colonne lette dalla sessionizzazione; quelle di sessione sono disponibili agli analizzatori
+            extra.extend(col for col in SESSION_INPUT_COLUMNS if col in columns)
+            added = [col for col in SESSION_COLUMNS if col not in columns]
+            columns = columns + added
+        if columns is not None:
+            if row_filter is not None:
+                extra.extend(row_filter.columns(columns))
+            if self._make_deduplicator(source_info) is not None and all(col in columns for col in DEDUP_KEY):
+                extra.extend(DEDUP_KEY)
+            user_key = next((col for col in USER_KEY_COLUMNS if col in columns), None)
+            if sample_spec is not None and sample_spec['mode'] == 'users' and user_key is not None:
+                extra.append(user_key)
+        
+        plan = AnalysisPlanner().plan(analyzers, columns, extra)
+        if added:
+            # Aggiunte dopo la lettura: fuori dalla proiezione e dal conteggio delle colonne della fonte
+            plan['source_columns'] -= len(added)
+            if plan['columns'] is not None:
+                plan['columns'] = [col for col in plan['columns'] if col not in added]
+        source_info['plan'] = plan
+        source_info['columns'] = plan['columns']
+        if plan['columns'] is not None or plan['skipped']:
+            projected = len(plan['columns']) if plan['columns'] is not None else plan['source_columns']
+            skipped = f", saltati: {', '.join(plan['skipped'])}" if plan['skipped'] else ''
+            logger.info(f"  🧭 {projected}/{plan['source_columns']} colonne da leggere{skipped}")
+        
+        self._plan_execution(source_info, paths)
+    
+    def _plan_execution(self, source_info: Dict, paths: Optional[List[str]] = None):
+        """
+        Sceglie tra caricamento completo e lettura a chunk in base al budget di memoria
+        
+        La memoria della fonte caricata per intero è stimata da un campione;
+        oltre data_config.memory_budget_mb (default: max_file_size_mb) la fonte
+        viene letta a chunk con una dimensione calcolata dal budget. Il piano
+        è salvato in source_info['execution'].
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            paths: File delle partizioni (None = file singolo)
+        """
+        from loaders.chunked_reader import ChunkedReader
+        
+        source_info['execution'] = None
+        governor = self._get_governor()
+        if governor is None or (paths is not None and not paths):
+            return
+        
+        if source_info['type'] not in ChunkedReader.STREAMABLE_TYPES:
+            # json e log si leggono solo per intero: il budget può solo segnalarlo
+            if not source_info.get('partitioned') and governor.exceeds_budget(source_info['path']):
+                logger.warning(f"  ⚠️  Fonte {source_info['type']} oltre il budget di memoria: "
+                               "caricamento completo (non leggibile a chunk)")
+            return
+        if source_info.get('streaming') is not None or self._data_setting('streaming', False):
+            # Modalità scelta esplicitamente
+            return
+        
+        plan = governor.plan(source_info, paths)
+        source_info['execution'] = plan
+        if plan['mode'] == 'chunked':
+            logger.info(f"  🧮 Stima {plan['estimated_mb']} MB oltre il budget di {plan['budget_mb']} MB: "
+                        f"lettura a chunk da {plan['chunk_size']} righe")
+    
+    def _use_streaming(self, source_info: Dict) -> bool:
+        """Decide se analizzare la fonte a chunk"""
+        from loaders.chunked_reader import ChunkedReader
+        
+        if source_info['type'] not in ChunkedReader.STREAMABLE_TYPES:
+            return False
+        if source_info.get('streaming') is not None:
+            return source_info['streaming']
+        if (source_info.get('execution') or {}).get('mode') == 'chunked':
+            return True
+        return bool(self._data_setting('streaming', False))
+    
+    def _chunk_size(self, source_info: Dict) -> int:
+        """Righe per chunk: scelte dal budget di memoria o da data_config.chunk_size"""
+        plan = source_info.get('execution') or {}
+        return plan.get('chunk_size') or self._data_setting('chunk_size', 100000)
+    
+    def _analyze_streaming(self, source_info: Dict, analyzers: Dict[str, Any],
+                           paths: Optional[List[str]] = None, dedup: Any = None,
+                           row_filter: Any = None, executor: Any = None,
+                           upstream: Optional[Dict[str, Any]] = None,
+                           sessions: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Analizza una fonte a chunk fondendo gli stati parziali degli analizzatori
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            analyzers: Analizzatori attivi
+            paths: File delle partizioni da leggere in sequenza (None = file singolo)
+            dedup: EventDeduplicator applicato a ogni chunk (opzionale)
+            row_filter: RowFilter applicato in lettura (opzionale)
+            executor: AnalyzerExecutor (None = analizzatori in sequenza)
+            upstream: Risultati già disponibili delle dipendenze (cache dei risultati)
+            sessions: Dizionario in cui scrivere il riepilogo delle sessioni GA4
+        
+        Returns:
+            Risultati analisi (uguali a quelli del caricamento completo)
+        """
+        executor = executor or self._make_executor(jobs=1)
+        attacher = self._session_attacher(source_info, paths, row_filter, sessions)
+        states, _ = self._stream_states(source_info, analyzers, paths, dedup, row_filter, executor, attacher)
+        return self._finalize_states(analyzers, states, executor, upstream)
+    
+    def _stream_states(self, source_info: Dict, analyzers: Dict[str, Any],
+                       paths: Optional[List[str]] = None, dedup: Any = None,
+                       row_filter: Any = None, executor: Any = None,
+                       attacher: Any = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Legge una fonte a chunk e fonde gli stati parziali degli analizzatori
+        
+        attacher (SessionAttacher) aggiunge a ogni chunk le colonne di sessione.
+        
+        Returns:
+            Tupla (stati fusi per analizzatore, righe lette dopo la deduplicazione)
+        """
+        from loaders.chunked_reader import ChunkedReader
+        
+        reader = ChunkedReader(
+            source_info,
+            self._chunk_size(source_info),
+            cache=self._get_cache(),
+            paths=paths,
+            dedup=dedup,
+            row_filter=row_filter
+        )
+        executor = executor or self._make_executor(jobs=1)
+        states = {}
+        
+        for chunk in reader:
+            if attacher is not None:
+                chunk = attacher.attach(chunk)
+            partials = executor.run(analyzers, 'partial', chunk)
+            self._merge_partials(analyzers, states, partials, executor)
+        
+        logger.info(f"  📦 Lette {reader.rows_read} righe a chunk")
+        return states, reader.rows_read
+    
+    def _merge_partials(self, analyzers: Dict[str, Any], states: Dict[str, Any],
+                        partials: Dict[str, Any], executor: Any):
+        """Fonde gli stati parziali di un chunk in states (tempi contati negli analizzatori)"""
+        for analyzer_name, partial in partials.items():
+            if analyzer_name in states:
+                states[analyzer_name] = executor.call(
+                    analyzer_name, analyzers[analyzer_name].merge, states[analyzer_name], partial
+                )
+            else:
+                states[analyzer_name] = partial
+    
+    def _analyze_sampled(self, source_info: Dict, analyzers: Dict[str, Any],
+                         paths: Optional[List[str]], sample_spec: Dict[str, Any],
+                         dedup: Any = None, row_filter: Any = None, executor: Any = None,
+                         sessions: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict[str, Any], Dict[str, Any]]:
+        """
+        Analizza un campione della fonte estratto durante la lettura a chunk
+        
+        Con 'reservoir' viene tenuto un campione uniforme di righe di dimensione
+        fissa; con 'users' tutte le righe degli utenti il cui hash cade sotto la
+        quota (sessioni e utenti restano interi). Gli eventi GA4 grezzi sono
+        sessionizzati sul campione per utenti; con 'reservoir' una sessione
+        finirebbe spezzata tra righe campionate e non, quindi le colonne di
+        sessione sono calcolate sull'intera fonte (_session_attacher) prima
+        del campionamento e le misure sulla prima riga della sessione sono
+        riportate alla popolazione come le altre. I risultati sono riportati
+        alla popolazione e i KPI hanno un intervallo di confidenza.
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            analyzers: Analizzatori attivi
+            paths: File delle partizioni (None = file singolo)
+            sample_spec: Modalità di campionamento (parse_sample)
+            dedup: EventDeduplicator applicato prima del campionamento
+            row_filter: RowFilter applicato in lettura
+            executor: AnalyzerExecutor (None = analizzatori in sequenza)
+            sessions: Dizionario in cui scrivere il riepilogo delle sessioni GA4
+        
+        Returns:
+            Tupla (campione, risultati stimati, descrizione del campione)
+        """
+        from loaders.chunked_reader import ChunkedReader
+        from loaders.sampling import make_sampler
+        
+        sampler = make_sampler(sample_spec, self._data_setting('sample_seed'))
+        attacher = None
+        if source_info['type'] in ChunkedReader.STREAMABLE_TYPES:
+            if sample_spec['mode'] == 'reservoir':
+                attacher = self._session_attacher(source_info, paths, row_filter, sessions)
+            reader = ChunkedReader(
+                source_info,
+                self._chunk_size(source_info),
+                cache=self._get_cache(),
+                paths=paths,
+                dedup=dedup,
+                row_filter=row_filter
+            )
+            for chunk in reader:
+                if attacher is not None:
+                    chunk = attacher.attach(chunk)
+                sampler.add(chunk)
+        else:
+            # Access log: la sessionizzazione richiede la fonte intera
+            sampler.add(self._load_source(source_info, paths, row_filter))
+        
+        data = sampler.sample() if attacher is not None else self._sessionize(source_info, sampler.sample(), sessions)
+        sample = sampler.get_stats()
+        level = self._data_setting('sample_confidence', 0.95)
+        logger.info(f"  🎲 Campione {sample['mode']}: {sample['sample_rows']}/{sample['population_rows']} righe "
+                    f"(stime x{sample['scale']:.1f})")
+        
+        executor = executor or self._make_executor(jobs=1)
+        analysis_results = {}
+        # Conteggi distinti non riportabili alla popolazione dal campione di righe
+        not_extrapolated = []
+        for analyzer_name, results in executor.analyze(analyzers, data).items():
+            analyzer = analyzers[analyzer_name]
+            analyzer.results = analyzer.scale_results(results, sample, data, level)
+            analysis_results[analyzer_name] = analyzer.results
+            if sample['mode'] != 'users':
+                not_extrapolated.extend(f"{analyzer_name}.{path}" for path in analyzer.DISTINCT_RESULTS)
+            logger.info(f"  ✓ {analyzer_name} completato")
+        
+        return data, analysis_results, dict(sample, confidence=level, not_extrapolated=not_extrapolated)
+    
+    def _finalize_states(self, analyzers: Dict[str, Any], states: Dict[str, Any],
+                         executor: Any = None, upstream: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Calcola i risultati finali dagli stati fusi (completati per le fonti vuote)"""
+        import pandas as pd
+        
+        for analyzer_name, analyzer in analyzers.items():
+            if analyzer_name not in states:
+                # Fonte vuota: stato di un DataFrame senza righe
+                states[analyzer_name] = analyzer.partial(pd.DataFrame())
+        
+        executor = executor or self._make_executor(jobs=1)
+        analysis_results = executor.finalize(analyzers, states, upstream)
+        for analyzer_name in analysis_results:
+            logger.info(f"  ✓ {analyzer_name} completato")
+        
+        return analysis_results
+    
+    def _analyze_incremental(self, source_info: Dict, analyzers: Dict[str, Any],
+                             paths: Optional[List[str]], date_from: Optional[str],
+                             date_to: Optional[str], dedup: Any = None,
+                             row_filter: Any = None,
+                             executor: Any = None) -> Tuple[Any, Dict[str, Any], Dict[str, Any]]:
+        """
+        Analizza solo i dati nuovi rispetto al watermark salvato
+        
+        Il watermark è l'insieme delle partizioni lette (fonti partizionate) o
+        la dimensione del file già letta (file singolo esteso in append). Gli
+        stati parziali dei dati nuovi vengono fusi in quelli salvati: il costo
+        dipende dai dati aggiunti, non dallo storico.
+        
+        Args:
+            source_info: Informazioni sulla fonte
+            analyzers: Analizzatori attivi
+            paths: File delle partizioni selezionate (None = file singolo)
+            date_from: Primo giorno delle fonti partizionate
+            date_to: Ultimo giorno delle fonti partizionate
+            dedup: EventDeduplicator; con data_config.dedup_bloom riceve il
+                filtro di Bloom degli eventi delle esecuzioni precedenti
+            row_filter: RowFilter applicato ai dati nuovi (fa parte della chiave dello stato)
+            executor: AnalyzerExecutor (None = analizzatori in sequenza)
+        
+        Returns:
+            Tupla (dati nuovi caricati in memoria o None, risultati, riepilogo)
+        """
+        from loaders.incremental import (
+            IncrementalStore, appended_offset, file_watermark, partitions_changed, read_tail
+        )
+        
+        executor = executor or self._make_executor(jobs=1)
+        store = IncrementalStore(self._data_setting('state_dir', './state'))
+        key = store.state_key(source_info, list(analyzers), date_from, date_to,
+                              row_filter.describe() if row_filter is not None else None)
+        saved = store.load(key)
+        states = dict(saved['states']) if saved else {}
+        rows = saved['rows'] if saved else 0
+        
+        if paths is not None:
+            done = saved['watermark'].get('partitions', {}) if saved else {}
+            if saved and partitions_changed(done, paths):
+                logger.warning("  ⚠️  Partizioni già analizzate modificate o rimosse: ricalcolo completo")
+                states, rows, done = {}, 0, {}
+            new_paths = [path for path in paths if path not in done]
+            self._attach_bloom(dedup, store, key, rebuild=not done)
+            
+            data, new_states, new_rows = None, {}, 0
+            if new_paths:
+                data, new_states, new_rows = self._read_states(source_info, analyzers, new_paths, dedup, row_filter,
+                                                               executor)
+            watermark = {'partitions': {**done, **{path: file_watermark(path) for path in new_paths}}}
+            mode = 'partitions' if saved and done else 'full'
+            extra = {'new_partitions': len(new_paths)}
+        else:
+            path = source_info['path']
+            offset = appended_offset(saved['watermark']['file'], path) if saved else None
+            if saved and offset is None:
+                logger.warning("  ⚠️  File riscritto dopo l'ultima analisi: ricalcolo completo")
+                states, rows = {}, 0
+            self._attach_bloom(dedup, store, key, rebuild=offset is None)
+            
+            data, new_states, new_rows = None, {}, 0
+            if offset is None:
+                data, new_states, new_rows = self._read_states(source_info, analyzers, None, dedup, row_filter,
+                                                               executor)
+                mode = 'full'
+            elif offset < os.path.getsize(path):
+                data = read_tail(path, source_info['type'], offset, self._data_setting('workers'),
+                                 source_info.get('columns'))
+                if row_filter is not None:
+                    data = row_filter.apply(data)
+                if dedup is not None:
+                    data = dedup.apply(data)
+                new_states = executor.run(analyzers, 'partial', data)
+                new_rows = len(data)
+                mode = 'append'
+            else:
+                mode = 'unchanged'
+            watermark = {'file': file_watermark(path)}
+            extra = {'offset': offset or 0}
+        
+        self._merge_partials(analyzers, states, new_states, executor)
+        
+        analysis_results = self._finalize_states(analyzers, states, executor)
+        if store.save(key, watermark, states, rows + new_rows) and dedup is not None:
+            # Solo ora gli eventi letti fanno parte dello stato: prima, un'interruzione
+            # li farebbe scartare come già visti alla prossima esecuzione
+            dedup.commit()
+        
+        logger.info(f"  ♻️  Analisi incrementale ({mode}): {new_rows} righe nuove, {rows + new_rows} totali")
+        if source_info['type'] == 'ga4':
+            # Eventi GA4 analizzati per evento (fonti già sessionizzate o ga4_sessions disattivata)
+            extra['sessionized'] = False
+        return data, analysis_results, {'mode': mode, 'new_rows': new_rows, 'total_rows': rows + new_rows, **extra}
+    
+    def _attach_bloom(self, dedup: Any, store: Any, key: str, rebuild: bool):
+        """
+        Collega al deduplicatore il filtro di Bloom della fonte
+        
+        Il filtro vive accanto allo stato incrementale: un ricalcolo completo
+        lo azzera, altrimenti scarterebbe tutti gli eventi come già visti. Gli
+        eventi del run vi entrano solo dopo il salvataggio dello stato
+        (EventDeduplicator.commit); oltre la capacità il filtro aggiunge strati
+        invece di saturarsi.
+        """
+        if dedup is None or not self._data_setting('dedup_bloom', True):
+            return
+        
+        from loaders.dedup import LayeredBloomFilter
+        
+        bloom_path = store.bloom_path(key)
+        if rebuild:
+            LayeredBloomFilter.remove(bloom_path)
+        dedup.bloom = LayeredBloomFilter(
+            bloom_path,
+            capacity=self._data_setting('dedup_bloom_capacity', 10000000),
+            error_rate=self._data_setting('dedup_bloom_error_rate', 0.001)
+        )
+    
+    def _read_states(self, source_info: Dict, analyzers: Dict[str, Any],
+                     paths: Optional[List[str]], dedup: Any = None,
+                     row_filter: Any = None, executor: Any = None) -> Tuple[Any, Dict[str, Any], int]:
+        """
+        Calcola gli stati parziali di una fonte (a chunk o in memoria)
+        
+        Returns:
+            Tupla (dati in memoria o None se letti a chunk, stati, righe lette)
+        """
+        executor = executor or self._make_executor(jobs=1)
+        if self._use_streaming(source_info):
+            states, rows = self._stream_states(source_info, analyzers, paths, dedup, row_filter, executor)
+            return None, states, rows
+        
+        data = self._load_source(source_info, paths, row_filter)
+        if dedup is not None:
+            data = dedup.apply(data)
+        return data, executor.run(analyzers, 'partial', data), len(data)
+    
+    def _load_data(self, source_info: Dict, row_filter: Any = None) -> Any:
+        """
+        Carica i dati da fonte (decompressi al volo se archiviati)
+        
+        Args:
+            source_info: Informazioni sulla fonte (columns: proiezione del planner)
+            row_filter: RowFilter applicato in lettura: con un filtro attivo
+                vengono materializzate solo le righe che lo soddisfano
+        
+        Returns:
+            Dati caricati
+        """
+        import pandas as pd
+        from loaders.columns import column_selector
+        from loaders.compression import open_source
         
         source_type = source_info['type']
         path = source_info['path']
+        columns = source_info.get('columns')
         
-        if source_type == 'csv':
-            return pd.read_csv(path)
-        elif source_type == 'json':
-            with open(path, 'r') as f:
+        if source_type == 'json':
+            with open_source(path, text=True) as f:
                 return json.load(f)
-        elif source_type == 'ga4':
-            # Importa da GA4 export
-            return pd.read_csv(path)
-        else:
+        elif source_type == 'log':
+            # Access log nginx/Apache: parsing parallelo + sessionizzazione
+            from loaders.access_log import read_access_log
+            data = read_access_log(path, workers=self._data_setting('workers'))
+            if row_filter is not None:
+                data = row_filter.apply(data)
+            return data[columns] if columns is not None else data
+        elif source_type not in ('csv', 'ga4'):
             raise ValueError(f"Tipo sorgente non supportato: {source_type}")
+        
+        # Cache colonnare: una fonte invariata non viene riletta dal CSV
+        cache = self._get_cache()
+        if cache is not None:
+            cached = cache.load(path, source_type, row_filter, columns)
+            if cached is not None:
+                return cached
+        
+        from loaders.ga4_ndjson import is_ndjson_path, read_ga4_ndjson
+        
+        if row_filter is not None and not (source_type == 'ga4' and is_ndjson_path(path)):
+            # Lettura a chunk filtrati: le righe scartate non vengono mai accumulate.
+            # La cache non viene popolata con una fonte parziale.
+            from loaders.chunked_reader import ChunkedReader
+            from loaders.partitions import concat_partitions
+            
+            reader = ChunkedReader(source_info, self._chunk_size(source_info), paths=[path],
+                                   row_filter=row_filter)
+            return concat_partitions(list(reader))
+        
+        usecols = column_selector(columns)
+        
+        if source_type == 'csv':
+            with open_source(path) as handle:
+                data = pd.read_csv(handle, usecols=usecols)
+        else:
+            # Importa da GA4 export (CSV o NDJSON BigQuery) con lo schema tipizzato
+            from loaders.ga4_schema import read_ga4_csv
+            if is_ndjson_path(path):
+                data = read_ga4_ndjson(path, workers=self._data_setting('workers'), row_filter=row_filter,
+                                       columns=columns)
+                if row_filter is not None:
+                    return data
+            else:
+                with open_source(path) as handle:
+                    data = read_ga4_csv(handle, usecols=usecols)
+        
+        if cache is not None:
+            # Salvata con la sola proiezione letta (una voce per insieme di colonne)
+            cache.store(path, source_type, data, columns)
+        
+        return data
     
     def generate_report(self, source_name: str, report_format: str = 'html') -> str:
         """
@@ -225,7 +1328,10 @@ class WebAnalyticsAgent:
             'analyzed_sources': len(self.analyzed_data),
             'generated_reports': len(self.reports),
             'data_sources': self.data_sources,
-            'reports': self.reports
+            'reports': self.reports,
+            'cache': self.cache.get_stats() if self.cache is not None else None,
+            'result_cache': self.result_cache.get_stats() if self.result_cache is not None else None,
+            'analysis_plans': {name: info.get('plan') for name, info in self.data_sources.items()}
         }
     
     def export_results(self, format: str = 'json', output_path: Optional[str] = None) -> str:
@@ -251,6 +1357,34 @@ class WebAnalyticsAgent:
         return output_path
 
 
+def _analyze_source_worker(config: Dict[str, Any], source_name: str, source_info: Dict[str, Any],
+                           options: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Analizza una fonte in un processo del pool di analyze_all_sources
+    
+    Args:
+        config: Configurazione dell'agente principale
+        source_name: Nome della fonte
+        source_info: Informazioni sulla fonte
+        options: Opzioni dell'analisi
+    
+    Returns:
+        Tupla (record della fonte senza raw_data, piano e colonne calcolati)
+    """
+    agent = WebAnalyticsAgent()
+    agent.config = config
+    agent.data_sources = {source_name: source_info}
+    
+    logger.info(f"\n📊 Analizzando: {source_name} (processo {os.getpid()})")
+    record = agent._analyze_source(
+        source_name, source_info, agent._make_analyzers(),
+        agent._make_row_filter(source_info, options['date_from'], options['date_to']), options
+    )
+    record['raw_data'] = None
+    plan = {key: source_info[key] for key in ('plan', 'columns', 'execution') if key in source_info}
+    return record, plan
+
+
 def main():
     """Funzione principale per esecuzione CLI"""
     import argparse
@@ -260,7 +1394,7 @@ def main():
     )
     parser.add_argument('--config', type=str, help='File configurazione JSON')
     parser.add_argument('--data', type=str, help='Percorso file dati')
-    parser.add_argument('--type', type=str, default='csv', help='Tipo dati (csv, json, ga4)')
+    parser.add_argument('--type', type=str, default='csv', help='Tipo dati (csv, json, ga4, log)')
     parser.add_argument('--output', type=str, help='Cartella output')
     parser.add_argument('--format', type=str, default='html', 
                        help='Formato report (html, pdf, markdown, json)')